@@ -1,18 +1,43 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordRequestForm
+from sqlalchemy import update
+from sqlalchemy.engine import Engine
 from sqlalchemy.orm import Session
 from db.database import get_db
 from db.models import DbUser
-from auth.hash import verify_password
-from auth.oauth2 import create_access_token
+from auth.hash import check_password, hash_password, password_pool, PasswordPoolSaturated, PASSWORD_HASH_RETRY_AFTER_SECONDS
+from auth.oauth2 import create_access_token, token_data_for
 
 router = APIRouter(
     tags=["authentication"]
 )
 
 
+def rehash_password(bind: Engine, user_id: int, plain_password: str, old_hash: str):
+    """
+    Re-hash a password with the configured work factor (background task)
+    
+    Skipped when the password pool is busy - the next login retries. The
+    update only applies if the stored hash is still the one we verified.
+    """
+    try:
+        new_hash = password_pool.run(hash_password, plain_password)
+    except PasswordPoolSaturated:
+        return
+    
+    # Core statement on its own connection: a password upgrade is not a
+    # user change and must not evict cached principals or revoke tokens
+    with bind.begin() as connection:
+        connection.execute(
+            update(DbUser.__table__)
+            .where(DbUser.id == user_id, DbUser.password == old_hash)
+            .values(password=new_hash)
+        )
+
+
 @router.post("/login")
 def login(
+    background_tasks: BackgroundTasks,
     request: OAuth2PasswordRequestForm = Depends(),
     db: Session = Depends(get_db)
 ):
@@ -21,6 +46,10 @@ def login(
     
     Use username and password to authenticate
     Returns access_token and token_type
+    
+    Password verification runs on the bounded password pool; when it is
+    saturated the request fails fast with 503 and Retry-After.
+    Hashes stored with a different bcrypt cost are upgraded after the response
     """
     user = db.query(DbUser).filter(DbUser.username == request.username).first()
     
@@ -30,13 +59,25 @@ def login(
             detail="Invalid credentials"
         )
     
-    if not verify_password(request.password, user.password):
+    try:
+        check = password_pool.run(check_password, request.password, user.password)
+    except PasswordPoolSaturated:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Too many concurrent logins, please retry",
+            headers={"Retry-After": str(PASSWORD_HASH_RETRY_AFTER_SECONDS)}
+        )
+    
+    if not check.valid:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Invalid credentials"
         )
     
-    access_token = create_access_token(data={"sub": user.username})
+    if check.needs_rehash:
+        background_tasks.add_task(rehash_password, db.get_bind(), user.id, request.password, user.password)
+    
+    access_token = create_access_token(data=token_data_for(user))
     
     return {
         "access_token": access_token,
@@ -1,11 +1,29 @@
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import NamedTuple
 import bcrypt
+import metrics
+
+# bcrypt work factor for new hashes - lower it for tests and seeding, raise it
+# as hardware gets faster; existing hashes are upgraded on the next login
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+
+# Password verification pool - bcrypt releases the GIL, so a few dedicated
+# threads bound the CPU spent on logins without blocking other requests
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", "2"))
+PASSWORD_HASH_MAX_QUEUE = int(os.getenv("PASSWORD_HASH_MAX_QUEUE", "16"))
+PASSWORD_HASH_RETRY_AFTER_SECONDS = int(os.getenv("PASSWORD_HASH_RETRY_AFTER_SECONDS", "1"))
+
+password_verify_seconds = metrics.Histogram("password_verify_seconds", "bcrypt password verification time")
 
 
 def hash_password(password: str) -> str:
     """Hash a plain text password using bcrypt"""
     # Convert password to bytes and hash
     password_bytes = password.encode('utf-8')
-    salt = bcrypt.gensalt()
+    salt = bcrypt.gensalt(rounds=BCRYPT_ROUNDS)
     hashed = bcrypt.hashpw(password_bytes, salt)
     # Return as string for database storage
     return hashed.decode('utf-8')
@@ -15,4 +33,107 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
     """Verify a password against its hash"""
     password_bytes = plain_password.encode('utf-8')
     hashed_bytes = hashed_password.encode('utf-8')
-    return bcrypt.checkpw(password_bytes, hashed_bytes)
+    started = time.perf_counter()
+    try:
+        return bcrypt.checkpw(password_bytes, hashed_bytes)
+    finally:
+        password_verify_seconds.observe(time.perf_counter() - started)
+
+
+def hash_rounds(hashed_password: str) -> int:
+    """Work factor stored in a bcrypt hash ($2b$<rounds>$...)"""
+    return int(hashed_password.split("$")[2])
+
+
+def needs_rehash(hashed_password: str) -> bool:
+    """True when a stored hash uses a different work factor than BCRYPT_ROUNDS"""
+    return hash_rounds(hashed_password) != BCRYPT_ROUNDS
+
+
+class PasswordCheck(NamedTuple):
+    valid: bool
+    needs_rehash: bool
+
+
+def check_password(plain_password: str, hashed_password: str) -> PasswordCheck:
+    """Verify a password and report whether its hash should be upgraded"""
+    valid = verify_password(plain_password, hashed_password)
+    return PasswordCheck(valid=valid, needs_rehash=valid and needs_rehash(hashed_password))
+
+
+class PasswordPoolSaturated(Exception):
+    """Raised when the password pool has no free worker or queue slot"""
+
+
+class PasswordPool:
+    """
+    Size-limited thread pool for bcrypt work
+    
+    At most `workers + max_queue` calls are admitted at once; further calls
+    fail immediately with PasswordPoolSaturated instead of queueing.
+    Queue wait and hash time are tracked separately.
+    """
+    
+    def __init__(self, workers: int, max_queue: int):
+        self.workers = workers
+        self.max_queue = max_queue
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="password-hash")
+        self._slots = threading.BoundedSemaphore(workers + max_queue)
+        self._lock = threading.Lock()
+        self.in_flight = 0
+        self.completed = 0
+        self.rejected = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+        self.hash_seconds_total = 0.0
+        self.hash_seconds_max = 0.0
+    
+    def run(self, func, *args):
+        """Run func(*args) on the pool and wait for the result"""
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self.rejected += 1
+            raise PasswordPoolSaturated()
+        
+        with self._lock:
+            self.in_flight += 1
+        submitted_at = time.perf_counter()
+        
+        def task():
+            started_at = time.perf_counter()
+            try:
+                return func(*args), started_at - submitted_at, time.perf_counter() - started_at
+            finally:
+                self._slots.release()
+        
+        try:
+            result, waited, hashed = self._executor.submit(task).result()
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+        
+        with self._lock:
+            self.completed += 1
+            self.wait_seconds_total += waited
+            self.wait_seconds_max = max(self.wait_seconds_max, waited)
+            self.hash_seconds_total += hashed
+            self.hash_seconds_max = max(self.hash_seconds_max, hashed)
+        return result
+    
+    def stats(self) -> dict:
+        with self._lock:
+            completed = self.completed or 1
+            return {
+                "workers": self.workers,
+                "max_queue": self.max_queue,
+                "in_flight": self.in_flight,
+                "completed": self.completed,
+                "rejected": self.rejected,
+                "queue_wait_ms_avg": round(self.wait_seconds_total / completed * 1000, 2),
+                "queue_wait_ms_max": round(self.wait_seconds_max * 1000, 2),
+                "hash_ms_avg": round(self.hash_seconds_total / completed * 1000, 2),
+                "hash_ms_max": round(self.hash_seconds_max * 1000, 2)
+            }
+
+
+password_pool = PasswordPool(workers=PASSWORD_HASH_WORKERS, max_queue=PASSWORD_HASH_MAX_QUEUE)
@@ -1,19 +1,60 @@
+import os
+import time
 from datetime import datetime, timedelta
 from typing import Optional
-from jose import JWTError, jwt
+from jose import ExpiredSignatureError, JWTError, jwt
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
+from sqlalchemy import event, inspect
 from sqlalchemy.orm import Session
+from db.catalog import bump_generation
 from db.database import get_db
 from db.models import DbUser
+from auth.principal import Principal, PrincipalCache, RevocationList
+from enums import UserRole
+import metrics
 
 # Secret key for JWT - in production, use environment variable
 SECRET_KEY = "your-secret-key-change-in-production"
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
 
+# Principal cache - entries never outlive a token, 0 disables the cache.
+# Workers pick up user changes made by other workers within
+# PRINCIPAL_CACHE_MAX_AGE_SECONDS.
+PRINCIPAL_CACHE_SIZE = int(os.getenv("PRINCIPAL_CACHE_SIZE", "1024"))
+PRINCIPAL_CACHE_TTL_SECONDS = min(
+    int(os.getenv("PRINCIPAL_CACHE_TTL_SECONDS", "300")),
+    ACCESS_TOKEN_EXPIRE_MINUTES * 60
+)
+PRINCIPAL_CACHE_MAX_AGE_SECONDS = float(os.getenv("PRINCIPAL_CACHE_MAX_AGE_SECONDS", "5"))
+
+# Claims mode - id, role and manager_id are signed into the token so requests
+# authorize without touching the database. Revocations (user changes, or
+# `python -m auth.oauth2 revoke-all`) are stored in the database and picked
+# up by every worker within TOKEN_REVOCATION_MAX_AGE_SECONDS. TOKEN_EPOCH
+# still rejects tokens of an older epoch, it needs a restart of all workers.
+AUTH_CLAIMS_MODE = os.getenv("AUTH_CLAIMS_MODE", "false").lower() in ("1", "true", "yes")
+TOKEN_EPOCH = int(os.getenv("TOKEN_EPOCH", "0"))
+TOKEN_REVOCATION_MAX_AGE_SECONDS = float(os.getenv("TOKEN_REVOCATION_MAX_AGE_SECONDS", "5"))
+
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="login")
 
+principal_cache = PrincipalCache(
+    maxsize=PRINCIPAL_CACHE_SIZE,
+    ttl_seconds=PRINCIPAL_CACHE_TTL_SECONDS,
+    max_age_seconds=PRINCIPAL_CACHE_MAX_AGE_SECONDS
+)
+
+revoked_tokens = RevocationList(
+    retention_seconds=ACCESS_TOKEN_EXPIRE_MINUTES * 60,
+    max_age_seconds=TOKEN_REVOCATION_MAX_AGE_SECONDS
+)
+
+jwt_decode_failures = metrics.Counter(
+    "jwt_decode_failures_total", "Bearer tokens rejected while decoding", ("reason",)
+)
+
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     """Create JWT access token"""
@@ -28,7 +69,34 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     return encoded_jwt
 
 
-def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)) -> DbUser:
+def token_data_for(user: DbUser) -> dict:
+    """Build the claims to sign for a user, honouring claims mode"""
+    data = {"sub": user.username}
+    if AUTH_CLAIMS_MODE:
+        data.update({
+            "id": user.id,
+            "role": user.role.value,
+            "manager_id": user.manager_id,
+            "epoch": TOKEN_EPOCH,
+            "iat": time.time()
+        })
+    return data
+
+
+def _principal_from_claims(payload: dict) -> Optional[Principal]:
+    """Principal signed into a claims-mode token, None for a plain token"""
+    if "id" not in payload or "role" not in payload:
+        return None
+    return Principal(
+        id=payload["id"],
+        username=payload["sub"],
+        email=None,
+        role=UserRole(payload["role"]),
+        manager_id=payload.get("manager_id")
+    )
+
+
+def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)) -> Principal:
     """Get current authenticated user from JWT token"""
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
@@ -40,12 +108,110 @@ def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
         username: str = payload.get("sub")
         if username is None:
+            jwt_decode_failures.inc("missing_subject")
             raise credentials_exception
+    except ExpiredSignatureError:
+        jwt_decode_failures.inc("expired")
+        raise credentials_exception
     except JWTError:
+        jwt_decode_failures.inc("invalid")
         raise credentials_exception
     
+    if AUTH_CLAIMS_MODE:
+        principal = _principal_from_claims(payload)
+        if principal is not None:
+            revoked_tokens.refresh_if_stale(db)
+            if payload.get("epoch", 0) < TOKEN_EPOCH or revoked_tokens.is_revoked(principal.id, payload.get("iat", 0)):
+                raise credentials_exception
+            return principal
+    
+    principal_cache.refresh_if_stale(db)
+    principal = principal_cache.get(username)
+    if principal is not None:
+        return principal
+    
+    generation = principal_cache.generation
     user = db.query(DbUser).filter(DbUser.username == username).first()
     if user is None:
         raise credentials_exception
     
-    return user
+    principal = Principal.from_user(user)
+    principal_cache.put(username, principal, generation=generation)
+    return principal
+
+
+# Cache invalidation - changed users are evicted once the change is committed,
+# bulk UPDATE/DELETE statements on users clear the whole cache. The same
+# transaction bumps the users generation so other workers empty their caches,
+# and in claims mode records the revocation of the users' tokens.
+def _mark_users_changed(session: Session):
+    if not session.info.get("users_generation_bumped"):
+        bump_generation(session.connection(), principal_cache.name)
+        session.info["users_generation_bumped"] = True
+
+
+def _revoke_tokens(session: Session, user_id: Optional[int] = None):
+    revocations = session.info.setdefault("token_revocations", [])
+    revoked_at = revoked_tokens.record(session.connection(), user_id, bump=not revocations)
+    revocations.append((user_id, revoked_at))
+
+
+@event.listens_for(Session, "after_flush")
+def _collect_changed_users(session, flush_context):
+    changed = session.info.setdefault("changed_principals", set())
+    for obj in list(session.dirty) + list(session.deleted):
+        if isinstance(obj, DbUser) and (obj in session.deleted or session.is_modified(obj)):
+            changed.add(obj.username)
+            # A rename must also evict the old username
+            changed.update(inspect(obj).attrs.username.history.deleted or ())
+            _mark_users_changed(session)
+            if AUTH_CLAIMS_MODE:
+                _revoke_tokens(session, obj.id)
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _collect_bulk_user_changes(orm_execute_state):
+    if orm_execute_state.is_update or orm_execute_state.is_delete:
+        mapper = orm_execute_state.bind_mapper
+        if mapper is not None and mapper.class_ is DbUser:
+            session = orm_execute_state.session
+            session.info["clear_principals"] = True
+            _mark_users_changed(session)
+            if AUTH_CLAIMS_MODE:
+                _revoke_tokens(session)
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_principals(session):
+    session.info.pop("users_generation_bumped", None)
+    if session.info.pop("clear_principals", False):
+        principal_cache.clear()
+    for username in session.info.pop("changed_principals", ()):
+        principal_cache.invalidate(username)
+    for user_id, revoked_at in session.info.pop("token_revocations", ()):
+        revoked_tokens.apply(user_id, revoked_at)
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def _discard_principal_changes(session, previous_transaction):
+    session.info.pop("users_generation_bumped", None)
+    session.info.pop("clear_principals", None)
+    session.info.pop("changed_principals", None)
+    session.info.pop("token_revocations", None)
+
+
+if __name__ == "__main__":
+    import argparse
+    from db.database import SessionLocal
+    
+    parser = argparse.ArgumentParser(description="Revoke claims-mode tokens in every worker")
+    parser.add_argument("command", choices=["revoke-all", "revoke-user"])
+    parser.add_argument("user_id", type=int, nargs="?")
+    args = parser.parse_args()
+    if args.command == "revoke-user" and args.user_id is None:
+        parser.error("revoke-user needs a user id")
+    
+    with SessionLocal() as session:
+        revoked_tokens.record(session.connection(), args.user_id if args.command == "revoke-user" else None)
+        session.commit()
+    print(f"Tokens issued before now are rejected within {TOKEN_REVOCATION_MAX_AGE_SECONDS:g}s")
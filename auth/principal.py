@@ -0,0 +1,217 @@
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, Hashable, Optional
+from sqlalchemy import delete, insert, or_, select, update
+from db.catalog import bump_generation, read_generation
+from db.models import DbTokenRevocation, DbUser
+from enums import UserRole
+
+
+@dataclass(frozen=True)
+class Principal:
+    """Authenticated user as seen by the routers (detached from any session)"""
+    id: int
+    username: str
+    email: Optional[str]
+    role: UserRole
+    manager_id: Optional[int]
+    
+    @classmethod
+    def from_user(cls, user: DbUser) -> "Principal":
+        return cls(
+            id=user.id,
+            username=user.username,
+            email=user.email,
+            role=user.role,
+            manager_id=user.manager_id
+        )
+
+
+class PrincipalCache:
+    """
+    Bounded LRU cache of principals with a per-entry TTL
+    
+    A maxsize of 0 disables caching. Every invalidation bumps `generation`,
+    so a lookup that started before an invalidation cannot store a stale row.
+    
+    Writes to users bump the `users` generation in cache_generations; each
+    worker compares it with the one it last saw at most every
+    `max_age_seconds` and empties its cache when it moved, so a change made
+    by another worker is served stale for that long at most.
+    """
+    name = DbUser.__tablename__
+    
+    def __init__(self, maxsize: int, ttl_seconds: float, max_age_seconds: float = 5.0):
+        self.maxsize = maxsize
+        self.ttl_seconds = ttl_seconds
+        self.max_age_seconds = max_age_seconds
+        self.generation = 0
+        self.shared_generation: Optional[int] = None
+        self._checked_at = 0.0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def get(self, key: Hashable) -> Optional[Principal]:
+        with self._lock:
+            item = self._entries.get(key)
+            if item is None:
+                self.misses += 1
+                return None
+            principal, expires_at = item
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return principal
+    
+    def put(self, key: Hashable, principal: Principal, generation: Optional[int] = None):
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            if generation is not None and generation != self.generation:
+                return
+            self._entries[key] = (principal, time.monotonic() + self.ttl_seconds)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+    
+    def invalidate(self, key: Hashable):
+        with self._lock:
+            self.generation += 1
+            self.invalidations += 1
+            self._entries.pop(key, None)
+    
+    def clear(self):
+        with self._lock:
+            self.generation += 1
+            self.invalidations += 1
+            self._entries.clear()
+    
+    def refresh(self, connection) -> bool:
+        """Empty the cache if another worker changed users, returns whether it did"""
+        generation = read_generation(connection, self.name)
+        with self._lock:
+            self._checked_at = time.monotonic()
+            if generation == self.shared_generation:
+                return False
+            changed = self.shared_generation is not None
+            self.shared_generation = generation
+        if changed:
+            self.clear()
+        return changed
+    
+    def refresh_if_stale(self, connection) -> bool:
+        if self.maxsize <= 0:
+            return False
+        if self.shared_generation is None or time.monotonic() - self._checked_at >= self.max_age_seconds:
+            return self.refresh(connection)
+        return False
+    
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+                "ttl_seconds": self.ttl_seconds,
+                "max_age_seconds": self.max_age_seconds,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations
+            }
+
+
+class RevocationList:
+    """
+    Claims-mode token revocations, shared by all workers
+    
+    A revocation is a row in `token_revocations` (a user id, or ALL_USERS,
+    and a time); tokens issued before it are rejected. Each worker holds the
+    rows of the last `retention_seconds` (older ones can no longer match a
+    live token) and reloads them when the `token_revocations` generation in
+    cache_generations moved, checked at most every `max_age_seconds`. The
+    worker that revokes applies the revocation as soon as it commits.
+    """
+    name = DbTokenRevocation.__tablename__
+    ALL_USERS = 0
+    
+    def __init__(self, retention_seconds: float, max_age_seconds: float):
+        self.retention_seconds = retention_seconds
+        self.max_age_seconds = max_age_seconds
+        self.generation: Optional[int] = None
+        self._revoked_before: Dict[int, float] = {}
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+    
+    def record(self, connection, user_id: Optional[int] = None, bump: bool = True) -> float:
+        """
+        Store a revocation of `user_id` (None: every user) in the caller's
+        transaction and return its time; pass it to apply() after commit.
+        `bump` marks the revocations changed for other workers, once per
+        transaction is enough.
+        """
+        user_id = self.ALL_USERS if user_id is None else user_id
+        now = time.time()
+        updated = connection.execute(
+            update(DbTokenRevocation).where(DbTokenRevocation.user_id == user_id).values(revoked_at=now)
+        )
+        if updated.rowcount == 0:
+            connection.execute(insert(DbTokenRevocation).values(user_id=user_id, revoked_at=now))
+        if bump:
+            connection.execute(delete(DbTokenRevocation).where(
+                DbTokenRevocation.user_id != self.ALL_USERS,
+                DbTokenRevocation.revoked_at < now - self.retention_seconds
+            ))
+            bump_generation(connection, self.name)
+        return now
+    
+    def apply(self, user_id: Optional[int], revoked_at: float):
+        """Apply a committed revocation in this worker without waiting for a reload"""
+        user_id = self.ALL_USERS if user_id is None else user_id
+        with self._lock:
+            self._revoked_before[user_id] = max(self._revoked_before.get(user_id, 0.0), revoked_at)
+    
+    def refresh(self, connection) -> bool:
+        """Reload the revocations if another worker changed them, returns whether it did"""
+        generation = read_generation(connection, self.name)
+        if generation == self.generation:
+            with self._lock:
+                self._checked_at = time.monotonic()
+            return False
+        
+        cutoff = time.time() - self.retention_seconds
+        rows = connection.execute(
+            select(DbTokenRevocation.user_id, DbTokenRevocation.revoked_at).where(or_(
+                DbTokenRevocation.user_id == self.ALL_USERS, DbTokenRevocation.revoked_at >= cutoff
+            ))
+        ).all()
+        with self._lock:
+            # Revocations only move forward, keep anything applied meanwhile
+            revoked_before = {user_id: t for user_id, t in self._revoked_before.items() if t >= cutoff}
+            for user_id, revoked_at in rows:
+                revoked_before[user_id] = max(revoked_before.get(user_id, 0.0), revoked_at)
+            self._revoked_before = revoked_before
+            self.generation = generation
+            self._checked_at = time.monotonic()
+        return True
+    
+    def refresh_if_stale(self, connection) -> bool:
+        if self.generation is None or time.monotonic() - self._checked_at >= self.max_age_seconds:
+            return self.refresh(connection)
+        return False
+    
+    def is_revoked(self, user_id: int, issued_at: float) -> bool:
+        with self._lock:
+            revoked_at = max(self._revoked_before.get(self.ALL_USERS, 0.0), self._revoked_before.get(user_id, 0.0))
+        return issued_at < revoked_at
@@ -0,0 +1,99 @@
+"""
+Compare authenticated request throughput for the three ways a request can
+resolve its principal:
+
+- lookup:  users-table query on every request (principal cache disabled)
+- cache:   in-process principal cache
+- claims:  id/role/manager_id signed into the token, no database access
+
+Run from the project root:
+    python -m benchmarks.bench_auth_modes --requests 2000
+"""
+import argparse
+import os
+import tempfile
+import time
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from auth import oauth2
+from auth.hash import hash_password
+from db import migrations
+from db.database import get_db
+from db.models import DbUser
+from enums import UserRole
+from main import create_app
+
+
+def _setup_database(path: str, team_size: int):
+    engine = create_engine(f"sqlite:///{path}", connect_args={"check_same_thread": False})
+    migrations.upgrade(engine)
+    SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    
+    db = SessionLocal()
+    password = hash_password("benchpass")
+    manager = DbUser(username="bench_manager", email="bench_manager@example.com",
+                     password=password, role=UserRole.MANAGER)
+    db.add(manager)
+    db.commit()
+    db.add_all([
+        DbUser(username=f"bench_emp_{i}", email=f"bench_emp_{i}@example.com",
+               password=password, role=UserRole.EMPLOYEE, manager_id=manager.id)
+        for i in range(team_size)
+    ])
+    db.commit()
+    db.close()
+    return engine, SessionLocal
+
+
+def _run(client: TestClient, requests: int) -> float:
+    token = client.post("/login", data={"username": "bench_manager", "password": "benchpass"}).json()["access_token"]
+    headers = {"Authorization": f"Bearer {token}"}
+    for _ in range(50):
+        client.get("/timesheet-entries/team-entries", headers=headers)
+    
+    start = time.perf_counter()
+    for _ in range(requests):
+        response = client.get("/timesheet-entries/team-entries", headers=headers)
+        assert response.status_code == 200
+    return requests / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--team-size", type=int, default=10)
+    args = parser.parse_args()
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        engine, SessionLocal = _setup_database(os.path.join(tmp, "bench.db"), args.team_size)
+        
+        def override_get_db():
+            db = SessionLocal()
+            try:
+                yield db
+            finally:
+                db.close()
+        
+        app = create_app(bind=engine)
+        app.dependency_overrides[get_db] = override_get_db
+        maxsize = oauth2.principal_cache.maxsize
+        results = {}
+        try:
+            with TestClient(app) as client:
+                for mode, claims, cache_size in [("lookup", False, 0), ("cache", False, maxsize or 1024), ("claims", True, 0)]:
+                    oauth2.AUTH_CLAIMS_MODE = claims
+                    oauth2.principal_cache.maxsize = cache_size
+                    oauth2.principal_cache.clear()
+                    results[mode] = _run(client, args.requests)
+        finally:
+            oauth2.principal_cache.maxsize = maxsize
+    
+    baseline = results["lookup"]
+    print(f"{'mode':<8} {'req/s':>10} {'vs lookup':>10}")
+    for mode, rps in results.items():
+        print(f"{mode:<8} {rps:>10.1f} {rps / baseline:>9.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""
+Batch approval of submitted timesheets
+
+Seeds one manager with a team whose submitted timesheets add up to
+--timesheets, then approves all of them twice: once through
+review_timesheets_batch (set-based UPDATEs, one transaction) and once
+through review_timesheet per id (ORM load + commit per row), the way a
+client looping over POST /timesheets/{id}/approve would.
+
+Run from the project root:
+    python -m benchmarks.bench_batch_approval --timesheets 10000
+"""
+import argparse
+import os
+import tempfile
+import time
+from sqlalchemy import insert, update
+from sqlalchemy.orm import sessionmaker
+from db import db_timesheet, migrations
+from db.database import create_db_engine
+from db.models import DbTimesheet, DbUser
+from enums import ReviewAction, TimesheetStatus, UserRole
+from schemas import TimesheetBatchReview
+
+WEEKS_PER_EMPLOYEE = 50
+
+
+def _seed(SessionLocal, timesheets: int) -> tuple:
+    with SessionLocal() as db:
+        manager = DbUser(username="manager", email="manager@example.com", password="x", role=UserRole.MANAGER)
+        db.add(manager)
+        db.flush()
+        employees = -(-timesheets // WEEKS_PER_EMPLOYEE)
+        employee_ids = db.scalars(insert(DbUser).returning(DbUser.id), [
+            {"username": f"employee{i}", "email": f"employee{i}@example.com", "password": "x",
+             "role": UserRole.EMPLOYEE, "manager_id": manager.id}
+            for i in range(employees)
+        ]).all()
+        db.execute(insert(DbTimesheet), [
+            {"employee_id": employee_ids[i // WEEKS_PER_EMPLOYEE], "year": 2024,
+             "week_number": i % WEEKS_PER_EMPLOYEE + 1, "status": TimesheetStatus.SUBMITTED}
+            for i in range(timesheets)
+        ])
+        db.commit()
+        return manager.id, db.scalars(db.query(DbTimesheet.id).statement).all()
+
+
+def _reset(SessionLocal):
+    with SessionLocal() as db:
+        db.execute(update(DbTimesheet).values(status=TimesheetStatus.SUBMITTED, reviewed_at=None, reviewed_by=None))
+        db.commit()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--timesheets", type=int, default=10000)
+    args = parser.parse_args()
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_db_engine(f"sqlite:///{os.path.join(tmp, 'bench.db')}")
+        migrations.upgrade(engine)
+        SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+        manager_id, timesheet_ids = _seed(SessionLocal, args.timesheets)
+        
+        with SessionLocal() as db:
+            start = time.perf_counter()
+            result = db_timesheet.review_timesheets_batch(
+                db, manager_id, TimesheetBatchReview(timesheet_ids=timesheet_ids, action=ReviewAction.APPROVE)
+            )
+            batch_seconds = time.perf_counter() - start
+        assert result.updated == len(timesheet_ids)
+        
+        _reset(SessionLocal)
+        with SessionLocal() as db:
+            start = time.perf_counter()
+            for timesheet_id in timesheet_ids:
+                db_timesheet.review_timesheet(db, timesheet_id, manager_id, ReviewAction.APPROVE)
+            per_row_seconds = time.perf_counter() - start
+        engine.dispose()
+    
+    print(f"{'path':<10} {'timesheets':>10} {'seconds':>8} {'per second':>11}")
+    for path, seconds in (("batch", batch_seconds), ("per-row", per_row_seconds)):
+        print(f"{path:<10} {len(timesheet_ids):>10} {seconds:>8.2f} {len(timesheet_ids) / seconds:>11.0f}")
+    print(f"speedup: {per_row_seconds / batch_seconds:.0f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,212 @@
+"""
+Latency, throughput and queries per request of the main endpoints
+
+For each dataset size (timesheet entries), a temporary SQLite database is
+seeded with db.seeding (--managers teams of --team-size employees, as many
+weeks as the size needs) and an app from main.create_app is driven
+in-process through TestClient, one request at a time. Every scenario gets
+--warmup untimed requests, then --requests timed ones; p50/p95/p99 latency,
+requests per second and SQL statements per request are reported.
+TestClient adds a fixed per-request overhead, so compare runs with each
+other rather than with production numbers.
+
+Save results with --output and compare a later run against them with
+--baseline: the run fails (exit 1) when any scenario's p95 is more than
+--max-slowdown times the baseline's.
+
+Run from the project root (BCRYPT_ROUNDS sets the cost of /login):
+    python -m benchmarks.bench_endpoints --sizes 10000 100000 --output baseline.json
+    python -m benchmarks.bench_endpoints --sizes 10000 100000 --baseline baseline.json --max-slowdown 1.25
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+import sqlalchemy
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+from sqlalchemy.orm import sessionmaker
+from db import migrations, seeding
+from db.database import create_db_engine, get_db
+from db.db_project import project_catalog
+from main import create_app
+from schemas import SeedRequest
+
+PASSWORD = "benchpass"
+
+
+def _percentile(sorted_values: list, fraction: float) -> float:
+    index = min(len(sorted_values) - 1, round(fraction * (len(sorted_values) - 1)))
+    return sorted_values[index]
+
+
+class _Context:
+    """Tokens and ids the scenarios share"""
+    
+    def __init__(self, client: TestClient):
+        self.client = client
+        self.employee = self._login("employee1_1")
+        self.manager = self._login("manager1")
+        self.created = []
+        self.day = date.today() - timedelta(days=date.today().weekday())
+    
+    def _login(self, username: str) -> dict:
+        token = self.client.post("/login", data={"username": username, "password": PASSWORD}).json()["access_token"]
+        return {"Authorization": f"Bearer {token}"}
+    
+    def create_entry(self, i: int):
+        response = self.client.post(
+            "/timesheet-entries/",
+            json={"project_id": 1 + i % 2, "date": self.day.isoformat(), "hours": 1.0, "description": "Benchmark"},
+            headers=self.employee
+        )
+        self.created.append(response.json()["id"])
+        return response
+    
+    def update_entry(self, i: int):
+        entry_id = self.created[i % len(self.created)]
+        return self.client.put(f"/timesheet-entries/{entry_id}", json={"hours": 2.0 + i % 3}, headers=self.employee)
+    
+    def delete_entry(self, i: int):
+        return self.client.delete(f"/timesheet-entries/{self.created.pop()}", headers=self.employee)
+
+
+# name -> (request, expected status); create runs before update and delete
+SCENARIOS = {
+    "POST /login": (lambda ctx, i: ctx.client.post("/login", data={"username": "employee1_1", "password": PASSWORD}), 200),
+    "POST /timesheet-entries/": (_Context.create_entry, 201),
+    "PUT /timesheet-entries/{id}": (_Context.update_entry, 200),
+    "DELETE /timesheet-entries/{id}": (_Context.delete_entry, 204),
+    "GET my-entries?limit=100": (
+        lambda ctx, i: ctx.client.get("/timesheet-entries/my-entries?limit=100", headers=ctx.employee), 200
+    ),
+    "GET team-entries?limit=100": (
+        lambda ctx, i: ctx.client.get("/timesheet-entries/team-entries?limit=100", headers=ctx.manager), 200
+    ),
+    "GET /users/?limit=100": (lambda ctx, i: ctx.client.get("/users/?limit=100", headers=ctx.employee), 200),
+    "GET /health": (lambda ctx, i: ctx.client.get("/health"), 200),
+}
+
+
+def _run_size(size: int, args, tmp: str) -> list:
+    engine = create_db_engine(f"sqlite:///{os.path.join(tmp, f'bench_{size}.db')}")
+    migrations.upgrade(engine)
+    SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    employees = args.managers * args.team_size
+    with SessionLocal() as db:
+        seeded = seeding.seed(db, SeedRequest(
+            managers=args.managers, employees_per_manager=args.team_size, projects=args.projects,
+            weeks=max(1, size // (employees * 5)), password=PASSWORD
+        ))
+    print(f"Seeded {seeded.timesheet_entries} entries in {seeded.seconds:.1f}s", file=sys.stderr)
+    
+    statements = []
+    event.listen(engine, "before_cursor_execute", lambda *a: statements.append(1))
+    
+    def override_get_db():
+        db = SessionLocal()
+        try:
+            yield db
+        finally:
+            db.close()
+    
+    app = create_app(bind=engine)
+    app.dependency_overrides[get_db] = override_get_db
+    project_catalog.invalidate()
+    results = []
+    try:
+        with TestClient(app) as client:
+            ctx = _Context(client)
+            for name, (request, expected) in SCENARIOS.items():
+                # Warm up: caches, statement compilation, and rows for update/delete to work on
+                for i in range(args.warmup):
+                    request(ctx, i)
+                timings = []
+                statements.clear()
+                start = time.perf_counter()
+                for i in range(args.requests):
+                    began = time.perf_counter()
+                    response = request(ctx, i)
+                    timings.append((time.perf_counter() - began) * 1000)
+                    assert response.status_code == expected, (name, response.status_code, response.text)
+                elapsed = time.perf_counter() - start
+                timings.sort()
+                results.append({
+                    "size": seeded.timesheet_entries,
+                    "scenario": name,
+                    "requests": args.requests,
+                    "p50_ms": round(_percentile(timings, 0.50), 3),
+                    "p95_ms": round(_percentile(timings, 0.95), 3),
+                    "p99_ms": round(_percentile(timings, 0.99), 3),
+                    "mean_ms": round(statistics.fmean(timings), 3),
+                    "rps": round(args.requests / elapsed, 1),
+                    "queries_per_request": round(len(statements) / args.requests, 2),
+                })
+    finally:
+        engine.dispose()
+    return results
+
+
+def _regressions(results: list, baseline: list, max_slowdown: float) -> list:
+    previous = {(row["size"], row["scenario"]): row for row in baseline}
+    regressions = []
+    for row in results:
+        before = previous.get((row["size"], row["scenario"]))
+        if before and row["p95_ms"] > before["p95_ms"] * max_slowdown:
+            regressions.append((row, before, row["p95_ms"] / before["p95_ms"]))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000])
+    parser.add_argument("--managers", type=int, default=10)
+    parser.add_argument("--team-size", type=int, default=10)
+    parser.add_argument("--projects", type=int, default=20)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--warmup", type=int, default=20)
+    parser.add_argument("--output", help="write results as JSON")
+    parser.add_argument("--baseline", help="JSON results of an earlier run to compare with")
+    parser.add_argument("--max-slowdown", type=float, default=1.25, help="allowed p95 ratio against the baseline")
+    args = parser.parse_args()
+    if args.warmup < 1:
+        parser.error("--warmup must be at least 1 (update and delete need created entries)")
+    
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for size in args.sizes:
+            results.extend(_run_size(size, args, tmp))
+    
+    print(f"{'entries':>8} {'scenario':<32} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'req/s':>8} {'queries':>8}")
+    for row in results:
+        print(f"{row['size']:>8} {row['scenario']:<32} {row['p50_ms']:>8.2f} {row['p95_ms']:>8.2f} "
+              f"{row['p99_ms']:>8.2f} {row['rps']:>8.0f} {row['queries_per_request']:>8.2f}")
+    
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({
+                "created_at": datetime.utcnow().isoformat(timespec="seconds"),
+                "python": platform.python_version(),
+                "sqlalchemy": sqlalchemy.__version__,
+                "arguments": vars(args),
+                "results": results,
+            }, f, indent=2)
+    
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = _regressions(results, json.load(f)["results"], args.max_slowdown)
+        for row, before, ratio in regressions:
+            print(f"REGRESSION {row['size']} {row['scenario']}: p95 {before['p95_ms']:.2f} -> {row['p95_ms']:.2f} ms "
+                  f"({ratio:.2f}x > {args.max_slowdown:.2f}x)", file=sys.stderr)
+        if regressions:
+            sys.exit(1)
+        print(f"No p95 regression beyond {args.max_slowdown:.2f}x", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""
+Memory and time to first byte of entry exports
+
+For each dataset size, one employee's entries are encoded three ways:
+the streamed CSV and NDJSON exports (plain row tuples from a server-side
+cursor) and, for comparison, the non-streamed list path (ORM objects
+validated into a List[TimesheetEntryDisplay] and JSON-encoded at once).
+Peak Python memory is measured with tracemalloc, which also slows
+everything down; compare the paths with each other, not with production.
+
+Run from the project root:
+    python -m benchmarks.bench_export --sizes 10000 100000 1000000
+"""
+import argparse
+import os
+import tempfile
+import time
+import tracemalloc
+from typing import List
+from pydantic import TypeAdapter
+from sqlalchemy import delete, text
+from sqlalchemy.orm import sessionmaker
+from db import db_timesheet_entry, migrations
+from db.database import create_db_engine
+from db.models import DbProject, DbTimesheetEntry, DbUser
+from enums import UserRole
+from schemas import TimesheetEntryDisplay
+from serialization import iter_csv, iter_ndjson
+
+COLUMNS = [column.key for column in db_timesheet_entry.ENTRY_COLUMNS]
+
+
+def _seed(db, user_id: int, project_id: int, entries: int):
+    db.execute(delete(DbTimesheetEntry))
+    db.execute(text("""
+        INSERT INTO timesheet_entries (employee_id, project_id, date, hours, description)
+        WITH RECURSIVE n(i) AS (SELECT 0 UNION ALL SELECT i + 1 FROM n WHERE i < :entries - 1)
+        SELECT :user_id, :project_id, date('2020-01-01', '+' || (i % 2000) || ' days'), 1 + i % 8, 'Entry ' || i
+        FROM n
+    """), {"entries": entries, "user_id": user_id, "project_id": project_id})
+    db.commit()
+
+
+def _measure(produce) -> tuple:
+    """Consume an iterator of chunks; returns (first byte ms, total ms, peak MiB)"""
+    tracemalloc.start()
+    start = time.perf_counter()
+    first = None
+    for _ in produce():
+        if first is None:
+            first = time.perf_counter() - start
+    total = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return first * 1000, total * 1000, peak / 2 ** 20
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000, 1000000])
+    args = parser.parse_args()
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_db_engine(f"sqlite:///{os.path.join(tmp, 'bench.db')}")
+        migrations.upgrade(engine)
+        SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+        with SessionLocal() as db:
+            user = DbUser(username="payroll", email="payroll@example.com", password="x", role=UserRole.EMPLOYEE)
+            project = DbProject(name="Bench")
+            db.add_all([user, project])
+            db.commit()
+            user_id, project_id = user.id, project.id
+        
+        adapter = TypeAdapter(List[TimesheetEntryDisplay])
+        paths = {
+            "csv stream": lambda db: iter_csv(db_timesheet_entry.iter_entry_rows(db, employee_id=user_id), COLUMNS),
+            "ndjson stream": lambda db: iter_ndjson(db_timesheet_entry.iter_entry_rows(db, employee_id=user_id), COLUMNS),
+            "list (no stream)": lambda db: [adapter.dump_json(adapter.validate_python(
+                db_timesheet_entry.get_my_entries(db, user_id).items, from_attributes=True
+            ))],
+        }
+        
+        print(f"{'rows':>8} {'path':<18} {'first byte ms':>14} {'total ms':>10} {'peak MiB':>9}")
+        for size in args.sizes:
+            with SessionLocal() as db:
+                _seed(db, user_id, project_id, size)
+            for name, path in paths.items():
+                with SessionLocal() as db:
+                    first, total, peak = _measure(lambda: path(db))
+                print(f"{size:>8} {name:<18} {first:>14.1f} {total:>10.1f} {peak:>9.1f}")
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""
+Fetch + encode cost of list responses, per serialization path
+
+For each size, the same entries are read and encoded as the JSON array
+GET /timesheet-entries/my-entries returns:
+  - orm + jsonable_encoder: ORM objects -> Pydantic models -> jsonable_encoder -> json.dumps
+  - orm + pydantic: ORM objects validated and dumped by a TypeAdapter (the default path)
+  - rows + json: plain row tuples -> dicts -> stdlib json (fast path without orjson)
+  - rows + orjson: plain row tuples -> dicts -> orjson (FAST_JSON_RESPONSES=1)
+
+Run from the project root:
+    python -m benchmarks.bench_json_lists --sizes 1000 10000 100000
+"""
+import argparse
+import json
+import os
+import statistics
+import tempfile
+import time
+from typing import List
+from fastapi.encoders import jsonable_encoder
+from pydantic import TypeAdapter
+from sqlalchemy import delete, text
+from sqlalchemy.orm import sessionmaker
+import serialization
+from db import db_timesheet_entry, migrations
+from db.database import create_db_engine
+from db.models import DbProject, DbTimesheetEntry, DbUser
+from enums import UserRole
+from schemas import TimesheetEntryDisplay
+
+ADAPTER = TypeAdapter(List[TimesheetEntryDisplay])
+
+
+def _orm_jsonable(db, user_id):
+    models = [TimesheetEntryDisplay.model_validate(entry) for entry in db_timesheet_entry.get_my_entries(db, user_id).items]
+    return json.dumps(jsonable_encoder(models)).encode("utf-8")
+
+
+def _orm_pydantic(db, user_id):
+    return ADAPTER.dump_json(ADAPTER.validate_python(db_timesheet_entry.get_my_entries(db, user_id).items, from_attributes=True))
+
+
+def _rows(db, user_id, use_orjson):
+    rows = db_timesheet_entry.get_my_entries(db, user_id, columns=db_timesheet_entry.ENTRY_COLUMNS).items
+    saved, serialization.orjson = serialization.orjson, serialization.orjson if use_orjson else None
+    try:
+        return serialization.encode_rows(rows)
+    finally:
+        serialization.orjson = saved
+
+
+PATHS = {
+    "orm + jsonable_encoder": _orm_jsonable,
+    "orm + pydantic": _orm_pydantic,
+    "rows + json": lambda db, user_id: _rows(db, user_id, False),
+    "rows + orjson": lambda db, user_id: _rows(db, user_id, True),
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    if serialization.orjson is None:
+        parser.error("orjson is not installed")
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_db_engine(f"sqlite:///{os.path.join(tmp, 'bench.db')}")
+        migrations.upgrade(engine)
+        SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+        with SessionLocal() as db:
+            user = DbUser(username="lister", email="lister@example.com", password="x", role=UserRole.EMPLOYEE)
+            project = DbProject(name="Bench")
+            db.add_all([user, project])
+            db.commit()
+            user_id, project_id = user.id, project.id
+        
+        print(f"{'rows':>7} {'path':<24} {'median ms':>10} {'rows/s':>11} {'speedup':>8}")
+        for size in args.sizes:
+            with SessionLocal() as db:
+                db.execute(delete(DbTimesheetEntry))
+                db.execute(text("""
+                    INSERT INTO timesheet_entries (employee_id, project_id, date, hours, description)
+                    WITH RECURSIVE n(i) AS (SELECT 0 UNION ALL SELECT i + 1 FROM n WHERE i < :size - 1)
+                    SELECT :user_id, :project_id, date('2020-01-01', '+' || (i % 2000) || ' days'), 1 + i % 8, 'Entry ' || i
+                    FROM n
+                """), {"size": size, "user_id": user_id, "project_id": project_id})
+                db.commit()
+            
+            outputs, medians = set(), {}
+            for name, path in PATHS.items():
+                timings = []
+                for _ in range(args.repeat):
+                    with SessionLocal() as db:
+                        start = time.perf_counter()
+                        body = path(db, user_id)
+                        timings.append(time.perf_counter() - start)
+                outputs.add(json.dumps(json.loads(body), sort_keys=True))
+                medians[name] = statistics.median(timings)
+            assert len(outputs) == 1, "paths disagree"
+            
+            baseline = medians["orm + jsonable_encoder"]
+            for name, seconds in medians.items():
+                print(f"{size:>7} {name:<24} {seconds * 1000:>10.1f} {size / seconds:>11.0f} {baseline / seconds:>7.1f}x")
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
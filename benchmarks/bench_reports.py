@@ -0,0 +1,99 @@
+"""
+Response times of GET /reports/hours on a synthetic dataset
+
+Generates --entries timesheet entries (default 10M) for --managers teams
+of --team-size employees, spread over two years and --projects projects,
+builds the weekly_project_hours aggregate, then times the reports one
+manager would run. Each report is run --repeat times; the median is shown.
+
+Data generation uses a recursive CTE and is SQLite specific. Expect a few
+minutes and about 1 GB of temporary disk for 10M entries.
+
+Run from the project root:
+    python -m benchmarks.bench_reports --entries 10000000
+"""
+import argparse
+import os
+import statistics
+import tempfile
+import time
+from datetime import date
+from sqlalchemy import insert, text
+from sqlalchemy.orm import sessionmaker
+from db import db_report, db_weekly_hours, migrations
+from db.database import create_db_engine
+from db.models import DbProject, DbUser
+from enums import ReportGroup, UserRole
+from schemas import TeamEntryFilter
+
+REPORTS = {
+    "by project (all time)": ([ReportGroup.PROJECT], TeamEntryFilter()),
+    "by employee x week (quarter)": (
+        [ReportGroup.EMPLOYEE, ReportGroup.WEEK], TeamEntryFilter(from_date=date(2025, 1, 6), to_date=date(2025, 4, 6))
+    ),
+    "by project x month (year)": (
+        [ReportGroup.PROJECT, ReportGroup.MONTH], TeamEntryFilter(from_date=date(2025, 1, 1), to_date=date(2025, 12, 31))
+    ),
+    "by day (one month)": ([ReportGroup.DAY], TeamEntryFilter(from_date=date(2025, 3, 1), to_date=date(2025, 3, 31))),
+}
+
+
+def _seed(SessionLocal, entries: int, managers: int, team_size: int, projects: int) -> int:
+    with SessionLocal() as db:
+        manager_ids = db.scalars(insert(DbUser).returning(DbUser.id), [
+            {"username": f"manager{m}", "email": f"manager{m}@example.com", "password": "x", "role": UserRole.MANAGER}
+            for m in range(managers)
+        ]).all()
+        db.execute(insert(DbUser), [
+            {"username": f"employee{m}_{e}", "email": f"employee{m}_{e}@example.com", "password": "x",
+             "role": UserRole.EMPLOYEE, "manager_id": manager_id}
+            for m, manager_id in enumerate(manager_ids) for e in range(team_size)
+        ])
+        db.execute(insert(DbProject), [{"name": f"Project {p}"} for p in range(projects)])
+        first_employee = max(manager_ids) + 1
+        db.execute(text("""
+            INSERT INTO timesheet_entries (employee_id, project_id, date, hours)
+            WITH RECURSIVE n(i) AS (SELECT 0 UNION ALL SELECT i + 1 FROM n WHERE i < :entries - 1)
+            SELECT :first_employee + i % :employees,
+                   1 + (i / 7) % :projects,
+                   date('2024-01-01', '+' || ((i / :employees) % 730) || ' days'),
+                   1 + i % 8
+            FROM n
+        """), {"entries": entries, "first_employee": first_employee, "employees": managers * team_size, "projects": projects})
+        db.commit()
+        db_weekly_hours.rebuild_weekly_hours(db)
+        return manager_ids[0]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--entries", type=int, default=10_000_000)
+    parser.add_argument("--managers", type=int, default=20)
+    parser.add_argument("--team-size", type=int, default=50)
+    parser.add_argument("--projects", type=int, default=40)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_db_engine(f"sqlite:///{os.path.join(tmp, 'bench.db')}")
+        migrations.upgrade(engine)
+        SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+        
+        start = time.perf_counter()
+        manager_id = _seed(SessionLocal, args.entries, args.managers, args.team_size, args.projects)
+        print(f"Seeded {args.entries} entries in {time.perf_counter() - start:.1f}s\n")
+        
+        print(f"{'report':<30} {'source':<22} {'rows':>6} {'median ms':>10}")
+        with SessionLocal() as db:
+            for name, (group_by, filters) in REPORTS.items():
+                timings = []
+                for _ in range(args.repeat):
+                    start = time.perf_counter()
+                    report = db_report.get_hours_report(db, group_by, filters, manager_id=manager_id)
+                    timings.append((time.perf_counter() - start) * 1000)
+                print(f"{name:<30} {report.source:<22} {len(report.rows):>6} {statistics.median(timings):>10.1f}")
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""
+Concurrent write throughput of the SQLite engine profiles
+
+Each thread inserts timesheet entries in its own session, one commit per
+entry, the way POST /timesheet-entries/ does. Reports commits per second
+and how many writes failed with "database is locked".
+
+Run from the project root:
+    python -m benchmarks.bench_sqlite_writes --threads 8 --writes 200
+"""
+import argparse
+import os
+import tempfile
+import threading
+import time
+from datetime import date
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import sessionmaker
+from db import migrations
+from db.database import ENGINE_PROFILES, create_db_engine
+from db.models import DbProject, DbTimesheetEntry, DbUser
+from enums import UserRole
+
+
+def _run(profile: str, path: str, threads: int, writes: int) -> dict:
+    engine = create_db_engine(f"sqlite:///{path}", profile=profile)
+    migrations.upgrade(engine)
+    SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    
+    with SessionLocal() as db:
+        user = DbUser(username="writer", email="writer@example.com", password="x", role=UserRole.EMPLOYEE)
+        project = DbProject(name="Bench")
+        db.add_all([user, project])
+        db.commit()
+        user_id, project_id = user.id, project.id
+    
+    failures = []
+    
+    def writer():
+        for _ in range(writes):
+            db = SessionLocal()
+            try:
+                db.add(DbTimesheetEntry(employee_id=user_id, project_id=project_id, date=date.today(), hours=1.0))
+                db.commit()
+            except OperationalError:
+                db.rollback()
+                failures.append(1)
+            finally:
+                db.close()
+    
+    workers = [threading.Thread(target=writer) for _ in range(threads)]
+    start = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    elapsed = time.perf_counter() - start
+    engine.dispose()
+    
+    committed = threads * writes - len(failures)
+    return {"commits_per_second": committed / elapsed, "locked_errors": len(failures), "seconds": elapsed}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--writes", type=int, default=200, help="writes per thread")
+    args = parser.parse_args()
+    
+    print(f"{'profile':<12} {'commits/s':>10} {'locked':>8} {'seconds':>8}")
+    for profile in ENGINE_PROFILES:
+        with tempfile.TemporaryDirectory() as tmp:
+            result = _run(profile, os.path.join(tmp, "bench.db"), args.threads, args.writes)
+        print(f"{profile:<12} {result['commits_per_second']:>10.1f} {result['locked_errors']:>8} {result['seconds']:>8.2f}")
+
+
+if __name__ == "__main__":
+    main()
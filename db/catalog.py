@@ -0,0 +1,170 @@
+"""
+In-process catalogs of reference data
+
+Small tables that rarely change (projects) are held in memory by every
+worker, keyed by id. Each catalog has a row in `cache_generations`; any
+transaction that writes the catalog's table bumps that generation, and the
+committing worker drops its copy right away. Other workers compare the
+generation they loaded with the database one at most every
+`max_age_seconds`, and whenever a key is not found, so a hit costs no
+queries and a row created by another worker is found on first use.
+
+Writers that bypass the ORM session (raw SQL, Core inserts on a connection)
+must call bump_generation themselves.
+"""
+import threading
+import time
+from typing import Callable, Dict, Hashable, List, Optional
+from sqlalchemy import event, insert, select, update
+from sqlalchemy.engine import Connection
+from sqlalchemy.orm import Session
+from db.models import DbCacheGeneration
+
+_CATALOGS: Dict[type, "ReferenceCatalog"] = {}
+
+
+def read_generation(connection, name: str) -> int:
+    """Current generation of a catalog (0 before its first write)"""
+    generation = connection.execute(
+        select(DbCacheGeneration.generation).where(DbCacheGeneration.name == name)
+    ).scalar()
+    return generation or 0
+
+
+def bump_generation(connection, name: str):
+    """Mark a catalog as changed, in the caller's transaction"""
+    bumped = connection.execute(
+        update(DbCacheGeneration)
+        .where(DbCacheGeneration.name == name)
+        .values(generation=DbCacheGeneration.generation + 1)
+    )
+    if bumped.rowcount == 0:
+        connection.execute(insert(DbCacheGeneration).values(name=name, generation=1))
+
+
+class ReferenceCatalog:
+    """
+    All rows of one model, loaded by `load(db) -> {key: item}`
+    
+    Items should be immutable (e.g. NamedTuples), they are shared between
+    requests and threads.
+    """
+    
+    def __init__(self, model: type, load: Callable[[Session], dict], max_age_seconds: float):
+        self.name = model.__tablename__
+        self.max_age_seconds = max_age_seconds
+        self.generation: Optional[int] = None
+        self.hits = 0
+        self.misses = 0
+        self.reloads = 0
+        self.invalidations = 0
+        self._load = load
+        self._items = {}
+        self._checked_at = 0.0
+        self._local_generation = 0
+        self._lock = threading.Lock()
+        _CATALOGS[model] = self
+    
+    def refresh(self, db: Session):
+        """Reload the items if another transaction changed them since they were loaded"""
+        with self._lock:
+            local_generation = self._local_generation
+            loaded = self.generation
+        generation = read_generation(db, self.name)
+        if generation == loaded:
+            with self._lock:
+                self._checked_at = time.monotonic()
+            return
+        
+        items = self._load(db)
+        with self._lock:
+            # A commit invalidated the catalog while it was loading; the next call reloads
+            if local_generation != self._local_generation:
+                return
+            self._items = items
+            self.generation = generation
+            self._checked_at = time.monotonic()
+            self.reloads += 1
+    
+    def _ensure_fresh(self, db: Session):
+        if self.generation is None or time.monotonic() - self._checked_at >= self.max_age_seconds:
+            self.refresh(db)
+    
+    def get(self, db: Session, key: Hashable):
+        """The item for `key`, or None; unknown keys re-check the generation first"""
+        self._ensure_fresh(db)
+        item = self._items.get(key)
+        if item is None:
+            self.refresh(db)
+            item = self._items.get(key)
+        with self._lock:
+            if item is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return item
+    
+    def values(self, db: Session) -> List:
+        """All items, ordered by key"""
+        self._ensure_fresh(db)
+        items = self._items
+        return [items[key] for key in sorted(items)]
+    
+    def invalidate(self):
+        with self._lock:
+            self._local_generation += 1
+            self.invalidations += 1
+            self.generation = None
+            self._items = {}
+    
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "size": len(self._items),
+                "generation": self.generation,
+                "max_age_seconds": self.max_age_seconds,
+                "hits": self.hits,
+                "misses": self.misses,
+                "reloads": self.reloads,
+                "invalidations": self.invalidations
+            }
+
+
+# Write-through invalidation - ORM writes to a catalog's table bump its
+# generation in the same transaction, the local copy is dropped on commit
+def _mark_changed(session: Session, connection: Connection, catalog: ReferenceCatalog):
+    changed = session.info.setdefault("changed_catalogs", set())
+    if catalog.name not in changed:
+        bump_generation(connection, catalog.name)
+        changed.add(catalog.name)
+
+
+@event.listens_for(Session, "before_flush")
+def _collect_catalog_writes(session, flush_context, instances):
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        catalog = _CATALOGS.get(type(obj))
+        if catalog is not None and (obj not in session.dirty or session.is_modified(obj)):
+            _mark_changed(session, session.connection(), catalog)
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _collect_bulk_catalog_writes(orm_execute_state):
+    if orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete:
+        mapper = orm_execute_state.bind_mapper
+        catalog = _CATALOGS.get(mapper.class_) if mapper is not None else None
+        if catalog is not None:
+            session = orm_execute_state.session
+            _mark_changed(session, session.connection(), catalog)
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_catalogs(session):
+    names = session.info.pop("changed_catalogs", ())
+    for catalog in _CATALOGS.values():
+        if catalog.name in names:
+            catalog.invalidate()
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def _discard_catalog_writes(session, previous_transaction):
+    session.info.pop("changed_catalogs", None)
@@ -1,7 +1,10 @@
 import os
-from sqlalchemy import create_engine
+import time
+from sqlalchemy import create_engine, event
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import QueuePool
+import metrics
 
 # Database URL - can be overridden with environment variable
 SQLALCHEMY_DATABASE_URL = os.getenv(
@@ -9,12 +12,95 @@ SQLALCHEMY_DATABASE_URL = os.getenv(
     "sqlite:///./timesheet.db"
 )
 
-# Create engine
-engine = create_engine(
-    SQLALCHEMY_DATABASE_URL,
-    connect_args={"check_same_thread": False} if "sqlite" in SQLALCHEMY_DATABASE_URL else {}
+# Engine profile - "production" tunes SQLite for concurrent access,
+# "default" keeps the driver's stock settings
+DB_PROFILE = os.getenv("DB_PROFILE", "production")
+
+ENGINE_PROFILES = {
+    "default": {},
+    "production": {
+        "journal_mode": "WAL",          # readers no longer block the writer
+        "synchronous": "NORMAL",        # fsync at checkpoints only, safe with WAL
+        "busy_timeout": 5000,           # wait for locks (ms) instead of failing
+        "mmap_size": 268435456,         # 256 MiB memory-mapped reads
+        "cache_size": -65536,           # 64 MiB page cache (negative = KiB)
+    },
+}
+
+# Connection pool sizing (ignored for in-memory SQLite)
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT = int(os.getenv("DB_POOL_TIMEOUT", "30"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "-1"))
+
+
+db_pool_checkout_seconds = metrics.Histogram(
+    "db_pool_checkout_seconds", "Time to get a pooled connection, waiting for a free one or opening a new one included"
 )
 
+
+class TimedQueuePool(QueuePool):
+    """QueuePool that records how long each checkout takes"""
+    
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            db_pool_checkout_seconds.observe(time.perf_counter() - started)
+
+
+def sqlite_pragmas(profile: str) -> dict:
+    """PRAGMAs for a profile, each overridable with SQLITE_<NAME> (e.g. SQLITE_BUSY_TIMEOUT)"""
+    pragmas = dict(ENGINE_PROFILES[profile])
+    for name in ENGINE_PROFILES["production"]:
+        value = os.getenv(f"SQLITE_{name.upper()}")
+        if value is not None:
+            pragmas[name] = value
+    return pragmas
+
+
+def create_db_engine(url: str, profile: str = DB_PROFILE):
+    """Create an engine with the pool and SQLite settings of a profile"""
+    is_sqlite = "sqlite" in url
+    kwargs = {"connect_args": {"check_same_thread": False} if is_sqlite else {}}
+    if not (is_sqlite and (url.endswith(":memory:") or url.rstrip("/") == "sqlite:")):
+        kwargs.update(
+            poolclass=TimedQueuePool,
+            pool_size=DB_POOL_SIZE,
+            max_overflow=DB_MAX_OVERFLOW,
+            pool_timeout=DB_POOL_TIMEOUT,
+            pool_recycle=DB_POOL_RECYCLE,
+        )
+    new_engine = create_engine(url, **kwargs)
+    
+    pragmas = sqlite_pragmas(profile) if is_sqlite else {}
+    if pragmas:
+        @event.listens_for(new_engine, "connect")
+        def _apply_sqlite_pragmas(dbapi_connection, connection_record):
+            cursor = dbapi_connection.cursor()
+            for name, value in pragmas.items():
+                cursor.execute(f"PRAGMA {name}={value}")
+            cursor.close()
+    
+    return new_engine
+
+
+# Create engine
+engine = create_db_engine(SQLALCHEMY_DATABASE_URL)
+
+# Pool occupancy of the application engine, read when metrics are exposed
+def _pool_overflow():
+    # QueuePool counts unopened pool slots as negative overflow
+    return max(0, engine.pool.overflow()) if isinstance(engine.pool, QueuePool) else None
+
+
+metrics.Gauge("db_pool_size", "Connections the pool keeps open",
+              lambda: engine.pool.size() if isinstance(engine.pool, QueuePool) else None)
+metrics.Gauge("db_pool_checked_out", "Pooled connections in use",
+              lambda: engine.pool.checkedout() if isinstance(engine.pool, QueuePool) else None)
+metrics.Gauge("db_pool_overflow", "Connections open beyond the pool size", _pool_overflow)
+
 # Session factory
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
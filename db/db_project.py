@@ -1,11 +1,36 @@
+import os
+from bisect import bisect_right
+from typing import NamedTuple, Optional
+from sqlalchemy import select
 from sqlalchemy.orm import Session
 from fastapi import HTTPException, status
+from db.catalog import ReferenceCatalog
 from db.models import DbProject
+from db.pagination import Page, decode_cursor, encode_cursor
 from schemas import ProjectCreate
 
+# How stale another worker's project changes may be seen (0 re-checks on every read)
+PROJECT_CATALOG_MAX_AGE_SECONDS = float(os.getenv("PROJECT_CATALOG_MAX_AGE_SECONDS", "5"))
+
+
+class ProjectInfo(NamedTuple):
+    """A project as held by the catalog, with the fields of ProjectDisplay"""
+    id: int
+    name: str
+    description: Optional[str]
+
+
+def _load_projects(db: Session) -> dict:
+    rows = db.execute(select(DbProject.id, DbProject.name, DbProject.description))
+    return {row.id: ProjectInfo(*row) for row in rows}
+
+
+# Projects are reference data: loaded once per worker, invalidated on write
+project_catalog = ReferenceCatalog(DbProject, _load_projects, PROJECT_CATALOG_MAX_AGE_SECONDS)
+
 
 def create_project(db: Session, request: ProjectCreate) -> DbProject:
-    """Create a new project"""
+    """Create a new project (the project catalog picks it up on commit)"""
     # Check if project name already exists
     existing_project = db.query(DbProject).filter(DbProject.name == request.name).first()
     if existing_project:
@@ -25,9 +50,9 @@ def create_project(db: Session, request: ProjectCreate) -> DbProject:
     return new_project
 
 
-def get_project(db: Session, project_id: int) -> DbProject:
-    """Get project by ID"""
-    project = db.query(DbProject).filter(DbProject.id == project_id).first()
+def get_project(db: Session, project_id: int) -> ProjectInfo:
+    """Get project by ID (from the project catalog)"""
+    project = project_catalog.get(db, project_id)
     if not project:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -36,6 +61,22 @@ def get_project(db: Session, project_id: int) -> DbProject:
     return project
 
 
-def get_all_projects(db: Session):
-    """Get all projects"""
-    return db.query(DbProject).all()
+def get_projects_version(db: Session) -> tuple:
+    """Change signal of the project list: the catalog generation"""
+    project_catalog.values(db)
+    return (project_catalog.generation,)
+
+
+def get_all_projects(
+    db: Session,
+    limit: Optional[int] = None,
+    cursor: Optional[str] = None
+) -> Page:
+    """Get all projects, ordered by id (keyset paginated over the project catalog)"""
+    projects = project_catalog.values(db)
+    if cursor is not None:
+        after = decode_cursor(cursor, [DbProject.id])[0]
+        projects = projects[bisect_right([project.id for project in projects], after):]
+    if limit is None or len(projects) <= limit:
+        return Page(projects, None)
+    return Page(projects[:limit], encode_cursor([projects[limit - 1].id]))
@@ -0,0 +1,133 @@
+"""
+Hours reports aggregated in SQL
+
+Reports are a single GROUP BY over the requested dimensions. When every
+dimension and filter lines up with ISO weeks (no day or month grouping,
+date range starting on a Monday and ending on a Sunday) the report is
+read from the weekly_project_hours aggregate instead of timesheet_entries.
+"""
+from typing import List, Optional
+from sqlalchemy import extract, func, select, tuple_
+from sqlalchemy.orm import Session
+from fastapi import HTTPException, status
+from db.models import DbTimesheetEntry, DbUser, DbWeeklyProjectHours
+from db.sql_functions import iso_week, iso_year
+from schemas import HoursReport, HoursReportRow, TeamEntryFilter
+from enums import ReportGroup
+
+PERIOD_GROUPS = (ReportGroup.DAY, ReportGroup.WEEK, ReportGroup.MONTH)
+
+
+def _format_period(group: ReportGroup, row) -> Optional[str]:
+    if group == ReportGroup.DAY:
+        return row.period_1.isoformat()
+    if group == ReportGroup.WEEK:
+        return f"{row.period_1}-W{row.period_2:02d}"
+    if group == ReportGroup.MONTH:
+        return f"{row.period_1}-{row.period_2:02d}"
+    return None
+
+
+def _use_weekly_aggregate(group_by: List[ReportGroup], filters: TeamEntryFilter) -> bool:
+    return (
+        ReportGroup.DAY not in group_by
+        and ReportGroup.MONTH not in group_by
+        and (filters.from_date is None or filters.from_date.weekday() == 0)
+        and (filters.to_date is None or filters.to_date.weekday() == 6)
+    )
+
+
+def _report_statement(source, group_by: List[ReportGroup], filters: TeamEntryFilter, scope):
+    weekly = source is DbWeeklyProjectHours
+    keys = []
+    if ReportGroup.PROJECT in group_by:
+        keys.append(source.project_id.label("project_id"))
+    if ReportGroup.EMPLOYEE in group_by:
+        keys.append(source.employee_id.label("employee_id"))
+    if ReportGroup.DAY in group_by:
+        keys.append(source.date.label("period_1"))
+    elif ReportGroup.WEEK in group_by:
+        keys += [
+            (source.year if weekly else iso_year(source.date)).label("period_1"),
+            (source.week_number if weekly else iso_week(source.date)).label("period_2")
+        ]
+    elif ReportGroup.MONTH in group_by:
+        keys += [extract("year", source.date).label("period_1"), extract("month", source.date).label("period_2")]
+    
+    totals = [
+        func.sum(source.total_hours if weekly else source.hours).label("total_hours"),
+        func.sum(source.entry_count).label("entry_count") if weekly else func.count(source.id).label("entry_count")
+    ]
+    stmt = select(*keys, *totals).where(scope(source.employee_id))
+    
+    if filters.employee_id is not None:
+        stmt = stmt.where(source.employee_id == filters.employee_id)
+    if filters.project_id is not None:
+        stmt = stmt.where(source.project_id == filters.project_id)
+    if weekly:
+        if filters.from_date is not None:
+            stmt = stmt.where(tuple_(source.year, source.week_number) >= tuple(filters.from_date.isocalendar()[:2]))
+        if filters.to_date is not None:
+            stmt = stmt.where(tuple_(source.year, source.week_number) <= tuple(filters.to_date.isocalendar()[:2]))
+    else:
+        if filters.from_date is not None:
+            stmt = stmt.where(source.date >= filters.from_date)
+        if filters.to_date is not None:
+            stmt = stmt.where(source.date <= filters.to_date)
+    
+    return stmt.group_by(*keys).order_by(*keys) if keys else stmt
+
+
+def get_hours_report(
+    db: Session,
+    group_by: List[ReportGroup],
+    filters: TeamEntryFilter,
+    manager_id: Optional[int] = None,
+    employee_id: Optional[int] = None
+) -> HoursReport:
+    """
+    Total hours and entry counts grouped by project, employee and/or one period
+    
+    Scoped to a manager's team (manager_id) or to one employee (employee_id).
+    """
+    group_by = list(dict.fromkeys(group_by))
+    periods = [group for group in group_by if group in PERIOD_GROUPS]
+    if len(periods) > 1:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Group by at most one of day, week and month"
+        )
+    if filters.from_date and filters.to_date and filters.from_date > filters.to_date:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="from_date must not be after to_date"
+        )
+    
+    if manager_id is not None:
+        team_member_ids = select(DbUser.id).where(DbUser.manager_id == manager_id)
+        scope = lambda column: column.in_(team_member_ids)
+    else:
+        scope = lambda column: column == employee_id
+    
+    source = DbWeeklyProjectHours if _use_weekly_aggregate(group_by, filters) else DbTimesheetEntry
+    rows = db.execute(_report_statement(source, group_by, filters, scope)).all()
+    
+    period = periods[0] if periods else None
+    report_rows = [
+        HoursReportRow(
+            project_id=getattr(row, "project_id", None),
+            employee_id=getattr(row, "employee_id", None),
+            period=_format_period(period, row),
+            total_hours=row.total_hours or 0.0,
+            entry_count=row.entry_count or 0
+        )
+        for row in rows
+        if row.entry_count
+    ]
+    return HoursReport(
+        group_by=group_by,
+        source=source.__tablename__,
+        total_hours=sum(row.total_hours for row in report_rows),
+        entry_count=sum(row.entry_count for row in report_rows),
+        rows=report_rows
+    )
@@ -0,0 +1,253 @@
+from datetime import date, datetime, timedelta
+from typing import NamedTuple, Optional, Tuple
+from sqlalchemy import insert, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from fastapi import HTTPException, status
+from db.models import DbTimesheet, DbTimesheetEntry, DbUser
+from db.pagination import Page, paginate
+from db.sql_functions import UPSERT_INSERTS
+from schemas import TimesheetSubmit, TimesheetBatchReview, TimesheetBatchReviewResult
+from enums import TimesheetStatus, ReviewAction
+
+# Ids per UPDATE statement in batch reviews, well below SQLite's bound parameter limit
+REVIEW_CHUNK_SIZE = 1000
+
+# Weeks whose entries can no longer be created, changed or deleted
+LOCKED_STATUSES = (TimesheetStatus.SUBMITTED, TimesheetStatus.APPROVED)
+
+
+class WeekTimesheet(NamedTuple):
+    id: int
+    status: TimesheetStatus
+
+
+def week_bounds(year: int, week_number: int) -> Tuple[date, date]:
+    """Monday and Sunday of an ISO week"""
+    try:
+        monday = date.fromisocalendar(year, week_number, 1)
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Week {week_number} of {year} does not exist"
+        )
+    return monday, monday + timedelta(days=6)
+
+
+def _week_timesheet(db: Session, employee_id: int, year: int, week_number: int) -> Optional[WeekTimesheet]:
+    row = db.execute(select(DbTimesheet.id, DbTimesheet.status).where(
+        DbTimesheet.employee_id == employee_id,
+        DbTimesheet.week_number == week_number,
+        DbTimesheet.year == year
+    )).first()
+    return WeekTimesheet(*row) if row is not None else None
+
+
+def ensure_timesheet(db: Session, employee_id: int, year: int, week_number: int) -> WeekTimesheet:
+    """
+    Id and status of the employee's timesheet for an ISO week, created as a draft if missing
+    
+    A single INSERT ... ON CONFLICT DO NOTHING RETURNING on the
+    unique_employee_week_timesheet constraint: concurrent writers for the same
+    week never fail, and the row is only read back when it already existed.
+    Callers writing entries must check the status (see writable_timesheet).
+    Does not commit.
+    """
+    values = {"employee_id": employee_id, "year": year, "week_number": week_number, "status": TimesheetStatus.DRAFT}
+    dialect_insert = UPSERT_INSERTS.get(db.get_bind().dialect.name)
+    
+    if dialect_insert is not None:
+        timesheet_id = db.scalar(
+            dialect_insert(DbTimesheet)
+            .values(**values)
+            .on_conflict_do_nothing(index_elements=["employee_id", "week_number", "year"])
+            .returning(DbTimesheet.id)
+        )
+        if timesheet_id is not None:
+            return WeekTimesheet(timesheet_id, TimesheetStatus.DRAFT)
+        return _week_timesheet(db, employee_id, year, week_number)
+    
+    # Other databases: read, then insert in a savepoint and re-read if another writer won
+    timesheet = _week_timesheet(db, employee_id, year, week_number)
+    if timesheet is None:
+        try:
+            with db.begin_nested():
+                timesheet_id = db.scalar(insert(DbTimesheet).values(**values).returning(DbTimesheet.id))
+            timesheet = WeekTimesheet(timesheet_id, TimesheetStatus.DRAFT)
+        except IntegrityError:
+            timesheet = _week_timesheet(db, employee_id, year, week_number)
+    return timesheet
+
+
+def locked_week_error(timesheet: WeekTimesheet, year: int, week_number: int) -> Optional[str]:
+    """Why entries of a week cannot be written, None while its timesheet is draft or rejected"""
+    if timesheet is None or timesheet.status not in LOCKED_STATUSES:
+        return None
+    return f"Timesheet for week {week_number} of {year} is {timesheet.status.value}, its entries cannot be changed"
+
+
+def writable_timesheet(db: Session, employee_id: int, day: date) -> int:
+    """Id of the timesheet for the week of `day`, 400 when the week is submitted or approved"""
+    year, week_number, _ = day.isocalendar()
+    timesheet = ensure_timesheet(db, employee_id, year, week_number)
+    error = locked_week_error(timesheet, year, week_number)
+    if error:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=error)
+    return timesheet.id
+
+
+def check_week_writable(db: Session, employee_id: int, day: date):
+    """400 when the week of `day` has a submitted or approved timesheet; creates nothing"""
+    year, week_number, _ = day.isocalendar()
+    error = locked_week_error(_week_timesheet(db, employee_id, year, week_number), year, week_number)
+    if error:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=error)
+
+
+def get_timesheet(db: Session, timesheet_id: int) -> DbTimesheet:
+    """Get timesheet by ID"""
+    timesheet = db.query(DbTimesheet).filter(DbTimesheet.id == timesheet_id).first()
+    if not timesheet:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Timesheet with id {timesheet_id} not found"
+        )
+    return timesheet
+
+
+def submit_timesheet(db: Session, employee_id: int, request: TimesheetSubmit) -> DbTimesheet:
+    """Submit the employee's timesheet for an ISO week (draft or rejected -> submitted)"""
+    monday, sunday = week_bounds(request.year, request.week_number)
+    
+    timesheet = db.get(DbTimesheet, ensure_timesheet(db, employee_id, request.year, request.week_number).id)
+    if timesheet.status not in (TimesheetStatus.DRAFT, TimesheetStatus.REJECTED):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Timesheet is already {timesheet.status.value}"
+        )
+    
+    # Entries are linked when written; this also attaches any older unlinked ones
+    linked = db.execute(
+        update(DbTimesheetEntry)
+        .where(
+            DbTimesheetEntry.employee_id == employee_id,
+            DbTimesheetEntry.date >= monday,
+            DbTimesheetEntry.date <= sunday
+        )
+        .values(timesheet_id=timesheet.id)
+        .execution_options(synchronize_session=False)
+    ).rowcount
+    if linked == 0:
+        db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Cannot submit a week without timesheet entries"
+        )
+    
+    timesheet.status = TimesheetStatus.SUBMITTED
+    timesheet.submitted_at = datetime.utcnow()
+    timesheet.rejection_comment = None
+    db.commit()
+    db.refresh(timesheet)
+    return timesheet
+
+
+def get_my_timesheets(db: Session, employee_id: int, limit: Optional[int] = None, cursor: Optional[str] = None) -> Page:
+    """Get all timesheets of an employee, ordered by id (keyset paginated)"""
+    query = db.query(DbTimesheet).filter(DbTimesheet.employee_id == employee_id)
+    return paginate(query, [DbTimesheet.id], limit, cursor)
+
+
+def get_team_timesheets(
+    db: Session,
+    manager_id: int,
+    timesheet_status: Optional[TimesheetStatus] = None,
+    limit: Optional[int] = None,
+    cursor: Optional[str] = None
+) -> Page:
+    """Get the timesheets of a manager's team, optionally by status (keyset paginated)"""
+    team_member_ids = select(DbUser.id).where(DbUser.manager_id == manager_id)
+    query = db.query(DbTimesheet).filter(DbTimesheet.employee_id.in_(team_member_ids))
+    if timesheet_status is not None:
+        query = query.filter(DbTimesheet.status == timesheet_status)
+    return paginate(query, [DbTimesheet.id], limit, cursor)
+
+
+def _review_values(action: ReviewAction, reviewer_id: int, comment: Optional[str]) -> dict:
+    if action == ReviewAction.REJECT and not comment:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="A comment is required when rejecting a timesheet"
+        )
+    return {
+        "status": TimesheetStatus.APPROVED if action == ReviewAction.APPROVE else TimesheetStatus.REJECTED,
+        "rejection_comment": comment if action == ReviewAction.REJECT else None,
+        "reviewed_at": datetime.utcnow(),
+        "reviewed_by": reviewer_id
+    }
+
+
+def review_timesheet(
+    db: Session,
+    timesheet_id: int,
+    reviewer_id: int,
+    action: ReviewAction,
+    comment: Optional[str] = None
+) -> DbTimesheet:
+    """Approve or reject a submitted timesheet (only by the employee's manager)"""
+    values = _review_values(action, reviewer_id, comment)
+    timesheet = get_timesheet(db, timesheet_id)
+    
+    if timesheet.employee.manager_id != reviewer_id:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="You can only review timesheets of your team"
+        )
+    
+    if timesheet.status != TimesheetStatus.SUBMITTED:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Only submitted timesheets can be reviewed, this one is {timesheet.status.value}"
+        )
+    
+    for field, value in values.items():
+        setattr(timesheet, field, value)
+    db.commit()
+    db.refresh(timesheet)
+    return timesheet
+
+
+def review_timesheets_batch(db: Session, reviewer_id: int, request: TimesheetBatchReview) -> TimesheetBatchReviewResult:
+    """
+    Approve or reject many timesheets in one transaction
+    
+    Uses set-based UPDATE ... RETURNING statements instead of loading rows.
+    Only submitted timesheets of the reviewer's team change; every other id
+    is reported back as skipped.
+    """
+    values = _review_values(request.action, reviewer_id, request.comment)
+    team_member_ids = select(DbUser.id).where(DbUser.manager_id == reviewer_id)
+    requested = list(dict.fromkeys(request.timesheet_ids))
+    
+    updated_ids = []
+    for start in range(0, len(requested), REVIEW_CHUNK_SIZE):
+        chunk = requested[start:start + REVIEW_CHUNK_SIZE]
+        updated_ids.extend(db.scalars(
+            update(DbTimesheet)
+            .where(
+                DbTimesheet.id.in_(chunk),
+                DbTimesheet.status == TimesheetStatus.SUBMITTED,
+                DbTimesheet.employee_id.in_(team_member_ids)
+            )
+            .values(**values)
+            .returning(DbTimesheet.id)
+            .execution_options(synchronize_session=False)
+        ).all())
+    db.commit()
+    
+    updated = set(updated_ids)
+    return TimesheetBatchReviewResult(
+        updated=len(updated_ids),
+        updated_ids=sorted(updated),
+        skipped_ids=[timesheet_id for timesheet_id in requested if timesheet_id not in updated]
+    )
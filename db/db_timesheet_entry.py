@@ -1,48 +1,144 @@
+from collections import defaultdict
+from typing import Iterable, Optional
+from sqlalchemy import func, insert, select
 from sqlalchemy.orm import Session
 from fastapi import HTTPException, status
-from db.models import DbTimesheetEntry, DbUser, DbProject
-from schemas import TimesheetEntryCreate, TimesheetEntryUpdate
-from enums import UserRole
+from db.models import DbTimesheetEntry, DbUser
+from db.db_project import project_catalog
+from db.db_timesheet import check_week_writable, ensure_timesheet, locked_week_error, writable_timesheet
+from db.db_weekly_hours import added, record_hours, removed
+from db.pagination import Page, iterate, paginate
+from schemas import (
+    TimesheetEntryCreate, TimesheetEntryUpdate, TimesheetEntryFilter, TeamEntryFilter,
+    TimesheetEntryBulkCreate, TimesheetEntryBulkResult, BulkEntryResult, TimesheetEntryDisplay
+)
+from enums import UserRole, BulkMode, BulkItemStatus
 from datetime import date
 
 
+def _hours_error(hours: float) -> Optional[str]:
+    """Validation message for an hours value, None when valid"""
+    if hours <= 0:
+        return "Hours must be greater than 0"
+    if hours > 24:
+        return "Hours cannot exceed 24 in a single day"
+    return None
+
+
 def create_entry(db: Session, request: TimesheetEntryCreate, employee_id: int) -> DbTimesheetEntry:
-    """Create a new timesheet entry"""
-    # Validate project exists
-    project = db.query(DbProject).filter(DbProject.id == request.project_id).first()
-    if not project:
+    """Create a new timesheet entry, linked to its weekly timesheet (400 when that week is submitted or approved)"""
+    # Validate project exists (in memory, see db/catalog.py)
+    if project_catalog.get(db, request.project_id) is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"Project with id {request.project_id} not found"
         )
     
     # Validate hours
-    if request.hours <= 0:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Hours must be greater than 0"
-        )
-    
-    if request.hours > 24:
+    hours_error = _hours_error(request.hours)
+    if hours_error:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Hours cannot exceed 24 in a single day"
+            detail=hours_error
         )
     
     new_entry = DbTimesheetEntry(
         employee_id=employee_id,
         project_id=request.project_id,
+        timesheet_id=writable_timesheet(db, employee_id, request.date),
         date=request.date,
         hours=request.hours,
         description=request.description
     )
     
     db.add(new_entry)
+    record_hours(db, [added(new_entry)])
     db.commit()
     db.refresh(new_entry)
     return new_entry
 
 
+def create_entries_bulk(db: Session, request: TimesheetEntryBulkCreate, employee_id: int) -> TimesheetEntryBulkResult:
+    """
+    Create many timesheet entries in one transaction
+    
+    Project ids are validated against the project catalog, items in
+    submitted or approved weeks are invalid, and valid rows are inserted with one multi-row INSERT ... RETURNING. In all_or_nothing mode
+    any invalid item rejects the whole request; in best_effort mode invalid
+    items are reported and the rest are created.
+    """
+    project_ids = {item.project_id for item in request.entries}
+    existing_projects = {project_id for project_id in project_ids if project_catalog.get(db, project_id) is not None}
+    
+    # One timesheet upsert per distinct ISO week, not per entry
+    week_timesheets = {}
+    for item in request.entries:
+        week = item.date.isocalendar()[:2]
+        if week not in week_timesheets:
+            week_timesheets[week] = ensure_timesheet(db, employee_id, *week)
+    
+    errors = {}
+    for index, item in enumerate(request.entries):
+        hours_error = _hours_error(item.hours)
+        week = item.date.isocalendar()[:2]
+        locked_error = locked_week_error(week_timesheets[week], *week)
+        if item.project_id not in existing_projects:
+            errors[index] = f"Project with id {item.project_id} not found"
+        elif hours_error:
+            errors[index] = hours_error
+        elif locked_error:
+            errors[index] = locked_error
+    
+    if errors and request.mode == BulkMode.ALL_OR_NOTHING:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=[{"index": index, "error": error} for index, error in sorted(errors.items())]
+        )
+    
+    valid = [(index, item) for index, item in enumerate(request.entries) if index not in errors]
+    created = []
+    if valid:
+        # Plain rows, not ORM objects: those would expire on commit and be
+        # reloaded one SELECT per entry when the results are serialized
+        created = db.execute(
+            insert(DbTimesheetEntry).returning(*ENTRY_COLUMNS),
+            [
+                {
+                    "employee_id": employee_id,
+                    "project_id": item.project_id,
+                    "timesheet_id": week_timesheets[item.date.isocalendar()[:2]].id,
+                    "date": item.date,
+                    "hours": item.hours,
+                    "description": item.description
+                }
+                for _, item in valid
+            ]
+        ).all()
+        record_hours(db, [added(entry) for entry in created])
+        db.commit()
+    
+    # Multi-row RETURNING does not guarantee row order, so pair created rows
+    # with request items by value (identical items are interchangeable)
+    pending = defaultdict(list)
+    for index, item in valid:
+        pending[(item.project_id, item.date, item.hours, item.description)].append(index)
+    
+    results = [
+        BulkEntryResult(index=index, status=BulkItemStatus.FAILED, error=error)
+        for index, error in errors.items()
+    ]
+    results += [
+        BulkEntryResult(
+            index=pending[(entry.project_id, entry.date, entry.hours, entry.description)].pop(0),
+            status=BulkItemStatus.CREATED,
+            entry=TimesheetEntryDisplay.model_validate(entry)
+        )
+        for entry in created
+    ]
+    results.sort(key=lambda result: result.index)
+    return TimesheetEntryBulkResult(created=len(created), failed=len(errors), results=results)
+
+
 def get_entry(db: Session, entry_id: int) -> DbTimesheetEntry:
     """Get timesheet entry by ID"""
     entry = db.query(DbTimesheetEntry).filter(DbTimesheetEntry.id == entry_id).first()
@@ -54,27 +150,129 @@ def get_entry(db: Session, entry_id: int) -> DbTimesheetEntry:
     return entry
 
 
-def get_my_entries(db: Session, employee_id: int):
-    """Get all entries for an employee"""
-    return db.query(DbTimesheetEntry).filter(
+# Entry pages are ordered by (date, id), served by ix_timesheet_entries_employee_id_date
+ENTRY_ORDER = [DbTimesheetEntry.date, DbTimesheetEntry.id]
+
+# The fields of TimesheetEntryDisplay, in order - for plain-row reads and exports
+ENTRY_COLUMNS = [
+    DbTimesheetEntry.id, DbTimesheetEntry.employee_id, DbTimesheetEntry.project_id, DbTimesheetEntry.timesheet_id,
+    DbTimesheetEntry.date, DbTimesheetEntry.hours, DbTimesheetEntry.description
+]
+
+
+def _apply_filters(query, filters: Optional[TimesheetEntryFilter]):
+    """Push the optional date range / project / employee filters into SQL"""
+    if filters is None:
+        return query
+    if filters.from_date is not None:
+        query = query.filter(DbTimesheetEntry.date >= filters.from_date)
+    if filters.to_date is not None:
+        query = query.filter(DbTimesheetEntry.date <= filters.to_date)
+    if filters.project_id is not None:
+        query = query.filter(DbTimesheetEntry.project_id == filters.project_id)
+    if getattr(filters, "employee_id", None) is not None:
+        query = query.filter(DbTimesheetEntry.employee_id == filters.employee_id)
+    return query
+
+
+def _my_entries_query(db: Session, employee_id: int, filters: Optional[TimesheetEntryFilter]):
+    query = db.query(DbTimesheetEntry).filter(
         DbTimesheetEntry.employee_id == employee_id
-    ).all()
+    )
+    return _apply_filters(query, filters)
 
 
-def get_team_entries(db: Session, manager_id: int):
-    """Get all entries for a manager's team"""
-    # Get all team members
-    team_member_ids = db.query(DbUser.id).filter(DbUser.manager_id == manager_id).all()
-    team_member_ids = [id[0] for id in team_member_ids]
-    
-    # Get entries for all team members
-    return db.query(DbTimesheetEntry).filter(
+def _team_entries_query(db: Session, manager_id: int, filters: Optional[TeamEntryFilter]):
+    # Team membership as a subquery so the whole read is a single round trip
+    team_member_ids = select(DbUser.id).where(DbUser.manager_id == manager_id)
+    query = db.query(DbTimesheetEntry).filter(
         DbTimesheetEntry.employee_id.in_(team_member_ids)
-    ).all()
+    )
+    return _apply_filters(query, filters)
+
+
+def _version(query) -> tuple:
+    # Any insert or update moves max(updated_at); deletes change the count and the id sum
+    return tuple(query.with_entities(
+        func.count(DbTimesheetEntry.id), func.sum(DbTimesheetEntry.id), func.max(DbTimesheetEntry.updated_at)
+    ).one())
+
+
+def get_my_entries_version(db: Session, employee_id: int, filters: Optional[TimesheetEntryFilter] = None) -> tuple:
+    """Change signal of an employee's (filtered) entries, one aggregate query"""
+    return _version(_my_entries_query(db, employee_id, filters))
+
+
+def get_team_entries_version(db: Session, manager_id: int, filters: Optional[TeamEntryFilter] = None) -> tuple:
+    """Change signal of a manager's team's (filtered) entries, one aggregate query"""
+    return _version(_team_entries_query(db, manager_id, filters))
+
+
+def get_my_entries(
+    db: Session,
+    employee_id: int,
+    limit: Optional[int] = None,
+    cursor: Optional[str] = None,
+    filters: Optional[TimesheetEntryFilter] = None,
+    columns: Optional[list] = None
+) -> Page:
+    """Get all entries for an employee (filtered, keyset paginated, plain rows of `columns` if given)"""
+    return paginate(_my_entries_query(db, employee_id, filters), ENTRY_ORDER, limit, cursor, columns)
+
+
+def iter_my_entries(
+    db: Session,
+    employee_id: int,
+    filters: Optional[TimesheetEntryFilter] = None,
+    columns: Optional[list] = None
+) -> Iterable[DbTimesheetEntry]:
+    """Stream all entries for an employee in batches (filtered, plain rows of `columns` if given)"""
+    return iterate(_my_entries_query(db, employee_id, filters), ENTRY_ORDER, columns)
+
+
+def get_team_entries(
+    db: Session,
+    manager_id: int,
+    limit: Optional[int] = None,
+    cursor: Optional[str] = None,
+    filters: Optional[TeamEntryFilter] = None,
+    columns: Optional[list] = None
+) -> Page:
+    """Get all entries for a manager's team (filtered, keyset paginated, plain rows of `columns` if given)"""
+    return paginate(_team_entries_query(db, manager_id, filters), ENTRY_ORDER, limit, cursor, columns)
+
+
+def iter_team_entries(
+    db: Session,
+    manager_id: int,
+    filters: Optional[TeamEntryFilter] = None,
+    columns: Optional[list] = None
+) -> Iterable[DbTimesheetEntry]:
+    """Stream all entries for a manager's team in batches (filtered, plain rows of `columns` if given)"""
+    return iterate(_team_entries_query(db, manager_id, filters), ENTRY_ORDER, columns)
+
+
+def iter_entry_rows(
+    db: Session,
+    filters: Optional[TeamEntryFilter] = None,
+    manager_id: Optional[int] = None,
+    employee_id: Optional[int] = None
+) -> Iterable[tuple]:
+    """
+    Stream ENTRY_COLUMNS as plain row tuples for a manager's team or one employee
+    
+    No ORM objects are built; rows come from a server-side cursor in
+    batches. The query runs lazily, on first iteration.
+    """
+    if manager_id is not None:
+        query = _team_entries_query(db, manager_id, filters)
+    else:
+        query = _my_entries_query(db, employee_id, filters)
+    return iterate(query, ENTRY_ORDER, ENTRY_COLUMNS)
 
 
 def update_entry(db: Session, entry_id: int, request: TimesheetEntryUpdate, current_user_id: int) -> DbTimesheetEntry:
-    """Update a timesheet entry (only by owner)"""
+    """Update a timesheet entry (only by owner, while its week is draft or rejected)"""
     entry = get_entry(db, entry_id)
     
     # Check if current user is the owner
@@ -84,10 +282,15 @@ def update_entry(db: Session, entry_id: int, request: TimesheetEntryUpdate, curr
             detail="You can only update your own entries"
         )
     
+    # Neither the week the entry leaves nor the one it moves to may be locked
+    check_week_writable(db, entry.employee_id, entry.date)
+    
+    # The aggregate sees an update as the old values removed, the new ones added
+    before = removed(entry)
+    
     # Update fields if provided
     if request.project_id is not None:
-        project = db.query(DbProject).filter(DbProject.id == request.project_id).first()
-        if not project:
+        if project_catalog.get(db, request.project_id) is None:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail=f"Project with id {request.project_id} not found"
@@ -95,6 +298,8 @@ def update_entry(db: Session, entry_id: int, request: TimesheetEntryUpdate, curr
         entry.project_id = request.project_id
     
     if request.date is not None:
+        if request.date.isocalendar()[:2] != entry.date.isocalendar()[:2]:
+            entry.timesheet_id = writable_timesheet(db, entry.employee_id, request.date)
         entry.date = request.date
     
     if request.hours is not None:
@@ -108,13 +313,14 @@ def update_entry(db: Session, entry_id: int, request: TimesheetEntryUpdate, curr
     if request.description is not None:
         entry.description = request.description
     
+    record_hours(db, [before, added(entry)])
     db.commit()
     db.refresh(entry)
     return entry
 
 
 def delete_entry(db: Session, entry_id: int, current_user_id: int):
-    """Delete a timesheet entry (only by owner)"""
+    """Delete a timesheet entry (only by owner, while its week is draft or rejected)"""
     entry = get_entry(db, entry_id)
     
     # Check if current user is the owner
@@ -124,6 +330,9 @@ def delete_entry(db: Session, entry_id: int, current_user_id: int):
             detail="You can only delete your own entries"
         )
     
+    check_week_writable(db, entry.employee_id, entry.date)
+    
     db.delete(entry)
+    record_hours(db, [removed(entry)])
     db.commit()
     return {"message": "Entry deleted successfully"}
@@ -1,6 +1,8 @@
+from typing import Optional
 from sqlalchemy.orm import Session
 from fastapi import HTTPException, status
 from db.models import DbUser
+from db.pagination import Page, paginate
 from schemas import UserCreate
 from auth.hash import hash_password
 from enums import UserRole
@@ -64,17 +66,32 @@ def get_user(db: Session, user_id: int) -> DbUser:
     return user
 
 
-def get_all_users(db: Session):
-    """Get all users"""
-    return db.query(DbUser).all()
+# The fields of UserDisplay, in order - for plain-row reads
+USER_COLUMNS = [DbUser.id, DbUser.username, DbUser.email, DbUser.role, DbUser.manager_id]
 
 
-def get_team_members(db: Session, manager_id: int):
-    """Get all team members for a manager"""
+def get_all_users(
+    db: Session,
+    limit: Optional[int] = None,
+    cursor: Optional[str] = None,
+    columns: Optional[list] = None
+) -> Page:
+    """Get all users, ordered by id (keyset paginated, plain rows of `columns` if given)"""
+    return paginate(db.query(DbUser), [DbUser.id], limit, cursor, columns)
+
+
+def get_team_members(
+    db: Session,
+    manager_id: int,
+    limit: Optional[int] = None,
+    cursor: Optional[str] = None,
+    columns: Optional[list] = None
+) -> Page:
+    """Get all team members for a manager, ordered by id (keyset paginated, plain rows of `columns` if given)"""
     manager = get_user(db, manager_id)
     if manager.role != UserRole.MANAGER:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="User is not a manager"
         )
-    return db.query(DbUser).filter(DbUser.manager_id == manager_id).all()
+    return paginate(db.query(DbUser).filter(DbUser.manager_id == manager_id), [DbUser.id], limit, cursor, columns)
@@ -0,0 +1,193 @@
+"""
+Weekly hours aggregate (employee x ISO week x project)
+
+weekly_project_hours is maintained incrementally: every write to
+timesheet_entries passes its changes to record_hours in the same
+transaction, which upserts the summed deltas. Dashboard reads then touch
+one row per week and project instead of every entry.
+
+Rebuild or verify the table with:
+    python -m db.db_weekly_hours rebuild
+    python -m db.db_weekly_hours check
+"""
+from collections import defaultdict
+from datetime import date
+from typing import Iterable, List, NamedTuple, Optional
+from sqlalchemy import delete, func, insert, select, update
+from sqlalchemy.orm import Session
+from db.models import DbTimesheetEntry, DbUser, DbWeeklyProjectHours
+from db.sql_functions import UPSERT_INSERTS, iso_week, iso_year
+
+# Float sums drift slightly when hours are added and removed again
+HOURS_TOLERANCE = 1e-6
+
+KEY_COLUMNS = ["employee_id", "year", "week_number", "project_id"]
+
+
+class HoursChange(NamedTuple):
+    employee_id: int
+    project_id: int
+    day: date
+    hours: float
+    entries: int
+
+
+class WeeklyHoursMismatch(NamedTuple):
+    employee_id: int
+    year: int
+    week_number: int
+    project_id: int
+    expected_hours: float
+    actual_hours: float
+    expected_entries: int
+    actual_entries: int
+
+
+def added(entry) -> HoursChange:
+    """Change for a new entry (anything with employee_id, project_id, date, hours)"""
+    return HoursChange(entry.employee_id, entry.project_id, entry.date, entry.hours, 1)
+
+
+def removed(entry) -> HoursChange:
+    """Change for a deleted entry"""
+    return HoursChange(entry.employee_id, entry.project_id, entry.date, -entry.hours, -1)
+
+
+def record_hours(db: Session, changes: Iterable[HoursChange]):
+    """
+    Apply entry changes to the aggregate (does not commit)
+    
+    Changes are summed per key first, so a bulk insert costs one upsert per
+    week and project; rows whose entry count drops to zero are removed.
+    """
+    deltas = defaultdict(lambda: [0.0, 0])
+    for change in changes:
+        year, week_number, _ = change.day.isocalendar()
+        delta = deltas[(change.employee_id, year, week_number, change.project_id)]
+        delta[0] += change.hours
+        delta[1] += change.entries
+    rows = [
+        dict(zip(KEY_COLUMNS, key), total_hours=hours, entry_count=entries)
+        for key, (hours, entries) in deltas.items()
+        if hours or entries
+    ]
+    if not rows:
+        return
+    
+    table = DbWeeklyProjectHours.__table__
+    dialect_insert = UPSERT_INSERTS.get(db.get_bind().dialect.name)
+    if dialect_insert is not None:
+        stmt = dialect_insert(table)
+        db.execute(stmt.on_conflict_do_update(
+            index_elements=KEY_COLUMNS,
+            set_={
+                "total_hours": table.c.total_hours + stmt.excluded.total_hours,
+                "entry_count": table.c.entry_count + stmt.excluded.entry_count
+            }
+        ), rows)
+    else:
+        for row in rows:
+            updated = db.execute(
+                update(table)
+                .where(*(table.c[column] == row[column] for column in KEY_COLUMNS))
+                .values(
+                    total_hours=table.c.total_hours + row["total_hours"],
+                    entry_count=table.c.entry_count + row["entry_count"]
+                )
+            ).rowcount
+            if updated == 0:
+                db.execute(insert(table).values(**row))
+    
+    if any(row["entry_count"] < 0 for row in rows):
+        db.execute(delete(table).where(
+            table.c.employee_id.in_({row["employee_id"] for row in rows}),
+            table.c.entry_count <= 0
+        ))
+
+
+def get_weekly_hours(db: Session, employee_id: int, year: Optional[int] = None) -> List[DbWeeklyProjectHours]:
+    """Hours per ISO week and project for an employee"""
+    query = db.query(DbWeeklyProjectHours).filter(DbWeeklyProjectHours.employee_id == employee_id)
+    if year is not None:
+        query = query.filter(DbWeeklyProjectHours.year == year)
+    return query.order_by(DbWeeklyProjectHours.year, DbWeeklyProjectHours.week_number, DbWeeklyProjectHours.project_id).all()
+
+
+def get_team_weekly_hours(
+    db: Session,
+    manager_id: int,
+    year: Optional[int] = None,
+    employee_id: Optional[int] = None
+) -> List[DbWeeklyProjectHours]:
+    """Hours per employee, ISO week and project for a manager's team"""
+    team_member_ids = select(DbUser.id).where(DbUser.manager_id == manager_id)
+    query = db.query(DbWeeklyProjectHours).filter(DbWeeklyProjectHours.employee_id.in_(team_member_ids))
+    if year is not None:
+        query = query.filter(DbWeeklyProjectHours.year == year)
+    if employee_id is not None:
+        query = query.filter(DbWeeklyProjectHours.employee_id == employee_id)
+    return query.order_by(*(DbWeeklyProjectHours.__table__.c[column] for column in KEY_COLUMNS)).all()
+
+
+def _aggregate_entries():
+    year = iso_year(DbTimesheetEntry.date)
+    week_number = iso_week(DbTimesheetEntry.date)
+    return (
+        select(
+            DbTimesheetEntry.employee_id, year, week_number, DbTimesheetEntry.project_id,
+            func.sum(DbTimesheetEntry.hours), func.count(DbTimesheetEntry.id)
+        )
+        .group_by(DbTimesheetEntry.employee_id, year, week_number, DbTimesheetEntry.project_id)
+    )
+
+
+def refill(connection):
+    """Replace the aggregate with GROUP BY totals of timesheet_entries (session or connection, no commit)"""
+    table = DbWeeklyProjectHours.__table__
+    connection.execute(delete(table))
+    connection.execute(insert(table).from_select(KEY_COLUMNS + ["total_hours", "entry_count"], _aggregate_entries()))
+
+
+def rebuild_weekly_hours(db: Session) -> int:
+    """Recompute the whole aggregate from timesheet_entries in one transaction, returns the row count"""
+    refill(db)
+    db.commit()
+    return db.scalar(select(func.count()).select_from(DbWeeklyProjectHours.__table__))
+
+
+def check_weekly_hours(db: Session) -> List[WeeklyHoursMismatch]:
+    """Compare the aggregate with timesheet_entries, returns the rows that differ"""
+    expected = {tuple(row[:4]): (row[4], row[5]) for row in db.execute(_aggregate_entries())}
+    actual = {
+        tuple(row[:4]): (row[4], row[5])
+        for row in db.execute(select(DbWeeklyProjectHours.__table__))
+    }
+    mismatches = []
+    for key in sorted(expected.keys() | actual.keys()):
+        expected_hours, expected_entries = expected.get(key, (0.0, 0))
+        actual_hours, actual_entries = actual.get(key, (0.0, 0))
+        if expected_entries != actual_entries or abs(expected_hours - actual_hours) > HOURS_TOLERANCE:
+            mismatches.append(WeeklyHoursMismatch(
+                *key, expected_hours, actual_hours, expected_entries, actual_entries
+            ))
+    return mismatches
+
+
+if __name__ == "__main__":
+    import argparse
+    import sys
+    from db.database import SessionLocal
+    
+    parser = argparse.ArgumentParser(description="Maintain the weekly_project_hours aggregate")
+    parser.add_argument("command", choices=["rebuild", "check"])
+    args = parser.parse_args()
+    
+    with SessionLocal() as session:
+        if args.command == "rebuild":
+            print(f"Rebuilt weekly_project_hours: {rebuild_weekly_hours(session)} rows")
+        else:
+            mismatches = check_weekly_hours(session)
+            for mismatch in mismatches:
+                print(mismatch)
+            print(f"{len(mismatches)} mismatched rows" if mismatches else "weekly_project_hours is consistent")
+            sys.exit(1 if mismatches else 0)
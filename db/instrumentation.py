@@ -0,0 +1,242 @@
+"""
+Per-request SQL statement counting and slow-query log
+
+Engine events count every statement and its duration into the QueryStats
+of the current request, held in a context variable (sync endpoints run in
+worker threads that inherit a copy of the request's context, so they add to
+the same object). QueryTimingMiddleware opens the stats for each request
+and reports them in a Server-Timing header:
+
+    Server-Timing: db;dur=3.42;desc="5 queries"
+
+Statements run while a streamed body is sent, after the headers, are not
+included. A statement repeated N_PLUS_ONE_THRESHOLD times within one request
+is logged as a likely N+1 (a lazy load inside a loop).
+
+A statement taking SLOW_QUERY_MS or longer is logged with its SQL, the
+shape of its parameters (types, never values), the duration, the innermost
+db.db_* function that issued it and the route of the request. Its plan is
+captured with EXPLAIN the first time its fingerprint (the SQL with
+whitespace and IN lists normalized) is slow, inside a savepoint so a failed
+EXPLAIN cannot abort the request's transaction; the plans of the last
+SLOW_QUERY_PLAN_CACHE_SIZE fingerprints are kept. SLOW_QUERY_SAMPLE_RATE of the
+slow statements are also kept in a ring buffer of the last
+SLOW_QUERY_BUFFER_SIZE, served by GET /admin/slow-queries.
+"""
+import hashlib
+import logging
+import os
+import random
+import re
+import sys
+import threading
+import time
+from collections import Counter, OrderedDict, deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime
+from typing import Iterator, List, Optional
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+SERVER_TIMING = os.getenv("SERVER_TIMING", "true").lower() in ("1", "true", "yes")
+N_PLUS_ONE_THRESHOLD = int(os.getenv("N_PLUS_ONE_THRESHOLD", "20"))
+
+# Slow-query log - 0 disables it
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", "200"))
+SLOW_QUERY_SAMPLE_RATE = float(os.getenv("SLOW_QUERY_SAMPLE_RATE", "1.0"))
+SLOW_QUERY_BUFFER_SIZE = int(os.getenv("SLOW_QUERY_BUFFER_SIZE", "100"))
+SLOW_QUERY_PLAN_CACHE_SIZE = int(os.getenv("SLOW_QUERY_PLAN_CACHE_SIZE", "500"))
+
+logger = logging.getLogger(__name__)
+
+
+class QueryStats:
+    """Statements executed within one request (or count_queries block)"""
+    __slots__ = ("count", "seconds", "statements", "scope")
+    
+    def __init__(self, scope: Optional[dict] = None):
+        self.count = 0
+        self.seconds = 0.0
+        self.statements = Counter()
+        # ASGI scope of the request, the router adds the matched route to it
+        self.scope = scope
+    
+    def server_timing(self) -> str:
+        return f'db;dur={self.seconds * 1000:.2f};desc="{self.count} queries"'
+
+
+_current: ContextVar[Optional[QueryStats]] = ContextVar("query_stats", default=None)
+
+
+@contextmanager
+def count_queries(scope: Optional[dict] = None) -> Iterator[QueryStats]:
+    """Collect the statements run by this context (and threads started from it)"""
+    stats = QueryStats(scope)
+    token = _current.set(stats)
+    try:
+        yield stats
+    finally:
+        _current.reset(token)
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _start_query(conn, cursor, statement, parameters, context, executemany):
+    if SLOW_QUERY_MS > 0 or _current.get() is not None:
+        conn.info.setdefault("query_started_at", []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _end_query(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info.get("query_started_at")
+    if not started:
+        return
+    elapsed = time.perf_counter() - started.pop()
+    stats = _current.get()
+    if stats is not None:
+        stats.seconds += elapsed
+        stats.count += 1
+        stats.statements[statement] += 1
+        if stats.statements[statement] == N_PLUS_ONE_THRESHOLD:
+            logger.warning("Possible N+1: statement ran %d times in one request: %s", N_PLUS_ONE_THRESHOLD, statement)
+    if SLOW_QUERY_MS > 0 and elapsed * 1000 >= SLOW_QUERY_MS:
+        _log_slow_query(conn, statement, parameters, executemany, elapsed, stats)
+
+
+@event.listens_for(Engine, "handle_error")
+def _failed_query(exception_context):
+    connection = exception_context.connection
+    if connection is not None and connection.info.get("query_started_at"):
+        connection.info["query_started_at"].pop()
+
+
+# Most recent slow statements (sampled) and one plan per fingerprint (LRU)
+slow_queries = deque(maxlen=SLOW_QUERY_BUFFER_SIZE)
+_plans = OrderedDict()
+_plans_lock = threading.Lock()
+
+_PLACEHOLDER_LIST = re.compile(r"\(\s*(?:\?|%s|%\(\w+\)s|:\w+)(?:\s*,\s*(?:\?|%s|%\(\w+\)s|:\w+))*\s*\)")
+_REPEATED_LISTS = re.compile(r"\(\.\.\.\)(?:\s*,\s*\(\.\.\.\))+")
+_EXPLAINABLE = ("SELECT", "WITH", "UPDATE", "DELETE")
+
+
+def fingerprint(statement: str) -> str:
+    """Hash of the statement with whitespace, IN lists and multi-row VALUES normalized"""
+    normalized = _PLACEHOLDER_LIST.sub("(...)", " ".join(statement.split()))
+    normalized = _REPEATED_LISTS.sub("(...)", normalized)
+    return hashlib.sha1(normalized.encode("utf-8")).hexdigest()[:16]
+
+
+def _parameter_shape(parameters, executemany: bool):
+    """Types of the bound values - values may be personal data or password hashes"""
+    if executemany:
+        rows = list(parameters)
+        return {"rows": len(rows), "row": _parameter_shape(rows[0], False) if rows else None}
+    if isinstance(parameters, dict):
+        return {name: type(value).__name__ for name, value in parameters.items()}
+    return [type(value).__name__ for value in parameters or ()]
+
+
+def _repository_function() -> Optional[str]:
+    """Innermost db.db_* function on the stack, e.g. db.db_user.get_user"""
+    frame = sys._getframe(1)
+    while frame is not None:
+        module = frame.f_globals.get("__name__", "")
+        if module.startswith("db.db_"):
+            return f"{module}.{frame.f_code.co_name}"
+        frame = frame.f_back
+    return None
+
+
+def _explain(conn, statement: str, parameters, executemany: bool) -> Optional[List[str]]:
+    """
+    Plan of a statement, on a raw cursor so it is neither counted nor logged
+    
+    It runs in a savepoint of the request's transaction: on PostgreSQL a
+    failed statement aborts the whole transaction unless rolled back to one.
+    """
+    if not statement.lstrip().upper().startswith(_EXPLAINABLE):
+        return None
+    if executemany:
+        parameters = next(iter(parameters), ())
+    prefix = "EXPLAIN QUERY PLAN " if conn.dialect.name == "sqlite" else "EXPLAIN "
+    cursor = conn.connection.cursor()
+    try:
+        cursor.execute("SAVEPOINT slow_query_explain")
+        try:
+            cursor.execute(prefix + statement, parameters)
+            plan = [str(row[-1]) for row in cursor.fetchall()]
+        except Exception as e:
+            cursor.execute("ROLLBACK TO SAVEPOINT slow_query_explain")
+            plan = [f"EXPLAIN failed: {e}"]
+        cursor.execute("RELEASE SAVEPOINT slow_query_explain")
+        return plan
+    except Exception as e:
+        # No savepoint (e.g. an autocommit connection): nothing to protect
+        return [f"EXPLAIN failed: {e}"]
+    finally:
+        cursor.close()
+
+
+def _log_slow_query(conn, statement, parameters, executemany, elapsed, stats):
+    key = fingerprint(statement)
+    with _plans_lock:
+        capture = key not in _plans
+        if capture:
+            _plans[key] = None
+            while len(_plans) > SLOW_QUERY_PLAN_CACHE_SIZE:
+                _plans.popitem(last=False)
+        else:
+            _plans.move_to_end(key)
+    if capture:
+        plan = _explain(conn, statement, parameters, executemany)
+        with _plans_lock:
+            if key in _plans:
+                _plans[key] = plan
+    
+    scope = stats.scope if stats is not None and stats.scope is not None else {}
+    record = {
+        "at": datetime.utcnow().isoformat(timespec="milliseconds"),
+        "duration_ms": round(elapsed * 1000, 3),
+        "fingerprint": key,
+        "statement": statement,
+        "parameters": _parameter_shape(parameters, executemany),
+        "function": _repository_function(),
+        "method": scope.get("method"),
+        "route": getattr(scope.get("route"), "path", None),
+    }
+    logger.warning(
+        "Slow query: %.1f ms in %s (%s %s): %s", record["duration_ms"], record["function"],
+        record["method"], record["route"], " ".join(statement.split()),
+        extra={"slow_query": {**record, "plan": _plans.get(key)}}
+    )
+    if random.random() < SLOW_QUERY_SAMPLE_RATE:
+        slow_queries.append(record)
+
+
+def recent_slow_queries() -> List[dict]:
+    """The buffered slow statements, newest first, each with its fingerprint's plan"""
+    return [{**record, "plan": _plans.get(record["fingerprint"])} for record in reversed(slow_queries)]
+
+
+class QueryTimingMiddleware:
+    """ASGI middleware that counts each request's statements into a Server-Timing header"""
+    
+    def __init__(self, app):
+        self.app = app
+    
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        
+        # Counted even without the header: the slow-query log reads the route from the stats
+        with count_queries(scope) as stats:
+            async def send_with_timing(message):
+                if SERVER_TIMING and message["type"] == "http.response.start":
+                    headers = list(message.get("headers", []))
+                    headers.append((b"server-timing", stats.server_timing().encode("latin-1")))
+                    message = {**message, "headers": headers}
+                await send(message)
+            
+            await self.app(scope, receive, send_with_timing)
@@ -0,0 +1,186 @@
+"""
+Versioned schema migrations
+
+Applied versions are recorded in the `schema_migrations` table. Each
+migration runs in its own transaction and must be idempotent, so a fresh
+database (where version 1 already creates the current schema) and an
+existing one converge on the same result.
+
+The application does not migrate on startup (it refuses to start while
+migrations are pending). Run pending migrations with:
+    python -m db.migrations
+"""
+from datetime import datetime
+from typing import Callable, List, NamedTuple
+from sqlalchemy import Column, DateTime, Integer, MetaData, String, Table, inspect, select, text
+from sqlalchemy.schema import CreateTable
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.exc import IntegrityError
+from db.database import Base
+from db import db_weekly_hours, models
+
+
+class Migration(NamedTuple):
+    version: int
+    description: str
+    upgrade: Callable[[Connection], None]
+
+
+MIGRATIONS: List[Migration] = []
+
+# Kept out of Base.metadata so create_all never touches it
+schema_migrations = Table(
+    "schema_migrations",
+    MetaData(),
+    Column("version", Integer, primary_key=True),
+    Column("description", String, nullable=False),
+    Column("applied_at", DateTime, nullable=False),
+)
+
+
+def migration(version: int, description: str):
+    """Register an upgrade step"""
+    def register(func):
+        MIGRATIONS.append(Migration(version, description, func))
+        MIGRATIONS.sort(key=lambda m: m.version)
+        return func
+    return register
+
+
+def _create_missing_indexes(connection: Connection, table: Table):
+    inspector = inspect(connection)
+    existing = {index["name"] for index in inspector.get_indexes(table.name)}
+    columns = {column["name"] for column in inspector.get_columns(table.name)}
+    for index in table.indexes:
+        # Indexes on columns a later migration adds are created by that migration
+        if index.name not in existing and all(column.name in columns for column in index.columns):
+            index.create(connection)
+
+
+def _add_missing_column(connection: Connection, table: Table, ddl: str) -> bool:
+    """ALTER TABLE ... ADD COLUMN `ddl` unless the column exists, returns whether it was added"""
+    name = ddl.split()[0]
+    if name in {column["name"] for column in inspect(connection).get_columns(table.name)}:
+        return False
+    connection.execute(text(f"ALTER TABLE {table.name} ADD COLUMN {ddl}"))
+    return True
+
+
+@migration(1, "Initial schema")
+def _initial_schema(connection: Connection):
+    Base.metadata.create_all(connection)
+
+
+@migration(2, "Index timesheet hot queries")
+def _index_hot_queries(connection: Connection):
+    _create_missing_indexes(connection, models.DbUser.__table__)
+    _create_missing_indexes(connection, models.DbTimesheetEntry.__table__)
+
+
+@migration(3, "Weekly project hours aggregate")
+def _weekly_project_hours(connection: Connection):
+    models.DbWeeklyProjectHours.__table__.create(connection, checkfirst=True)
+    db_weekly_hours.refill(connection)
+
+
+def _has_current_timestamp_default(connection: Connection, table: Table, name: str) -> bool:
+    """Whether the column exists with a CURRENT_TIMESTAMP / now() server default"""
+    for column in inspect(connection).get_columns(table.name):
+        if column["name"] == name:
+            default = (column["default"] or "").strip("()").upper()
+            return default in ("CURRENT_TIMESTAMP", "NOW")
+    return False
+
+
+def _rebuild_sqlite_table(connection: Connection, table: Table):
+    """
+    Recreate a SQLite table from the model, keeping the rows of the columns both share
+    
+    SQLite's ALTER TABLE can neither add a column with a non-constant default
+    nor change a default; new columns take their server default.
+    """
+    existing = [column["name"] for column in inspect(connection).get_columns(table.name)]
+    shared = ", ".join(column.name for column in table.columns if column.name in existing)
+    create = str(CreateTable(table).compile(connection)).replace(f"TABLE {table.name} ", f"TABLE {table.name}_new ", 1)
+    connection.execute(text(create))
+    connection.execute(text(f"INSERT INTO {table.name}_new ({shared}) SELECT {shared} FROM {table.name}"))
+    connection.execute(text(f"DROP TABLE {table.name}"))
+    connection.execute(text(f"ALTER TABLE {table.name}_new RENAME TO {table.name}"))
+    _create_missing_indexes(connection, table)
+
+
+def _ensure_updated_at(connection: Connection):
+    """updated_at on entries and projects, defaulting to the insert time as in the models"""
+    for table in (models.DbTimesheetEntry.__table__, models.DbProject.__table__):
+        if _has_current_timestamp_default(connection, table, "updated_at"):
+            continue
+        if connection.dialect.name == "sqlite":
+            _rebuild_sqlite_table(connection, table)
+        elif not _add_missing_column(connection, table, "updated_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP"):
+            connection.execute(text(f"ALTER TABLE {table.name} ALTER COLUMN updated_at SET DEFAULT CURRENT_TIMESTAMP"))
+    _create_missing_indexes(connection, models.DbTimesheetEntry.__table__)
+
+
+@migration(4, "Track updated_at on entries and projects")
+def _updated_at(connection: Connection):
+    _ensure_updated_at(connection)
+
+
+@migration(5, "Reference data cache generations")
+def _cache_generations(connection: Connection):
+    models.DbCacheGeneration.__table__.create(connection, checkfirst=True)
+
+
+@migration(6, "Server default for updated_at")
+def _updated_at_server_default(connection: Connection):
+    # Databases migrated before version 4 defaulted updated_at to a constant
+    _ensure_updated_at(connection)
+
+
+@migration(7, "Shared token revocations")
+def _token_revocations(connection: Connection):
+    models.DbTokenRevocation.__table__.create(connection, checkfirst=True)
+
+
+def applied_versions(engine: Engine) -> List[int]:
+    """Versions already recorded in the database"""
+    with engine.begin() as connection:
+        schema_migrations.create(connection, checkfirst=True)
+        return list(connection.execute(select(schema_migrations.c.version)).scalars())
+
+
+def pending_versions(engine: Engine) -> List[int]:
+    """Versions not applied yet, read without changing the database"""
+    with engine.connect() as connection:
+        if not inspect(connection).has_table(schema_migrations.name):
+            return [step.version for step in MIGRATIONS]
+        done = set(connection.execute(select(schema_migrations.c.version)).scalars())
+    return [step.version for step in MIGRATIONS if step.version not in done]
+
+
+def upgrade(engine: Engine) -> List[int]:
+    """Apply pending migrations in order, returns the versions applied"""
+    done = set(applied_versions(engine))
+    applied = []
+    for step in MIGRATIONS:
+        if step.version in done:
+            continue
+        try:
+            with engine.begin() as connection:
+                step.upgrade(connection)
+                connection.execute(schema_migrations.insert().values(
+                    version=step.version,
+                    description=step.description,
+                    applied_at=datetime.utcnow()
+                ))
+        except IntegrityError:
+            # Another worker recorded this version first
+            continue
+        applied.append(step.version)
+    return applied
+
+
+if __name__ == "__main__":
+    from db.database import engine
+    versions = upgrade(engine)
+    print(f"Applied migrations: {versions}" if versions else "Schema is up to date")
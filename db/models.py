@@ -1,5 +1,6 @@
-from sqlalchemy import Column, Integer, String, Float, Date, DateTime, ForeignKey, Enum, UniqueConstraint
+from sqlalchemy import Column, Integer, String, Float, Date, DateTime, ForeignKey, Enum, UniqueConstraint, Index, func
 from sqlalchemy.orm import relationship
+from datetime import datetime
 from db.database import Base
 from enums import UserRole, TimesheetStatus
 
@@ -12,7 +13,7 @@ class DbUser(Base):
     email = Column(String, unique=True, index=True, nullable=False)
     password = Column(String, nullable=False)
     role = Column(Enum(UserRole), default=UserRole.EMPLOYEE, nullable=False)
-    manager_id = Column(Integer, ForeignKey('users.id'), nullable=True)
+    manager_id = Column(Integer, ForeignKey('users.id'), nullable=True, index=True)
     
     # Self-referential relationship
     manager = relationship("DbUser", remote_side=[id], backref="team_members")
@@ -29,6 +30,7 @@ class DbProject(Base):
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String, unique=True, index=True, nullable=False)
     description = Column(String, nullable=True)
+    updated_at = Column(DateTime, nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow, server_default=func.now())
     
     # Relationships
     timesheet_entries = relationship("DbTimesheetEntry", back_populates="project")
@@ -36,14 +38,21 @@ class DbProject(Base):
 
 class DbTimesheetEntry(Base):
     __tablename__ = 'timesheet_entries'
+    __table_args__ = (
+        # Serves "entries of employee X" and "entries of employee X in a date range"
+        Index('ix_timesheet_entries_employee_id_date', 'employee_id', 'date'),
+        # Covers the count / max(updated_at) change signal of an employee's entries
+        Index('ix_timesheet_entries_employee_id_updated_at', 'employee_id', 'updated_at'),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     employee_id = Column(Integer, ForeignKey('users.id'), nullable=False)
     project_id = Column(Integer, ForeignKey('projects.id'), nullable=False)
-    timesheet_id = Column(Integer, ForeignKey('timesheets.id'), nullable=True)
+    timesheet_id = Column(Integer, ForeignKey('timesheets.id'), nullable=True, index=True)
     date = Column(Date, nullable=False)
     hours = Column(Float, nullable=False)
     description = Column(String, nullable=True)
+    updated_at = Column(DateTime, nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow, server_default=func.now())
     
     # Relationships
     employee = relationship("DbUser", back_populates="timesheet_entries")
@@ -71,3 +80,33 @@ class DbTimesheet(Base):
     employee = relationship("DbUser", back_populates="timesheets", foreign_keys=[employee_id])
     reviewer = relationship("DbUser", back_populates="reviewed_timesheets", foreign_keys=[reviewed_by])
     entries = relationship("DbTimesheetEntry", back_populates="timesheet", cascade="all, delete-orphan")
+
+
+# Change counter of each in-process reference data catalog, see db/catalog.py
+class DbCacheGeneration(Base):
+    __tablename__ = 'cache_generations'
+    
+    name = Column(String, primary_key=True)
+    generation = Column(Integer, nullable=False, default=0)
+
+
+# Claims-mode tokens issued before revoked_at (Unix time) are rejected by
+# every worker; user_id 0 revokes every user's tokens (auth/principal.py)
+class DbTokenRevocation(Base):
+    __tablename__ = 'token_revocations'
+    
+    user_id = Column(Integer, primary_key=True, autoincrement=False)
+    revoked_at = Column(Float, nullable=False)
+
+
+# Hours per employee, ISO week and project, kept in step with timesheet_entries
+# by db/db_weekly_hours.py
+class DbWeeklyProjectHours(Base):
+    __tablename__ = 'weekly_project_hours'
+    
+    employee_id = Column(Integer, ForeignKey('users.id'), primary_key=True)
+    year = Column(Integer, primary_key=True)
+    week_number = Column(Integer, primary_key=True)
+    project_id = Column(Integer, ForeignKey('projects.id'), primary_key=True)
+    total_hours = Column(Float, nullable=False, default=0.0)
+    entry_count = Column(Integer, nullable=False, default=0)
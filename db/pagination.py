@@ -0,0 +1,101 @@
+"""
+Keyset (cursor) pagination
+
+Pages are ordered by a unique key, e.g. (date, id), and the next page starts
+strictly after the last key of the previous one. The database seeks to that
+key through an index, so page 1000 costs the same as page 1. Cursors are
+opaque to clients: base64url-encoded JSON of the last key.
+"""
+import base64
+import binascii
+import json
+import os
+from datetime import date
+from typing import Any, Iterable, List, NamedTuple, Optional
+from fastapi import HTTPException, Response, status
+from sqlalchemy import tuple_
+from sqlalchemy.orm import Query
+from serialization import STREAM_BATCH_SIZE, is_row, rows_response
+
+MAX_PAGE_SIZE = int(os.getenv("MAX_PAGE_SIZE", "1000"))
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+class Page(NamedTuple):
+    items: list
+    next_cursor: Optional[str]
+
+
+def encode_cursor(values: List[Any]) -> str:
+    """Encode the key of the last row of a page"""
+    raw = json.dumps([v.isoformat() if isinstance(v, date) else v for v in values], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str, columns: list) -> List[Any]:
+    """Decode a cursor back into typed key values for `columns`"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        if not isinstance(values, list) or len(values) != len(columns):
+            raise ValueError(cursor)
+        return [
+            date.fromisoformat(v) if column.type.python_type is date else column.type.python_type(v)
+            for column, v in zip(columns, values)
+        ]
+    except (ValueError, TypeError, binascii.Error, UnicodeError):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid pagination cursor"
+        )
+
+
+def paginate(
+    query: Query,
+    order_by: list,
+    limit: Optional[int] = None,
+    cursor: Optional[str] = None,
+    columns: Optional[list] = None
+) -> Page:
+    """
+    Apply keyset pagination to `query`, ordered by the unique key `order_by`
+    
+    Without a limit the remaining rows are returned in one page. With
+    `columns` the page holds plain rows of those columns (which must include
+    `order_by`) instead of ORM objects.
+    """
+    if columns is not None:
+        query = query.with_entities(*columns)
+    if cursor is not None:
+        query = query.filter(tuple_(*order_by) > tuple(decode_cursor(cursor, order_by)))
+    query = query.order_by(*order_by)
+    
+    if limit is None:
+        return Page(query.all(), None)
+    
+    rows = query.limit(limit + 1).all()
+    if len(rows) <= limit:
+        return Page(rows, None)
+    
+    last = rows[limit - 1]
+    return Page(rows[:limit], encode_cursor([getattr(last, column.key) for column in order_by]))
+
+
+def page_response(response: Response, page: Page):
+    """
+    Expose the next cursor as a response header and return the page items
+    
+    Pages of plain rows are encoded right away as a complete response.
+    """
+    headers = {NEXT_CURSOR_HEADER: page.next_cursor} if page.next_cursor is not None else {}
+    if page.items and is_row(page.items[0]):
+        return rows_response(page.items, headers=headers)
+    response.headers.update(headers)
+    return page.items
+
+
+def iterate(query: Query, order_by: list, columns: Optional[list] = None, batch_size: int = STREAM_BATCH_SIZE) -> Iterable:
+    """All rows of `query` in key order, fetched from the cursor `batch_size` at a time"""
+    if columns is not None:
+        query = query.with_entities(*columns)
+    return query.order_by(*order_by).yield_per(batch_size)
@@ -0,0 +1,194 @@
+"""
+Synthetic data generator
+
+Replaces all users, projects, timesheets and entries with generated data:
+`managers` teams of `employees_per_manager`, `weeks` of Monday-Friday
+entries per employee (ending with the current week) and one timesheet per
+employee and week. Past weeks' timesheets are submitted, approved or
+rejected according to the requested ratios; the current week stays draft.
+
+Rows are generated lazily as tuples and written with a Core INSERT per
+table, executed with a list of parameter dicts in batches of BATCH_SIZE
+(SQLAlchemy's executemany, no ORM unit of work). Ids are assigned up
+front so entries reference their timesheet without a lookup, the shared
+password is hashed once and the weekly hours aggregate is filled with one
+INSERT ... SELECT at the end.
+
+Run from the project root, e.g. for 1M entries:
+    python -m db.seeding --managers 20 --employees-per-manager 50 --projects 40 --weeks 200
+"""
+import random
+import time
+from datetime import date, datetime, time as clock, timedelta
+from itertools import islice
+from typing import Iterable, Iterator, List
+from sqlalchemy import insert, text
+from sqlalchemy.orm import Session
+from auth.hash import hash_password
+from db.db_weekly_hours import refill
+from db.models import DbProject, DbTimesheet, DbTimesheetEntry, DbUser, DbWeeklyProjectHours
+from enums import TimesheetStatus, UserRole
+from schemas import SeedRequest, SeedResult
+
+BATCH_SIZE = 20000
+
+# Hours per weekday (Monday-Friday), split across a day's entries
+DAY_HOURS = (8.0, 7.5, 8.0, 8.5, 6.0)
+
+REJECTION_COMMENT = "Please add descriptions to your entries"
+
+
+def _batches(rows: Iterable[tuple], size: int) -> Iterator[List[tuple]]:
+    rows = iter(rows)
+    while batch := list(islice(rows, size)):
+        yield batch
+
+
+def _insert(db: Session, model, names: List[str], rows: Iterable[tuple], batch_size: int) -> int:
+    """Insert `rows` (tuples of the `names` columns) with a Core executemany per batch, returns the row count"""
+    connection = db.connection()
+    statement = insert(model.__table__)
+    count = 0
+    for batch in _batches(rows, batch_size):
+        connection.execute(statement, [dict(zip(names, row)) for row in batch])
+        count += len(batch)
+    return count
+
+
+def _reset_sequences(db: Session, models: list):
+    """Move PostgreSQL id sequences past the explicitly inserted ids"""
+    if db.get_bind().dialect.name != "postgresql":
+        return
+    for model in models:
+        table = model.__tablename__
+        db.execute(text(
+            f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), COALESCE((SELECT MAX(id) FROM {table}), 0) + 1, false)"
+        ))
+
+
+def _mondays(weeks: int) -> List[date]:
+    today = date.today()
+    current = today - timedelta(days=today.weekday())
+    return [current - timedelta(weeks=weeks - 1 - index) for index in range(weeks)]
+
+
+USER_COLUMNS = ["id", "username", "email", "password", "role", "manager_id"]
+PROJECT_COLUMNS = ["id", "name", "description", "updated_at"]
+TIMESHEET_COLUMNS = [
+    "id", "employee_id", "year", "week_number", "status",
+    "submitted_at", "reviewed_at", "reviewed_by", "rejection_comment"
+]
+ENTRY_COLUMNS = ["employee_id", "project_id", "timesheet_id", "date", "hours", "description", "updated_at"]
+
+
+def _users(request: SeedRequest, password: str) -> Iterator[tuple]:
+    for m in range(1, request.managers + 1):
+        yield m, f"manager{m}", f"manager{m}@example.com", password, UserRole.MANAGER, None
+    for m in range(1, request.managers + 1):
+        for e in range(1, request.employees_per_manager + 1):
+            user_id = request.managers + (m - 1) * request.employees_per_manager + e
+            yield user_id, f"employee{m}_{e}", f"employee{m}_{e}@example.com", password, UserRole.EMPLOYEE, m
+
+
+def _employees(request: SeedRequest) -> Iterator[tuple]:
+    """(index, employee id, manager id) of every employee"""
+    for index in range(request.managers * request.employees_per_manager):
+        yield index, request.managers + 1 + index, 1 + index // request.employees_per_manager
+
+
+def _timesheets(request: SeedRequest, mondays: List[date]) -> Iterator[tuple]:
+    rng = random.Random(request.random_seed)
+    thresholds = [
+        (request.approved_ratio, TimesheetStatus.APPROVED),
+        (request.approved_ratio + request.rejected_ratio, TimesheetStatus.REJECTED),
+        (request.approved_ratio + request.rejected_ratio + request.submitted_ratio, TimesheetStatus.SUBMITTED),
+    ]
+    for index, employee_id, manager_id in _employees(request):
+        for week, monday in enumerate(mondays):
+            year, week_number, _ = monday.isocalendar()
+            status = TimesheetStatus.DRAFT
+            if week < len(mondays) - 1:
+                draw = rng.random()
+                status = next((s for limit, s in thresholds if draw < limit), TimesheetStatus.DRAFT)
+            submitted = status != TimesheetStatus.DRAFT
+            reviewed = status in (TimesheetStatus.APPROVED, TimesheetStatus.REJECTED)
+            yield (
+                1 + index * len(mondays) + week, employee_id, year, week_number, status,
+                datetime.combine(monday + timedelta(days=4), clock(17)) if submitted else None,
+                datetime.combine(monday + timedelta(days=7), clock(9)) if reviewed else None,
+                manager_id if reviewed else None,
+                REJECTION_COMMENT if status == TimesheetStatus.REJECTED else None,
+            )
+
+
+def _entries(request: SeedRequest, mondays: List[date], now: datetime) -> Iterator[tuple]:
+    per_day = request.entries_per_day
+    descriptions = [f"Work on project {p}" for p in range(1, request.projects + 1)]
+    for index, employee_id, _ in _employees(request):
+        for week, monday in enumerate(mondays):
+            timesheet_id = 1 + index * len(mondays) + week
+            for day, day_hours in enumerate(DAY_HOURS):
+                entry_date = monday + timedelta(days=day)
+                for k in range(per_day):
+                    # Two projects a week, changing every month
+                    project = (index + week // 4 + (day * per_day + k) % 2) % request.projects
+                    yield employee_id, project + 1, timesheet_id, entry_date, day_hours / per_day, descriptions[project], now
+
+
+def seed(db: Session, request: SeedRequest, batch_size: int = BATCH_SIZE) -> SeedResult:
+    """Replace all data with a generated dataset, in one transaction"""
+    start = time.perf_counter()
+    
+    # ORM deletes, so the principal cache and the project catalog are invalidated
+    db.query(DbTimesheetEntry).delete()
+    db.query(DbWeeklyProjectHours).delete()
+    db.query(DbTimesheet).delete()
+    db.query(DbUser).delete()
+    db.query(DbProject).delete()
+    
+    mondays = _mondays(request.weeks)
+    now = datetime.utcnow()
+    password = hash_password(request.password)
+    users = _insert(db, DbUser, USER_COLUMNS, _users(request, password), batch_size)
+    projects = _insert(db, DbProject, PROJECT_COLUMNS, (
+        (p, f"Project {p}", f"Generated project {p}", now) for p in range(1, request.projects + 1)
+    ), batch_size)
+    timesheets = _insert(db, DbTimesheet, TIMESHEET_COLUMNS, _timesheets(request, mondays), batch_size)
+    entries = _insert(db, DbTimesheetEntry, ENTRY_COLUMNS, _entries(request, mondays, now), batch_size)
+    _reset_sequences(db, [DbUser, DbProject, DbTimesheet])
+    refill(db)
+    db.commit()
+    
+    usernames = ["manager1"] + (["employee1_1"] if request.employees_per_manager else [])
+    return SeedResult(
+        managers=request.managers,
+        employees=users - request.managers,
+        projects=projects,
+        timesheets=timesheets,
+        timesheet_entries=entries,
+        seconds=round(time.perf_counter() - start, 3),
+        usernames=usernames,
+        password=request.password
+    )
+
+
+if __name__ == "__main__":
+    import argparse
+    from db import migrations
+    from db.database import SessionLocal, engine
+    
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    for name, field in SeedRequest.model_fields.items():
+        parser.add_argument(f"--{name.replace('_', '-')}", type=field.annotation, default=field.default)
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    args = vars(parser.parse_args())
+    batch_size = args.pop("batch_size")
+    
+    migrations.upgrade(engine)
+    with SessionLocal() as session:
+        result = seed(session, SeedRequest(**args), batch_size)
+    print(
+        f"Seeded {result.managers} managers, {result.employees} employees, {result.projects} projects, "
+        f"{result.timesheets} timesheets and {result.timesheet_entries} entries in {result.seconds:.1f}s "
+        f"({result.timesheet_entries / max(result.seconds, 1e-9):,.0f} entries/s)"
+    )
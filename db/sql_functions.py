@@ -0,0 +1,50 @@
+"""
+Dialect-aware SQL helpers
+
+SQLite has no ISO week support, so the ISO year and week are derived from
+the Thursday of the date's week (ISO weeks belong to the year of their
+Thursday). Other databases use EXTRACT(ISOYEAR / WEEK ...).
+"""
+from sqlalchemy import Integer
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.functions import FunctionElement
+
+# Dialects whose insert() supports ON CONFLICT DO NOTHING / DO UPDATE
+UPSERT_INSERTS = {"sqlite": sqlite.insert, "postgresql": postgresql.insert}
+
+
+class iso_year(FunctionElement):
+    """ISO 8601 year of a date column"""
+    type = Integer()
+    inherit_cache = True
+
+
+class iso_week(FunctionElement):
+    """ISO 8601 week number (1-53) of a date column"""
+    type = Integer()
+    inherit_cache = True
+
+
+def _sqlite_thursday(element, compiler, **kw) -> str:
+    return f"date({compiler.process(element.clauses, **kw)}, '-3 days', 'weekday 4')"
+
+
+@compiles(iso_year)
+def _iso_year(element, compiler, **kw):
+    return f"CAST(EXTRACT(ISOYEAR FROM {compiler.process(element.clauses, **kw)}) AS INTEGER)"
+
+
+@compiles(iso_year, "sqlite")
+def _iso_year_sqlite(element, compiler, **kw):
+    return f"CAST(strftime('%Y', {_sqlite_thursday(element, compiler, **kw)}) AS INTEGER)"
+
+
+@compiles(iso_week)
+def _iso_week(element, compiler, **kw):
+    return f"CAST(EXTRACT(WEEK FROM {compiler.process(element.clauses, **kw)}) AS INTEGER)"
+
+
+@compiles(iso_week, "sqlite")
+def _iso_week_sqlite(element, compiler, **kw):
+    return f"((CAST(strftime('%j', {_sqlite_thursday(element, compiler, **kw)}) AS INTEGER) + 6) / 7)"
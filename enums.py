@@ -10,3 +10,31 @@ class TimesheetStatus(str, Enum):
     SUBMITTED = "submitted"
     APPROVED = "approved"
     REJECTED = "rejected"
+
+
+class ReviewAction(str, Enum):
+    APPROVE = "approve"
+    REJECT = "reject"
+
+
+class BulkMode(str, Enum):
+    ALL_OR_NOTHING = "all_or_nothing"
+    BEST_EFFORT = "best_effort"
+
+
+class BulkItemStatus(str, Enum):
+    CREATED = "created"
+    FAILED = "failed"
+
+
+class ReportGroup(str, Enum):
+    PROJECT = "project"
+    EMPLOYEE = "employee"
+    DAY = "day"
+    WEEK = "week"
+    MONTH = "month"
+
+
+class ExportFormat(str, Enum):
+    CSV = "csv"
+    NDJSON = "ndjson"
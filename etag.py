@@ -0,0 +1,39 @@
+"""
+Weak ETags for list endpoints
+
+A collection's ETag is a hash of the request (scope, filters, paging) and a
+cheap change signal computed with one aggregate query, e.g. the row count,
+the sum of ids and max(updated_at). When the client's If-None-Match still
+matches, the route answers 304 without loading or serializing any rows.
+"""
+import hashlib
+from fastapi import Request, Response, status
+
+
+def weak_etag(*parts) -> str:
+    """Weak ETag over the string form of `parts`"""
+    digest = hashlib.sha1("|".join(str(part) for part in parts).encode("utf-8")).hexdigest()
+    return f'W/"{digest[:32]}"'
+
+
+def is_fresh(request: Request, etag: str) -> bool:
+    """True when If-None-Match matches `etag` (weak comparison)"""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    opaque = etag.removeprefix("W/")
+    return any(candidate.strip().removeprefix("W/") == opaque for candidate in header.split(","))
+
+
+def not_modified(etag: str) -> Response:
+    return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+
+
+def tagged(response: Response, etag: str, result):
+    """Attach `etag` to the route's response, whether it returns data or a Response"""
+    response.headers["ETag"] = etag
+    if isinstance(result, Response):
+        result.headers["ETag"] = etag
+    return result
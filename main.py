@@ -1,46 +1,94 @@
-import uvicorn
+import os
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
 from auth import authentication
-from router import user, project, timesheet_entry, seed, health
-from db import models
+from router import user, project, timesheet_entry, timesheet, report, health, metrics, admin
+from db import migrations
 from db.database import engine
+from db.db_project import project_catalog
+from db.pagination import NEXT_CURSOR_HEADER
+from db.instrumentation import QueryTimingMiddleware
+from metrics import MetricsMiddleware
 
-app = FastAPI(
-    title="Timesheet API",
-    description="Time tracking system for employees and managers",
-    version="1.0.0"
-)
+# POST /seed/database replaces all data - only mounted when enabled, for development
+SEED_ENDPOINT = os.getenv("SEED_ENDPOINT", "false").lower() in ("1", "true", "yes")
 
-# CORS middleware
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["*"],
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
 
-# Include routers
-app.include_router(health.router)  # Health check - no auth required
-app.include_router(authentication.router)
-app.include_router(user.router)
-app.include_router(project.router)
-app.include_router(timesheet_entry.router)
-app.include_router(seed.router)
+def create_app(bind: Engine = engine, seed_endpoint: bool = SEED_ENDPOINT) -> FastAPI:
+    """
+    Build the application without touching the database
+    
+    Startup work runs in the lifespan hook against `bind`: it checks that
+    the schema is migrated (python -m db.migrations) and loads the project
+    catalog.
+    """
+    @asynccontextmanager
+    async def lifespan(app: FastAPI):
+        pending = migrations.pending_versions(bind)
+        if pending:
+            raise RuntimeError(f"Database schema is not up to date, pending migrations {pending}: run python -m db.migrations")
+        with Session(bind) as db:
+            project_catalog.values(db)
+        yield
+    
+    app = FastAPI(
+        title="Timesheet API",
+        description="Time tracking system for employees and managers",
+        version="1.0.0",
+        lifespan=lifespan
+    )
+    
+    # CORS middleware
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=["*"],
+        allow_credentials=True,
+        allow_methods=["*"],
+        allow_headers=["*"],
+        expose_headers=[NEXT_CURSOR_HEADER, "ETag", "Server-Timing"],
+    )
+    
+    # Statement count and database time of each request, as a Server-Timing header
+    app.add_middleware(QueryTimingMiddleware)
+    
+    # Request counts and latency per route template for /metrics (outermost, so it times the whole stack)
+    app.add_middleware(MetricsMiddleware)
+    
+    # Include routers
+    app.include_router(health.router)  # Health check - no auth required
+    app.include_router(metrics.router)  # Prometheus scrape endpoint - no auth required
+    app.include_router(authentication.router)
+    app.include_router(user.router)
+    app.include_router(project.router)
+    app.include_router(timesheet_entry.router)
+    app.include_router(timesheet.router)
+    app.include_router(report.router)
+    app.include_router(admin.router)
+    if seed_endpoint:
+        from router import seed
+        app.include_router(seed.router)
+    
+    @app.get("/")
+    def root():
+        return {
+            "message": "Welcome to Timesheet API",
+            "docs": "/docs",
+            "version": "1.0.0"
+        }
+    
+    return app
 
-# Create database tables
-models.Base.metadata.create_all(engine)
 
-@app.get("/")
-def root():
-    return {
-        "message": "Welcome to Timesheet API",
-        "docs": "/docs",
-        "version": "1.0.0"
-    }
+app = create_app()
 
 if __name__ == "__main__":
+    import uvicorn
+    
+    # Development server: migrate the local database first
+    migrations.upgrade(engine)
     # Important: reload=False for debugging with breakpoints
     uvicorn.run(
         "main:app",
@@ -0,0 +1,281 @@
+"""
+Prometheus metrics in the text exposition format
+
+Counters, histograms and gauges are kept in process memory: recording is a
+dict update under a per-metric lock, no I/O. Modules define their metrics
+next to the code they measure (HTTP requests here, the connection pool in
+db.database, bcrypt in auth.hash, token failures in auth.oauth2) and
+`render()` exposes all of them.
+
+With several worker processes, set METRICS_DIR to a directory shared by
+the workers (and emptied before they start). Each worker then writes a
+snapshot of its metrics there every METRICS_FLUSH_SECONDS, and `/metrics`,
+whichever worker answers it, sums the snapshots of all workers. Counters
+and histograms of exited workers are kept so totals never go backwards;
+their gauges are dropped.
+"""
+import atexit
+import glob
+import json
+import logging
+import os
+import threading
+import time
+from bisect import bisect_left
+from typing import Callable, Dict, List, Optional
+
+METRICS_DIR = os.getenv("METRICS_DIR")
+METRICS_FLUSH_SECONDS = float(os.getenv("METRICS_FLUSH_SECONDS", "5"))
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Seconds - from a cached lookup to a slow bcrypt check or report
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+logger = logging.getLogger(__name__)
+
+REGISTRY: List["_Metric"] = []
+
+
+class _Metric:
+    type = ""
+    
+    def __init__(self, name: str, help: str, labelnames: tuple = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+        REGISTRY.append(self)
+    
+    def describe(self) -> dict:
+        return {"type": self.type, "help": self.help, "labelnames": list(self.labelnames)}
+    
+    def samples(self) -> list:
+        """[label values, value] pairs"""
+        with self._lock:
+            return [[list(labels), value] for labels, value in self._values.items()]
+
+
+class Counter(_Metric):
+    """Monotonic count per label values"""
+    type = "counter"
+    
+    def inc(self, *labels: str, amount: float = 1.0):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0.0) + amount
+
+
+class Histogram(_Metric):
+    """Observation counts per bucket, plus their sum, per label values"""
+    type = "histogram"
+    
+    def __init__(self, name: str, help: str, labelnames: tuple = (), buckets: tuple = LATENCY_BUCKETS):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(buckets)
+    
+    def observe(self, value: float, *labels: str):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._values.get(labels)
+            if series is None:
+                series = self._values[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][index] += 1
+            series[1] += value
+    
+    def describe(self) -> dict:
+        return {**super().describe(), "buckets": list(self.buckets)}
+    
+    def samples(self) -> list:
+        with self._lock:
+            return [[list(labels), [list(counts), total]] for labels, (counts, total) in self._values.items()]
+
+
+class Gauge(_Metric):
+    """Current value, read from `collect` when the metrics are exposed"""
+    type = "gauge"
+    
+    def __init__(self, name: str, help: str, collect: Callable[[], Optional[float]]):
+        super().__init__(name, help)
+        self._collect = collect
+    
+    def samples(self) -> list:
+        value = self._collect()
+        return [] if value is None else [[[], float(value)]]
+
+
+def snapshot() -> dict:
+    """This process's metrics, as written to METRICS_DIR"""
+    return {
+        "pid": os.getpid(),
+        "metrics": {metric.name: {**metric.describe(), "samples": metric.samples()} for metric in REGISTRY},
+    }
+
+
+def _snapshot_path(pid: int) -> str:
+    return os.path.join(METRICS_DIR, f"metrics-{pid}.json")
+
+
+def write_snapshot():
+    """Replace this process's snapshot file in METRICS_DIR"""
+    os.makedirs(METRICS_DIR, exist_ok=True)
+    path = _snapshot_path(os.getpid())
+    with open(f"{path}.tmp", "w") as f:
+        json.dump(snapshot(), f)
+    os.replace(f"{path}.tmp", path)
+
+
+def _read_snapshots() -> List[dict]:
+    snapshots = []
+    for path in glob.glob(os.path.join(METRICS_DIR, "metrics-*.json")):
+        try:
+            with open(path) as f:
+                snapshots.append(json.load(f))
+        except (OSError, ValueError):
+            # Removed or half written by a worker that is exiting
+            continue
+    return snapshots
+
+
+def _is_alive(pid: int) -> bool:
+    if pid == os.getpid():
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _merge(snapshots: List[dict]) -> Dict[str, dict]:
+    """Sum the samples of all snapshots by metric name and label values"""
+    merged = {}
+    for worker in snapshots:
+        alive = _is_alive(worker["pid"])
+        for name, metric in worker["metrics"].items():
+            if metric["type"] == "gauge" and not alive:
+                continue
+            series = merged.setdefault(name, {**metric, "samples": {}})["samples"]
+            for labels, value in metric["samples"]:
+                key = tuple(labels)
+                current = series.get(key)
+                if metric["type"] != "histogram":
+                    series[key] = (current or 0.0) + value
+                elif current is None:
+                    series[key] = [list(value[0]), value[1]]
+                else:
+                    current[0] = [a + b for a, b in zip(current[0], value[0])]
+                    current[1] += value[1]
+    return merged
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names, values, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format(value: float) -> str:
+    return repr(float(value))
+
+
+def _exposition(merged: Dict[str, dict]) -> str:
+    lines = []
+    for name, metric in merged.items():
+        lines.append(f"# HELP {name} {metric['help']}")
+        lines.append(f"# TYPE {name} {metric['type']}")
+        names = metric["labelnames"]
+        for labels, value in metric["samples"].items():
+            if metric["type"] != "histogram":
+                lines.append(f"{name}{_labels(names, labels)} {_format(value)}")
+                continue
+            counts, total = value
+            cumulative = 0
+            for bound, count in zip(metric["buckets"] + ["+Inf"], counts):
+                cumulative += count
+                le = 'le="+Inf"' if bound == "+Inf" else f'le="{_format(bound)}"'
+                lines.append(f"{name}_bucket{_labels(names, labels, le)} {_format(cumulative)}")
+            lines.append(f"{name}_sum{_labels(names, labels)} {_format(total)}")
+            lines.append(f"{name}_count{_labels(names, labels)} {_format(cumulative)}")
+    return "\n".join(lines) + "\n"
+
+
+def render() -> str:
+    """All metrics, summed over the workers sharing METRICS_DIR when it is set"""
+    if not METRICS_DIR:
+        return _exposition(_merge([snapshot()]))
+    write_snapshot()
+    return _exposition(_merge(_read_snapshots()))
+
+
+_flusher_lock = threading.Lock()
+_flusher_started = False
+
+
+def _flush_periodically():
+    while True:
+        time.sleep(METRICS_FLUSH_SECONDS)
+        try:
+            write_snapshot()
+        except OSError:
+            logger.exception("Could not write metrics snapshot to %s", METRICS_DIR)
+
+
+def start_flusher():
+    """Write this worker's snapshot every METRICS_FLUSH_SECONDS and at exit (once per process)"""
+    global _flusher_started
+    with _flusher_lock:
+        if _flusher_started:
+            return
+        _flusher_started = True
+    if not METRICS_DIR:
+        return
+    threading.Thread(target=_flush_periodically, name="metrics-flush", daemon=True).start()
+    atexit.register(write_snapshot)
+
+
+http_requests = Counter(
+    "http_requests_total", "HTTP requests by route template and status", ("method", "route", "status")
+)
+http_request_seconds = Histogram(
+    "http_request_duration_seconds", "HTTP request latency by route template", ("method", "route")
+)
+
+
+class MetricsMiddleware:
+    """ASGI middleware that counts and times requests per route template"""
+    
+    def __init__(self, app):
+        self.app = app
+    
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        
+        if not _flusher_started:
+            start_flusher()
+        started = time.perf_counter()
+        status_code = 500
+        
+        async def send_with_status(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+        
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            # Templates, not raw paths, keep the label set bounded
+            route = getattr(scope.get("route"), "path", None) or "unmatched"
+            method = scope["method"]
+            http_requests.inc(method, route, str(status_code))
+            http_request_seconds.observe(time.perf_counter() - started, method, route)
@@ -0,0 +1,36 @@
+from fastapi import APIRouter, Depends, status
+from db import instrumentation
+from schemas import SlowQueryLog
+from auth.principal import Principal
+from router.timesheet import require_manager
+
+router = APIRouter(
+    prefix="/admin",
+    tags=["admin"]
+)
+
+
+@router.get("/slow-queries", response_model=SlowQueryLog)
+def get_slow_queries(current_user: Principal = Depends(require_manager)):
+    """
+    Recent slow SQL statements of this worker (manager only)
+    
+    Statements that took SLOW_QUERY_MS or longer, sampled at
+    SLOW_QUERY_SAMPLE_RATE into a buffer of the last SLOW_QUERY_BUFFER_SIZE,
+    newest first. Each comes with the repository function and route that
+    issued it and the plan of its fingerprint.
+    """
+    return {
+        "threshold_ms": instrumentation.SLOW_QUERY_MS,
+        "sample_rate": instrumentation.SLOW_QUERY_SAMPLE_RATE,
+        "buffer_size": instrumentation.slow_queries.maxlen,
+        "queries": instrumentation.recent_slow_queries()
+    }
+
+
+@router.delete("/slow-queries", status_code=status.HTTP_204_NO_CONTENT)
+def clear_slow_queries(current_user: Principal = Depends(require_manager)):
+    """
+    Empty this worker's slow-query buffer, e.g. before a load test (manager only)
+    """
+    instrumentation.slow_queries.clear()
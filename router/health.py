@@ -1,123 +1,152 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, status
+from fastapi.responses import JSONResponse
 from sqlalchemy.orm import Session
-from sqlalchemy import text
+from sqlalchemy import func, select, text
 from db.database import get_db
 from db.models import DbUser, DbProject, DbTimesheetEntry
+from db.db_project import project_catalog
+from auth.oauth2 import principal_cache
+from auth.hash import password_pool
+from enums import UserRole
+import os
 import sys
+import threading
+import time
+
+# How long the database part of /health is reused (0 recomputes on every call)
+HEALTH_CACHE_SECONDS = float(os.getenv("HEALTH_CACHE_SECONDS", "30"))
 
 router = APIRouter(
     tags=["health"]
 )
 
+_database_checks = {"computed_at": None, "checks": {}}
+_database_checks_lock = threading.Lock()
 
-@router.get("/health")
-def health_check(db: Session = Depends(get_db)):
+
+@router.get("/health/live")
+def liveness():
     """
-    Health check endpoint - no authentication required
+    Liveness probe - the process is up and serving requests
     
-    Performs smoke tests on basic functionality:
-    - Database connectivity
-    - Model integrity
-    - Python version
-    
-    Returns status and diagnostic information
+    Touches no database, so a slow or unreachable database never gets the
+    process restarted.
     """
-    checks = {
-        "status": "healthy",
-        "checks": {}
-    }
-    
-    # Check 1: Python version
-    try:
-        python_version = f"{sys.version_info.major}.{sys.version_info.minor}.{sys.version_info.micro}"
-        checks["checks"]["python_version"] = {
-            "status": "ok",
-            "version": python_version
-        }
-    except Exception as e:
-        checks["checks"]["python_version"] = {
-            "status": "error",
-            "message": str(e)
-        }
-        checks["status"] = "unhealthy"
+    return {"status": "alive"}
+
+
+@router.get("/health/ready")
+def readiness(db: Session = Depends(get_db)):
+    """
+    Readiness probe - a pooled database connection answers SELECT 1
     
-    # Check 2: Database connection
+    Returns 503 while the database is unreachable.
+    """
     try:
         db.execute(text("SELECT 1"))
-        checks["checks"]["database_connection"] = {
-            "status": "ok",
-            "message": "Connected"
-        }
     except Exception as e:
-        checks["checks"]["database_connection"] = {
-            "status": "error",
-            "message": str(e)
-        }
-        checks["status"] = "unhealthy"
+        return JSONResponse(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            content={"status": "unavailable", "message": str(e)}
+        )
+    return {"status": "ready"}
+
+
+def _count_database(db: Session) -> dict:
+    """All record and role counts in one aggregate query"""
+    def count(model, *criteria):
+        return select(func.count()).select_from(model).where(*criteria).scalar_subquery()
     
-    # Check 3: Database tables exist
-    try:
-        # Try to query each table
-        db.query(DbUser).first()
-        db.query(DbProject).first()
-        db.query(DbTimesheetEntry).first()
-        
-        checks["checks"]["database_tables"] = {
-            "status": "ok",
-            "tables": ["users", "projects", "timesheet_entries"]
-        }
-    except Exception as e:
-        checks["checks"]["database_tables"] = {
-            "status": "error",
-            "message": str(e)
-        }
-        checks["status"] = "unhealthy"
+    counts = db.execute(select(
+        count(DbUser),
+        count(DbProject),
+        count(DbTimesheetEntry),
+        count(DbUser, DbUser.role == UserRole.MANAGER),
+        count(DbUser, DbUser.role == UserRole.EMPLOYEE),
+        count(DbUser, DbUser.manager_id.isnot(None)),
+    )).one()
     
-    # Check 4: Count records (smoke test data existence)
-    try:
-        user_count = db.query(DbUser).count()
-        project_count = db.query(DbProject).count()
-        entry_count = db.query(DbTimesheetEntry).count()
-        
-        checks["checks"]["data_counts"] = {
+    checks = {
+        "database_connection": {"status": "ok", "message": "Connected"},
+        "database_tables": {"status": "ok", "tables": ["users", "projects", "timesheet_entries"]},
+        "data_counts": {
             "status": "ok",
-            "users": user_count,
-            "projects": project_count,
-            "entries": entry_count,
-            "note": "Run POST /seed/database if counts are 0"
-        }
-    except Exception as e:
-        checks["checks"]["data_counts"] = {
-            "status": "error",
-            "message": str(e)
+            "users": counts[0],
+            "projects": counts[1],
+            "entries": counts[2],
+            "note": "Run python -m db.seeding (db/seeding.py) if counts are 0"
+        },
+        "roles_distribution": {
+            "status": "ok",
+            "managers": counts[3],
+            "employees": counts[4],
+            "employees_assigned_to_manager": counts[5]
         }
-        checks["status"] = "unhealthy"
+    }
+    if counts[3] == 0 or counts[4] == 0:
+        checks["roles_distribution"]["note"] = "Run python -m db.seeding (db/seeding.py) to create users"
+    return checks
+
+
+def _cached_database_checks(db: Session) -> tuple:
+    """
+    Database checks as (healthy, checks, age in seconds), recomputed at most
+    every HEALTH_CACHE_SECONDS; failures are not cached
+    """
+    with _database_checks_lock:
+        computed_at = _database_checks["computed_at"]
+        if computed_at is not None and time.monotonic() - computed_at < HEALTH_CACHE_SECONDS:
+            return True, _database_checks["checks"], time.monotonic() - computed_at
     
-    # Check 5: User roles distribution
     try:
-        # Check if there are managers and employees
-        from enums import UserRole
-        manager_count = db.query(DbUser).filter(DbUser.role == UserRole.MANAGER).count()
-        employee_count = db.query(DbUser).filter(DbUser.role == UserRole.EMPLOYEE).count()
-        employees_assigned = db.query(DbUser).filter(
-            DbUser.manager_id.isnot(None)
-        ).count()
-        
-        checks["checks"]["roles_distribution"] = {
-            "status": "ok",
-            "managers": manager_count,
-            "employees": employee_count,
-            "employees_assigned_to_manager": employees_assigned
-        }
-        
-        if manager_count == 0 or employee_count == 0:
-            checks["checks"]["roles_distribution"]["note"] = "Run POST /seed/database to create users"
-            
+        checks = _count_database(db)
     except Exception as e:
-        checks["checks"]["roles_distribution"] = {
-            "status": "error",
-            "message": str(e)
+        return False, {"database_connection": {"status": "error", "message": str(e)}}, 0.0
+    
+    with _database_checks_lock:
+        _database_checks.update(computed_at=time.monotonic(), checks=checks)
+    return True, checks, 0.0
+
+
+@router.get("/health")
+def health_check(db: Session = Depends(get_db)):
+    """
+    Deep diagnostics - no authentication required
+    
+    Performs smoke tests on basic functionality:
+    - Database connection, tables, record counts and role distribution
+      (one aggregate query, cached for HEALTH_CACHE_SECONDS)
+    - Python version
+    - In-process caches and the password pool
+    
+    Returns status and diagnostic information. Orchestrators should probe
+    /health/live and /health/ready instead.
+    """
+    healthy, database_checks, age = _cached_database_checks(db)
+    checks = {
+        "status": "healthy" if healthy else "unhealthy",
+        "database_checks_age_seconds": round(age, 3),
+        "checks": {
+            "python_version": {
+                "status": "ok",
+                "version": f"{sys.version_info.major}.{sys.version_info.minor}.{sys.version_info.micro}"
+            },
+            **database_checks
         }
-        checks["status"] = "unhealthy"
+    }
+    
+    # In-process, per worker - always current
+    checks["checks"]["principal_cache"] = {
+        "status": "ok",
+        **principal_cache.stats()
+    }
+    checks["checks"]["project_catalog"] = {
+        "status": "ok",
+        **project_catalog.stats()
+    }
+    checks["checks"]["password_pool"] = {
+        "status": "ok",
+        **password_pool.stats()
+    }
     
     return checks
@@ -0,0 +1,18 @@
+from fastapi import APIRouter, Response
+import metrics
+
+router = APIRouter(
+    tags=["metrics"]
+)
+
+
+@router.get("/metrics", include_in_schema=False)
+def get_metrics():
+    """
+    Prometheus scrape endpoint - no authentication required
+    
+    Request counts and latency per route template, connection pool
+    occupancy and checkout time, bcrypt verification time and rejected
+    tokens. With METRICS_DIR set the values cover every worker.
+    """
+    return Response(content=metrics.render(), media_type=metrics.CONTENT_TYPE)
@@ -1,11 +1,13 @@
-from fastapi import APIRouter, Depends, status
+from fastapi import APIRouter, Depends, Query, Request, Response, status
 from sqlalchemy.orm import Session
 from db.database import get_db
 from db import db_project
+from db.pagination import MAX_PAGE_SIZE, page_response
 from schemas import ProjectCreate, ProjectDisplay
 from auth.oauth2 import get_current_user
-from db.models import DbUser
-from typing import List
+from auth.principal import Principal
+from etag import is_fresh, not_modified, tagged, weak_etag
+from typing import List, Optional
 
 router = APIRouter(
     prefix="/projects",
@@ -17,7 +19,7 @@ router = APIRouter(
 def create_project(
     request: ProjectCreate,
     db: Session = Depends(get_db),
-    current_user: DbUser = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_user)
 ):
     """
     Create a new project (authenticated users only)
@@ -29,7 +31,7 @@ def create_project(
 def get_project(
     project_id: int,
     db: Session = Depends(get_db),
-    current_user: DbUser = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_user)
 ):
     """
     Get project by ID
@@ -39,10 +41,22 @@ def get_project(
 
 @router.get("/", response_model=List[ProjectDisplay])
 def get_all_projects(
+    http_request: Request,
+    response: Response,
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
     db: Session = Depends(get_db),
-    current_user: DbUser = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_user)
 ):
     """
     Get all projects
+    
+    Pass `limit` to page through the results; the cursor for the next page
+    is returned in the X-Next-Cursor header. Responses carry a weak ETag;
+    send it back in If-None-Match to get a 304 when nothing changed.
     """
-    return db_project.get_all_projects(db)
+    etag = weak_etag("projects", http_request.url.query, *db_project.get_projects_version(db))
+    if is_fresh(http_request, etag):
+        return not_modified(etag)
+    
+    return tagged(response, etag, page_response(response, db_project.get_all_projects(db, limit, cursor)))
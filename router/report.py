@@ -0,0 +1,36 @@
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.orm import Session
+from db.database import get_db
+from db import db_report
+from schemas import HoursReport, TeamEntryFilter
+from auth.oauth2 import get_current_user
+from auth.principal import Principal
+from enums import UserRole, ReportGroup
+from typing import List
+
+router = APIRouter(
+    prefix="/reports",
+    tags=["reports"]
+)
+
+
+@router.get("/hours", response_model=HoursReport)
+def get_hours_report(
+    group_by: List[ReportGroup] = Query([ReportGroup.PROJECT]),
+    filters: TeamEntryFilter = Depends(),
+    db: Session = Depends(get_db),
+    current_user: Principal = Depends(get_current_user)
+):
+    """
+    Total hours and entry counts, aggregated in the database
+    
+    Repeat `group_by` to combine dimensions: project, employee and at most
+    one period (day, week or month), e.g. ?group_by=project&group_by=month.
+    Optional filters: from_date, to_date (inclusive), project_id and
+    employee_id.
+    
+    Managers report on their team, employees on their own entries.
+    """
+    if current_user.role == UserRole.MANAGER:
+        return db_report.get_hours_report(db, group_by, filters, manager_id=current_user.id)
+    return db_report.get_hours_report(db, group_by, filters, employee_id=current_user.id)
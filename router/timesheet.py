@@ -0,0 +1,115 @@
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
+from sqlalchemy.orm import Session
+from db.database import get_db
+from db import db_timesheet
+from db.pagination import MAX_PAGE_SIZE, page_response
+from schemas import (
+    TimesheetSubmit, TimesheetReject, TimesheetDisplay, TimesheetBatchReview, TimesheetBatchReviewResult
+)
+from auth.oauth2 import get_current_user
+from auth.principal import Principal
+from enums import UserRole, TimesheetStatus, ReviewAction
+from typing import List, Optional
+
+router = APIRouter(
+    prefix="/timesheets",
+    tags=["timesheets"]
+)
+
+
+def require_manager(current_user: Principal = Depends(get_current_user)) -> Principal:
+    """Dependency - the authenticated user must have the manager role"""
+    if current_user.role != UserRole.MANAGER:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Only managers can perform this action"
+        )
+    return current_user
+
+
+@router.post("/submit", response_model=TimesheetDisplay)
+def submit_timesheet(
+    request: TimesheetSubmit,
+    db: Session = Depends(get_db),
+    current_user: Principal = Depends(get_current_user)
+):
+    """
+    Submit the authenticated user's timesheet for an ISO week
+    
+    Attaches the week's entries to the timesheet. Draft and rejected
+    timesheets can be (re)submitted.
+    """
+    return db_timesheet.submit_timesheet(db, current_user.id, request)
+
+
+@router.get("/my-timesheets", response_model=List[TimesheetDisplay])
+def get_my_timesheets(
+    response: Response,
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    db: Session = Depends(get_db),
+    current_user: Principal = Depends(get_current_user)
+):
+    """
+    Get all timesheets of the authenticated user
+    """
+    return page_response(response, db_timesheet.get_my_timesheets(db, current_user.id, limit, cursor))
+
+
+@router.get("/team-timesheets", response_model=List[TimesheetDisplay])
+def get_team_timesheets(
+    response: Response,
+    status_filter: Optional[TimesheetStatus] = Query(None, alias="status"),
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    db: Session = Depends(get_db),
+    current_user: Principal = Depends(require_manager)
+):
+    """
+    Get the timesheets of the manager's team, optionally filtered by status
+    (Manager role required)
+    """
+    return page_response(response, db_timesheet.get_team_timesheets(db, current_user.id, status_filter, limit, cursor))
+
+
+@router.post("/batch-review", response_model=TimesheetBatchReviewResult)
+def review_timesheets_batch(
+    request: TimesheetBatchReview,
+    db: Session = Depends(get_db),
+    current_user: Principal = Depends(require_manager)
+):
+    """
+    Approve or reject up to 10,000 timesheets in one transaction
+    (Manager role required)
+    
+    Only submitted timesheets of the manager's team are changed; all other
+    ids are returned in skipped_ids. Rejections require a comment.
+    """
+    return db_timesheet.review_timesheets_batch(db, current_user.id, request)
+
+
+@router.post("/{timesheet_id}/approve", response_model=TimesheetDisplay)
+def approve_timesheet(
+    timesheet_id: int,
+    db: Session = Depends(get_db),
+    current_user: Principal = Depends(require_manager)
+):
+    """
+    Approve a submitted timesheet of a team member
+    (Manager role required)
+    """
+    return db_timesheet.review_timesheet(db, timesheet_id, current_user.id, ReviewAction.APPROVE)
+
+
+@router.post("/{timesheet_id}/reject", response_model=TimesheetDisplay)
+def reject_timesheet(
+    timesheet_id: int,
+    request: TimesheetReject,
+    db: Session = Depends(get_db),
+    current_user: Principal = Depends(require_manager)
+):
+    """
+    Reject a submitted timesheet of a team member with a comment
+    (Manager role required)
+    """
+    return db_timesheet.review_timesheet(db, timesheet_id, current_user.id, ReviewAction.REJECT, request.comment)
@@ -1,12 +1,19 @@
-from fastapi import APIRouter, Depends, status
+from fastapi import APIRouter, Depends, Query, Request, Response, status
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 from db.database import get_db
-from db import db_timesheet_entry
-from schemas import TimesheetEntryCreate, TimesheetEntryUpdate, TimesheetEntryDisplay
+from db import db_timesheet_entry, db_weekly_hours
+from db.pagination import MAX_PAGE_SIZE, page_response
+from schemas import (
+    TimesheetEntryCreate, TimesheetEntryUpdate, TimesheetEntryDisplay, TimesheetEntryFilter, TeamEntryFilter,
+    TimesheetEntryBulkCreate, TimesheetEntryBulkResult, WeeklyHoursDisplay
+)
 from auth.oauth2 import get_current_user
-from db.models import DbUser
-from enums import UserRole
-from typing import List
+from auth.principal import Principal
+from enums import UserRole, ExportFormat
+from etag import is_fresh, not_modified, tagged, weak_etag
+from serialization import export_response, json_array_response, row_columns
+from typing import List, Optional
 
 router = APIRouter(
     prefix="/timesheet-entries",
@@ -18,7 +25,7 @@ router = APIRouter(
 def create_entry(
     request: TimesheetEntryCreate,
     db: Session = Depends(get_db),
-    current_user: DbUser = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_user)
 ):
     """
     Create a new timesheet entry for the authenticated user
@@ -26,25 +33,84 @@ def create_entry(
     return db_timesheet_entry.create_entry(db, request, current_user.id)
 
 
+@router.post("/bulk", status_code=status.HTTP_201_CREATED, response_model=TimesheetEntryBulkResult)
+def create_entries_bulk(
+    request: TimesheetEntryBulkCreate,
+    db: Session = Depends(get_db),
+    current_user: Principal = Depends(get_current_user)
+):
+    """
+    Create many timesheet entries for the authenticated user in one request
+    
+    mode=all_or_nothing (default) rejects the whole batch with 400 if any
+    item is invalid; mode=best_effort creates the valid items and reports
+    the rest. Results are returned per item, in request order.
+    """
+    return db_timesheet_entry.create_entries_bulk(db, request, current_user.id)
+
+
 @router.get("/my-entries", response_model=List[TimesheetEntryDisplay])
 def get_my_entries(
+    http_request: Request,
+    response: Response,
+    filters: TimesheetEntryFilter = Depends(),
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
     db: Session = Depends(get_db),
-    current_user: DbUser = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_user)
 ):
     """
-    Get all timesheet entries for the authenticated user
+    Get all timesheet entries for the authenticated user, ordered by date
+    
+    Optional filters: from_date, to_date (inclusive) and project_id
+    
+    Pass `limit` to page through the results; the cursor for the next page
+    is returned in the X-Next-Cursor header. Without `limit` the full
+    history is streamed.
+    
+    Responses carry a weak ETag; send it back in If-None-Match to get a
+    304 when nothing changed.
     """
-    return db_timesheet_entry.get_my_entries(db, current_user.id)
+    etag = weak_etag(
+        "my-entries", current_user.id, http_request.url.query,
+        *db_timesheet_entry.get_my_entries_version(db, current_user.id, filters)
+    )
+    if is_fresh(http_request, etag):
+        return not_modified(etag)
+    
+    columns = row_columns(db_timesheet_entry.ENTRY_COLUMNS)
+    if limit is None and cursor is None:
+        return tagged(response, etag, json_array_response(
+            db_timesheet_entry.iter_my_entries(db, current_user.id, filters, columns), TimesheetEntryDisplay
+        ))
+    return tagged(response, etag, page_response(
+        response, db_timesheet_entry.get_my_entries(db, current_user.id, limit, cursor, filters, columns)
+    ))
 
 
 @router.get("/team-entries", response_model=List[TimesheetEntryDisplay])
 def get_team_entries(
+    http_request: Request,
+    response: Response,
+    filters: TeamEntryFilter = Depends(),
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
     db: Session = Depends(get_db),
-    current_user: DbUser = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_user)
 ):
     """
-    Get all timesheet entries for the manager's team
+    Get all timesheet entries for the manager's team, ordered by date
     (Manager role required)
+    
+    Optional filters: from_date, to_date (inclusive), project_id and
+    employee_id (a member of the team)
+    
+    Pass `limit` to page through the results; the cursor for the next page
+    is returned in the X-Next-Cursor header. Without `limit` the full
+    history is streamed.
+    
+    Responses carry a weak ETag; send it back in If-None-Match to get a
+    304 when nothing changed.
     """
     if current_user.role != UserRole.MANAGER:
         from fastapi import HTTPException
@@ -53,14 +119,90 @@ def get_team_entries(
             detail="Only managers can view team entries"
         )
     
-    return db_timesheet_entry.get_team_entries(db, current_user.id)
+    etag = weak_etag(
+        "team-entries", current_user.id, http_request.url.query,
+        *db_timesheet_entry.get_team_entries_version(db, current_user.id, filters)
+    )
+    if is_fresh(http_request, etag):
+        return not_modified(etag)
+    
+    columns = row_columns(db_timesheet_entry.ENTRY_COLUMNS)
+    if limit is None and cursor is None:
+        return tagged(response, etag, json_array_response(
+            db_timesheet_entry.iter_team_entries(db, current_user.id, filters, columns), TimesheetEntryDisplay
+        ))
+    return tagged(response, etag, page_response(
+        response, db_timesheet_entry.get_team_entries(db, current_user.id, limit, cursor, filters, columns)
+    ))
+
+
+@router.get("/export", response_class=StreamingResponse, responses={200: {"content": {
+    "text/csv": {}, "application/x-ndjson": {}
+}}})
+def export_entries(
+    export_format: ExportFormat = Query(ExportFormat.CSV, alias="format"),
+    filters: TeamEntryFilter = Depends(),
+    db: Session = Depends(get_db),
+    current_user: Principal = Depends(get_current_user)
+):
+    """
+    Download timesheet entries as CSV or NDJSON (`format=csv|ndjson`), ordered by date
+    
+    Managers export their team's entries, employees their own. Optional
+    filters: from_date, to_date (inclusive), project_id and employee_id.
+    
+    The file is streamed with chunked encoding straight from a database
+    cursor, so memory use does not depend on its size.
+    """
+    if current_user.role == UserRole.MANAGER:
+        rows = db_timesheet_entry.iter_entry_rows(db, filters, manager_id=current_user.id)
+    else:
+        rows = db_timesheet_entry.iter_entry_rows(db, filters, employee_id=current_user.id)
+    columns = [column.key for column in db_timesheet_entry.ENTRY_COLUMNS]
+    return export_response(rows, columns, export_format, "timesheet-entries")
+
+
+@router.get("/weekly-hours", response_model=List[WeeklyHoursDisplay])
+def get_my_weekly_hours(
+    year: Optional[int] = None,
+    db: Session = Depends(get_db),
+    current_user: Principal = Depends(get_current_user)
+):
+    """
+    Get the authenticated user's hours per ISO week and project
+    
+    Read from the weekly_project_hours aggregate, one row per week and
+    project regardless of how many entries were logged.
+    """
+    return db_weekly_hours.get_weekly_hours(db, current_user.id, year)
+
+
+@router.get("/team-weekly-hours", response_model=List[WeeklyHoursDisplay])
+def get_team_weekly_hours(
+    year: Optional[int] = None,
+    employee_id: Optional[int] = None,
+    db: Session = Depends(get_db),
+    current_user: Principal = Depends(get_current_user)
+):
+    """
+    Get the team's hours per employee, ISO week and project
+    (Manager role required)
+    """
+    if current_user.role != UserRole.MANAGER:
+        from fastapi import HTTPException
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Only managers can view team hours"
+        )
+    
+    return db_weekly_hours.get_team_weekly_hours(db, current_user.id, year, employee_id)
 
 
 @router.get("/{entry_id}", response_model=TimesheetEntryDisplay)
 def get_entry(
     entry_id: int,
     db: Session = Depends(get_db),
-    current_user: DbUser = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_user)
 ):
     """
     Get a specific timesheet entry by ID
@@ -73,7 +215,7 @@ def update_entry(
     entry_id: int,
     request: TimesheetEntryUpdate,
     db: Session = Depends(get_db),
-    current_user: DbUser = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_user)
 ):
     """
     Update a timesheet entry (only owner can update)
@@ -85,7 +227,7 @@ def update_entry(
 def delete_entry(
     entry_id: int,
     db: Session = Depends(get_db),
-    current_user: DbUser = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_user)
 ):
     """
     Delete a timesheet entry (only owner can delete)
@@ -1,11 +1,13 @@
-from fastapi import APIRouter, Depends, status
+from fastapi import APIRouter, Depends, Query, Response, status
 from sqlalchemy.orm import Session
 from db.database import get_db
 from db import db_user
+from db.pagination import MAX_PAGE_SIZE, page_response
 from schemas import UserCreate, UserDisplay
 from auth.oauth2 import get_current_user
-from db.models import DbUser
-from typing import List
+from auth.principal import Principal
+from serialization import row_columns
+from typing import List, Optional
 
 router = APIRouter(
     prefix="/users",
@@ -26,11 +28,15 @@ def create_user(
 
 @router.get("/me", response_model=UserDisplay)
 def get_current_user_info(
-    current_user: DbUser = Depends(get_current_user)
+    db: Session = Depends(get_db),
+    current_user: Principal = Depends(get_current_user)
 ):
     """
     Get current authenticated user information
     """
+    if current_user.email is None:
+        # Claims-mode principals carry no profile fields
+        return db_user.get_user(db, current_user.id)
     return current_user
 
 
@@ -38,7 +44,7 @@ def get_current_user_info(
 def get_user(
     user_id: int,
     db: Session = Depends(get_db),
-    current_user: DbUser = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_user)
 ):
     """
     Get user by ID (authenticated users only)
@@ -48,22 +54,36 @@ def get_user(
 
 @router.get("/", response_model=List[UserDisplay])
 def get_all_users(
+    response: Response,
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
     db: Session = Depends(get_db),
-    current_user: DbUser = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_user)
 ):
     """
     Get all users (authenticated users only)
+    
+    Pass `limit` to page through the results; the cursor for the next page
+    is returned in the X-Next-Cursor header
     """
-    return db_user.get_all_users(db)
+    columns = row_columns(db_user.USER_COLUMNS)
+    return page_response(response, db_user.get_all_users(db, limit, cursor, columns))
 
 
 @router.get("/manager/{manager_id}/team", response_model=List[UserDisplay])
 def get_team_members(
     manager_id: int,
+    response: Response,
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
     db: Session = Depends(get_db),
-    current_user: DbUser = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_user)
 ):
     """
     Get all team members for a manager
+    
+    Pass `limit` to page through the results; the cursor for the next page
+    is returned in the X-Next-Cursor header
     """
-    return db_user.get_team_members(db, manager_id)
+    columns = row_columns(db_user.USER_COLUMNS)
+    return page_response(response, db_user.get_team_members(db, manager_id, limit, cursor, columns))
@@ -1,7 +1,8 @@
-from pydantic import BaseModel, EmailStr, ConfigDict
-from datetime import date
-from enums import UserRole
-from typing import Optional
+from pydantic import BaseModel, EmailStr, ConfigDict, Field, model_validator
+import datetime as dt
+from datetime import date, datetime
+from enums import UserRole, BulkMode, BulkItemStatus, TimesheetStatus, ReviewAction, ReportGroup
+from typing import List, Optional
 
 
 # User schemas
@@ -65,17 +66,169 @@ class TimesheetEntryCreate(TimesheetEntryBase):
 
 class TimesheetEntryUpdate(BaseModel):
     project_id: Optional[int] = None
-    date: Optional[date] = None
+    date: Optional[dt.date] = None  # dt.date: the field name shadows `date` once it has a default
     hours: Optional[float] = None
     description: Optional[str] = None
 
 
+class TimesheetEntryFilter(BaseModel):
+    from_date: Optional[date] = None
+    to_date: Optional[date] = None
+    project_id: Optional[int] = None
+
+
+class TeamEntryFilter(TimesheetEntryFilter):
+    employee_id: Optional[int] = None
+
+
 class TimesheetEntryDisplay(BaseModel):
     model_config = ConfigDict(from_attributes=True)
     
     id: int
     employee_id: int
     project_id: int
+    timesheet_id: Optional[int] = None
     date: date
     hours: float
     description: Optional[str]
+
+
+class WeeklyHoursDisplay(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+    
+    employee_id: int
+    year: int
+    week_number: int
+    project_id: int
+    total_hours: float
+    entry_count: int
+
+
+# Bulk entry creation
+MAX_BULK_ENTRIES = 500
+
+
+class TimesheetEntryBulkCreate(BaseModel):
+    entries: List[TimesheetEntryCreate] = Field(min_length=1, max_length=MAX_BULK_ENTRIES)
+    mode: BulkMode = BulkMode.ALL_OR_NOTHING
+
+
+class BulkEntryResult(BaseModel):
+    index: int
+    status: BulkItemStatus
+    entry: Optional[TimesheetEntryDisplay] = None
+    error: Optional[str] = None
+
+
+class TimesheetEntryBulkResult(BaseModel):
+    created: int
+    failed: int
+    results: List[BulkEntryResult]
+
+
+# Timesheet schemas
+MAX_BATCH_REVIEW = 10000
+
+
+class TimesheetSubmit(BaseModel):
+    year: int
+    week_number: int = Field(ge=1, le=53)
+
+
+class TimesheetReject(BaseModel):
+    comment: str = Field(min_length=1)
+
+
+class TimesheetDisplay(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+    
+    id: int
+    employee_id: int
+    week_number: int
+    year: int
+    status: TimesheetStatus
+    rejection_comment: Optional[str]
+    submitted_at: Optional[datetime]
+    reviewed_at: Optional[datetime]
+    reviewed_by: Optional[int]
+
+
+class TimesheetBatchReview(BaseModel):
+    timesheet_ids: List[int] = Field(min_length=1, max_length=MAX_BATCH_REVIEW)
+    action: ReviewAction
+    comment: Optional[str] = None
+
+
+class TimesheetBatchReviewResult(BaseModel):
+    updated: int
+    updated_ids: List[int]
+    skipped_ids: List[int]
+
+
+# Reports
+class HoursReportRow(BaseModel):
+    project_id: Optional[int] = None
+    employee_id: Optional[int] = None
+    period: Optional[str] = None  # 2026-03-02 (day), 2026-W10 (week), 2026-03 (month)
+    total_hours: float
+    entry_count: int
+
+
+class HoursReport(BaseModel):
+    group_by: List[ReportGroup]
+    source: str  # "timesheet_entries" or "weekly_project_hours"
+    total_hours: float
+    entry_count: int
+    rows: List[HoursReportRow]
+
+
+# Synthetic data (db/seeding.py)
+class SeedRequest(BaseModel):
+    managers: int = Field(2, ge=1)
+    employees_per_manager: int = Field(2, ge=0)
+    projects: int = Field(3, ge=1)
+    weeks: int = Field(1, ge=1)  # of history, ending with the current week
+    entries_per_day: int = Field(1, ge=1, le=8)
+    # Share of past weeks' timesheets in each state, the rest stay draft
+    submitted_ratio: float = Field(0.1, ge=0, le=1)
+    approved_ratio: float = Field(0.7, ge=0, le=1)
+    rejected_ratio: float = Field(0.05, ge=0, le=1)
+    password: str = "password123"
+    random_seed: int = 0
+    
+    @model_validator(mode="after")
+    def check_ratios(self):
+        if self.submitted_ratio + self.approved_ratio + self.rejected_ratio > 1:
+            raise ValueError("submitted_ratio + approved_ratio + rejected_ratio must not exceed 1")
+        return self
+
+
+class SeedResult(BaseModel):
+    managers: int
+    employees: int
+    projects: int
+    timesheets: int
+    timesheet_entries: int
+    seconds: float
+    usernames: List[str]  # the first manager and, if any, their first employee
+    password: str
+
+
+# Slow-query log (db/instrumentation.py)
+class SlowQueryDisplay(BaseModel):
+    at: datetime
+    duration_ms: float
+    fingerprint: str
+    statement: str
+    parameters: Optional[object]  # types of the bound values, never the values
+    function: Optional[str]  # innermost db.db_* function
+    method: Optional[str]
+    route: Optional[str]  # route template of the request
+    plan: Optional[List[str]]  # EXPLAIN output, captured once per fingerprint
+
+
+class SlowQueryLog(BaseModel):
+    threshold_ms: float
+    sample_rate: float
+    buffer_size: int
+    queries: List[SlowQueryDisplay]  # newest first
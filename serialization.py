@@ -0,0 +1,135 @@
+"""
+Incremental response encoding for large result sets
+
+Rows are read from the database in batches (yield_per) and each batch is
+validated and JSON-encoded on its own, so memory stays flat no matter how
+many rows the response contains.
+
+Fast path (FAST_JSON_RESPONSES=1): list routes select plain row tuples
+instead of ORM objects and encode them with orjson, skipping Pydantic
+validation. The row columns match the response schema field for field, so
+the bytes and the OpenAPI schema are the same either way.
+"""
+import csv
+import io
+import json
+import os
+from datetime import date
+from typing import Iterable, Iterator, List, Optional, Sequence, Type
+from fastapi import Response
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, TypeAdapter
+from enums import ExportFormat
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional speedup
+    orjson = None
+
+STREAM_BATCH_SIZE = int(os.getenv("STREAM_BATCH_SIZE", "500"))
+FAST_JSON_RESPONSES = os.getenv("FAST_JSON_RESPONSES", "false").lower() in ("1", "true", "yes")
+
+
+def _json_default(value):
+    if isinstance(value, date):
+        return value.isoformat()
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+def json_dumps(value) -> bytes:
+    """Compact JSON bytes, with orjson when it is installed"""
+    if orjson is not None:
+        return orjson.dumps(value)
+    return json.dumps(value, default=_json_default, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+
+
+def row_columns(columns: list) -> Optional[list]:
+    """The columns to select for the fast path, None when it is disabled"""
+    return columns if FAST_JSON_RESPONSES else None
+
+
+def is_row(item) -> bool:
+    """True for a plain row (SQLAlchemy Row or NamedTuple), False for an ORM object"""
+    return hasattr(item, "_asdict")
+
+
+def encode_rows(rows: list) -> bytes:
+    """Encode plain rows as a JSON array of objects keyed by column name"""
+    return json_dumps([row._asdict() for row in rows])
+
+
+def encode_items(items: list, schema: Type[BaseModel]) -> bytes:
+    """Encode a list of ORM objects (through `schema`) or plain rows (directly) as a JSON array"""
+    if items and is_row(items[0]):
+        return encode_rows(items)
+    adapter = TypeAdapter(List[schema])
+    return adapter.dump_json(adapter.validate_python(items, from_attributes=True))
+
+
+def _batches(rows: Iterable, size: int) -> Iterator[list]:
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def iter_json_array(rows: Iterable, schema: Type[BaseModel], batch_size: int = STREAM_BATCH_SIZE) -> Iterator[bytes]:
+    """Encode rows (ORM objects or plain rows) as a JSON array, one chunk per batch"""
+    yield b"["
+    first = True
+    for batch in _batches(rows, batch_size):
+        # Each batch encodes to b"[...]"; keep the inside and join batches with commas
+        chunk = encode_items(batch, schema)[1:-1]
+        yield chunk if first else b"," + chunk
+        first = False
+    yield b"]"
+
+
+def json_array_response(rows: Iterable, schema: Type[BaseModel]) -> StreamingResponse:
+    """Stream rows as a JSON array response with the shape of List[schema]"""
+    return StreamingResponse(iter_json_array(rows, schema), media_type="application/json")
+
+
+def rows_response(rows: list, headers: Optional[dict] = None) -> Response:
+    """A JSON array response of plain rows, bypassing response_model validation"""
+    return Response(encode_rows(rows), media_type="application/json", headers=headers)
+
+
+def iter_csv(rows: Iterable[Sequence], columns: List[str], batch_size: int = STREAM_BATCH_SIZE) -> Iterator[bytes]:
+    """Encode plain row tuples as CSV with a header line, one chunk per batch"""
+    # The header goes out before `rows` is iterated, i.e. before the query runs
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    yield buffer.getvalue().encode("utf-8")
+    for batch in _batches(rows, batch_size):
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerows(batch)
+        yield buffer.getvalue().encode("utf-8")
+
+
+def iter_ndjson(rows: Iterable[Sequence], columns: List[str], batch_size: int = STREAM_BATCH_SIZE) -> Iterator[bytes]:
+    """Encode plain row tuples as newline-delimited JSON objects, one chunk per batch"""
+    for batch in _batches(rows, batch_size):
+        yield b"".join(json_dumps(dict(zip(columns, row))) + b"\n" for row in batch)
+
+
+EXPORT_ENCODERS = {
+    ExportFormat.CSV: (iter_csv, "text/csv; charset=utf-8"),
+    ExportFormat.NDJSON: (iter_ndjson, "application/x-ndjson"),
+}
+
+
+def export_response(rows: Iterable[Sequence], columns: List[str], export_format: ExportFormat, filename: str) -> StreamingResponse:
+    """Stream row tuples as a CSV or NDJSON download (chunked, constant memory)"""
+    encode, media_type = EXPORT_ENCODERS[export_format]
+    return StreamingResponse(
+        encode(rows, columns),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}.{export_format.value}"'}
+    )
@@ -1,11 +1,23 @@
+import os
 import pytest
+from contextlib import contextmanager
+
+# Cheapest bcrypt cost for tests - must be set before auth.hash is imported
+os.environ.setdefault("BCRYPT_ROUNDS", "4")
+# Principal cache evictions and claims-mode revocations are applied locally on
+# commit, checking for other workers' changes on a timer would add statements
+# to counted requests
+os.environ.setdefault("PRINCIPAL_CACHE_MAX_AGE_SECONDS", "3600")
+os.environ.setdefault("TOKEN_REVOCATION_MAX_AGE_SECONDS", "3600")
+
 from fastapi.testclient import TestClient
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.pool import StaticPool
-from db.database import Base, get_db
-from main import app
-from db.models import DbUser, DbProject, DbTimesheetEntry
+from db.database import get_db
+from db import migrations
+from main import create_app
+from db.models import DbUser, DbProject, DbTimesheetEntry, DbTimesheet, DbWeeklyProjectHours, DbTokenRevocation
 from auth.hash import hash_password
 from enums import UserRole
 
@@ -20,8 +32,10 @@ engine = create_engine(
 
 TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
-# Create tables once
-Base.metadata.create_all(bind=engine)
+# Create tables once, through the same migrations as production
+migrations.upgrade(engine)
+
+app = create_app(bind=engine, seed_endpoint=True)
 
 
 def override_get_db():
@@ -43,8 +57,11 @@ def cleanup_after_test():
     try:
         # Delete all entries first (foreign keys)
         db.query(DbTimesheetEntry).delete()
+        db.query(DbWeeklyProjectHours).delete()
+        db.query(DbTimesheet).delete()
         db.query(DbProject).delete()
         db.query(DbUser).delete()
+        db.query(DbTokenRevocation).delete()
         db.commit()
     except:
         db.rollback()
@@ -60,6 +77,32 @@ def db_session():
     db.close()
 
 
+@pytest.fixture
+def statements():
+    """Collect SQL statements executed against the test database"""
+    executed = []
+    
+    def record(conn, cursor, statement, parameters, context, executemany):
+        executed.append(statement)
+    
+    event.listen(engine, "before_cursor_execute", record)
+    yield executed
+    event.remove(engine, "before_cursor_execute", record)
+
+
+@pytest.fixture
+def query_budget(statements):
+    """Context manager that fails when its block runs more than `limit` statements"""
+    @contextmanager
+    def budget(limit: int):
+        statements.clear()
+        yield statements
+        assert len(statements) <= limit, (
+            f"{len(statements)} statements, budget {limit}:\n" + "\n".join(statements)
+        )
+    return budget
+
+
 @pytest.fixture(scope="function")
 def client():
     """Create test client"""
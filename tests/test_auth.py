@@ -0,0 +1,233 @@
+import time
+import bcrypt
+import pytest
+from sqlalchemy import update
+from auth.oauth2 import principal_cache
+from auth.hash import BCRYPT_ROUNDS, PasswordPool, check_password, hash_rounds
+from auth.principal import Principal, PrincipalCache, RevocationList
+from db.catalog import bump_generation
+from db.models import DbUser
+from enums import UserRole
+
+
+def _principal(username="someone", role=UserRole.EMPLOYEE):
+    return Principal(id=1, username=username, email=None, role=role, manager_id=None)
+
+
+def test_principal_cache_skips_user_query(client, auth_headers_employee, statements):
+    """Test that repeated requests with the same token do not reload the user"""
+    client.get("/users/me", headers=auth_headers_employee)
+    statements.clear()
+    
+    response = client.get("/users/me", headers=auth_headers_employee)
+    
+    assert response.status_code == 200
+    assert response.json()["username"] == "test_employee"
+    assert not [s for s in statements if "FROM users" in s]
+    assert principal_cache.stats()["hits"] >= 1
+
+
+def test_principal_cache_invalidated_on_role_change(client, db_session, test_employee, auth_headers_employee):
+    """Test that a committed role change is visible on the next request"""
+    assert client.get("/users/me", headers=auth_headers_employee).json()["role"] == "employee"
+    
+    test_employee.role = UserRole.MANAGER
+    db_session.commit()
+    
+    response = client.get("/users/me", headers=auth_headers_employee)
+    assert response.json()["role"] == "manager"
+
+
+def test_principal_cache_evicts_least_recently_used():
+    """Test LRU bound of the principal cache"""
+    cache = PrincipalCache(maxsize=2, ttl_seconds=60)
+    cache.put("a", _principal("a"))
+    cache.put("b", _principal("b"))
+    cache.get("a")
+    cache.put("c", _principal("c"))
+    
+    assert cache.get("b") is None
+    assert cache.get("a") is not None
+    assert cache.stats()["evictions"] == 1
+
+
+def test_principal_cache_expires_entries():
+    """Test that entries are not served past their TTL"""
+    cache = PrincipalCache(maxsize=10, ttl_seconds=0.01)
+    cache.put("a", _principal("a"))
+    time.sleep(0.02)
+    
+    assert cache.get("a") is None
+
+
+def test_principal_cache_ignores_stale_fill():
+    """Test that a lookup racing an invalidation does not store the old row"""
+    cache = PrincipalCache(maxsize=10, ttl_seconds=60)
+    generation = cache.generation
+    cache.invalidate("a")
+    cache.put("a", _principal("a"), generation=generation)
+    
+    assert cache.get("a") is None
+
+
+def test_principal_cache_sees_user_changes_of_other_workers(db_session, test_manager):
+    """Test that a role change committed by one worker empties another worker's cache"""
+    worker_a = PrincipalCache(maxsize=10, ttl_seconds=300, max_age_seconds=0)
+    worker_b = PrincipalCache(maxsize=10, ttl_seconds=300, max_age_seconds=0)
+    for cache in (worker_a, worker_b):
+        cache.refresh_if_stale(db_session)
+        cache.put(test_manager.username, Principal.from_user(test_manager))
+    
+    test_manager.role = UserRole.EMPLOYEE
+    db_session.commit()
+    
+    assert worker_b.get(test_manager.username).role == UserRole.MANAGER
+    assert worker_b.refresh_if_stale(db_session)
+    assert worker_b.get(test_manager.username) is None
+    assert not worker_b.refresh_if_stale(db_session)
+
+
+def test_principal_cache_checks_other_workers_at_most_every_max_age(db_session, test_manager, statements):
+    """Test that between checks a cached principal costs no query"""
+    cache = PrincipalCache(maxsize=10, ttl_seconds=300, max_age_seconds=60)
+    cache.refresh_if_stale(db_session)
+    statements.clear()
+    
+    test_manager.role = UserRole.EMPLOYEE
+    db_session.commit()
+    statements.clear()
+    
+    assert not cache.refresh_if_stale(db_session)
+    assert not statements
+
+
+def test_demoted_manager_is_refused_by_a_worker_that_cached_them(
+    client, db_session, test_manager, auth_headers_manager, monkeypatch
+):
+    """Test that a role change made outside this worker is picked up on the next check"""
+    assert client.get("/timesheets/team-timesheets", headers=auth_headers_manager).status_code == 200
+    
+    # Another worker's commit: the users generation moves, this worker's cache is untouched
+    connection = db_session.connection()
+    connection.execute(update(DbUser.__table__).where(DbUser.id == test_manager.id).values(role=UserRole.EMPLOYEE))
+    bump_generation(connection, principal_cache.name)
+    db_session.commit()
+    assert principal_cache.get(test_manager.username).role == UserRole.MANAGER
+    
+    monkeypatch.setattr(principal_cache, "max_age_seconds", 0)
+    response = client.get("/timesheets/team-timesheets", headers=auth_headers_manager)
+    assert response.status_code == 403
+
+
+@pytest.fixture
+def claims_mode(monkeypatch):
+    """Issue and accept self-contained claims tokens"""
+    monkeypatch.setattr("auth.oauth2.AUTH_CLAIMS_MODE", True)
+
+
+def test_claims_mode_authorizes_without_user_lookup(claims_mode, client, auth_headers_manager, statements):
+    """Test that a claims token authorizes a manager route without loading the user"""
+    principal_cache.clear()
+    statements.clear()
+    
+    response = client.get("/timesheet-entries/team-entries", headers=auth_headers_manager)
+    
+    assert response.status_code == 200
+    assert not [s for s in statements if "users.username" in s]
+
+
+def test_claims_mode_revokes_token_on_role_change(claims_mode, client, db_session, test_employee, auth_headers_employee):
+    """Test that changing a user's role rejects their existing claims tokens"""
+    assert client.get("/timesheet-entries/my-entries", headers=auth_headers_employee).status_code == 200
+    
+    test_employee.role = UserRole.MANAGER
+    db_session.commit()
+    
+    response = client.get("/timesheet-entries/my-entries", headers=auth_headers_employee)
+    assert response.status_code == 401
+
+
+def test_claims_mode_rejects_tokens_from_older_epoch(claims_mode, monkeypatch, client, auth_headers_employee):
+    """Test that bumping the token epoch invalidates issued tokens"""
+    monkeypatch.setattr("auth.oauth2.TOKEN_EPOCH", 1)
+    
+    response = client.get("/timesheet-entries/my-entries", headers=auth_headers_employee)
+    assert response.status_code == 401
+
+
+def test_claims_mode_revocation_reaches_other_workers(claims_mode, db_session, test_employee):
+    """Test that a token revoked in one worker is rejected by another after its next check"""
+    worker_a = RevocationList(retention_seconds=60, max_age_seconds=0)
+    worker_b = RevocationList(retention_seconds=60, max_age_seconds=0)
+    issued_at = time.time() - 1
+    worker_b.refresh(db_session)
+    assert not worker_b.is_revoked(test_employee.id, issued_at)
+    
+    revoked_at = worker_a.record(db_session.connection(), test_employee.id)
+    db_session.commit()
+    worker_a.apply(test_employee.id, revoked_at)
+    
+    assert worker_a.is_revoked(test_employee.id, issued_at)
+    assert worker_b.refresh_if_stale(db_session)
+    assert worker_b.is_revoked(test_employee.id, issued_at)
+    assert not worker_b.is_revoked(test_employee.id, time.time())
+    
+    worker_a.record(db_session.connection())
+    db_session.commit()
+    assert worker_b.refresh(db_session)
+    assert worker_b.is_revoked(test_employee.id + 1, issued_at + 1)
+    assert not worker_b.refresh(db_session)
+
+
+def test_claims_mode_role_change_is_stored_for_other_workers(claims_mode, client, db_session, test_employee, auth_headers_employee):
+    """Test that a committed role change reaches a worker that did not make it"""
+    test_employee.role = UserRole.MANAGER
+    db_session.commit()
+    
+    other_worker = RevocationList(retention_seconds=60, max_age_seconds=0)
+    other_worker.refresh(db_session)
+    assert other_worker.is_revoked(test_employee.id, time.time() - 1)
+
+
+def test_claims_mode_me_loads_profile(claims_mode, client, auth_headers_employee):
+    """Test that /users/me still returns profile fields for claims tokens"""
+    response = client.get("/users/me", headers=auth_headers_employee)
+    
+    assert response.status_code == 200
+    assert response.json()["email"] == "employee@test.com"
+
+
+def test_login_fails_fast_when_password_pool_saturated(client, test_employee, monkeypatch):
+    """Test that login returns 503 with Retry-After instead of queueing"""
+    saturated = PasswordPool(workers=1, max_queue=0)
+    saturated._slots.acquire()
+    monkeypatch.setattr("auth.authentication.password_pool", saturated)
+    
+    response = client.post("/login", data={"username": "test_employee", "password": "testpass123"})
+    
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "1"
+    assert saturated.stats()["rejected"] == 1
+
+
+def test_password_pool_records_wait_and_hash_time():
+    """Test that the password pool reports queue wait separately from work time"""
+    pool = PasswordPool(workers=1, max_queue=1)
+    
+    assert pool.run(time.sleep, 0.01) is None
+    stats = pool.stats()
+    assert stats["completed"] == 1
+    assert stats["hash_ms_max"] >= 10
+
+
+def test_login_rehashes_password_with_configured_cost(client, db_session, test_employee):
+    """Test that a hash with a different bcrypt cost is upgraded after login"""
+    test_employee.password = bcrypt.hashpw(b"testpass123", bcrypt.gensalt(rounds=5)).decode("utf-8")
+    db_session.commit()
+    
+    response = client.post("/login", data={"username": "test_employee", "password": "testpass123"})
+    
+    assert response.status_code == 200
+    db_session.refresh(test_employee)
+    assert hash_rounds(test_employee.password) == BCRYPT_ROUNDS
+    assert check_password("testpass123", test_employee.password) == (True, False)
@@ -0,0 +1,34 @@
+from sqlalchemy import text
+from db.database import create_db_engine
+
+
+def _pragma(engine, name):
+    with engine.connect() as connection:
+        return connection.execute(text(f"PRAGMA {name}")).scalar()
+
+
+def test_production_profile_tunes_sqlite(tmp_path):
+    """Test that the production profile enables WAL and a busy timeout"""
+    engine = create_db_engine(f"sqlite:///{tmp_path / 'tuned.db'}", profile="production")
+    
+    assert _pragma(engine, "journal_mode") == "wal"
+    assert _pragma(engine, "synchronous") == 1  # NORMAL
+    assert _pragma(engine, "busy_timeout") == 5000
+    engine.dispose()
+
+
+def test_pragmas_can_be_overridden_from_environment(tmp_path, monkeypatch):
+    """Test that SQLITE_<NAME> overrides a single pragma of the profile"""
+    monkeypatch.setenv("SQLITE_BUSY_TIMEOUT", "250")
+    engine = create_db_engine(f"sqlite:///{tmp_path / 'tuned.db'}", profile="production")
+    
+    assert _pragma(engine, "busy_timeout") == 250
+    engine.dispose()
+
+
+def test_default_profile_keeps_driver_settings(tmp_path):
+    """Test that the default profile leaves the rollback journal in place"""
+    engine = create_db_engine(f"sqlite:///{tmp_path / 'plain.db'}", profile="default")
+    
+    assert _pragma(engine, "journal_mode") == "delete"
+    engine.dispose()
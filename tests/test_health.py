@@ -0,0 +1,43 @@
+from router import health
+
+
+def test_liveness_touches_no_database(client, statements):
+    """Test that /health/live answers without any SQL"""
+    response = client.get("/health/live")
+    
+    assert response.status_code == 200
+    assert response.json() == {"status": "alive"}
+    assert statements == []
+
+
+def test_readiness_checks_a_pooled_connection(client, statements):
+    """Test that /health/ready runs SELECT 1 only"""
+    response = client.get("/health/ready")
+    
+    assert response.status_code == 200
+    assert response.json() == {"status": "ready"}
+    assert statements == ["SELECT 1"]
+
+
+def test_deep_health_counts_in_one_query_and_caches(client, monkeypatch, statements, test_employee, test_project):
+    """Test that /health runs one aggregate query, then serves it from cache"""
+    monkeypatch.setitem(health._database_checks, "computed_at", None)
+    monkeypatch.setattr(health, "HEALTH_CACHE_SECONDS", 60)
+    statements.clear()
+    
+    first = client.get("/health").json()
+    second = client.get("/health").json()
+    
+    assert len(statements) == 1
+    assert first["status"] == second["status"] == "healthy"
+    assert first["checks"]["data_counts"]["users"] == 2
+    assert first["checks"]["data_counts"]["projects"] == 1
+    assert first["checks"]["roles_distribution"] == {
+        "status": "ok", "managers": 1, "employees": 1, "employees_assigned_to_manager": 1
+    }
+    assert second["checks"]["data_counts"] == first["checks"]["data_counts"]
+    assert "principal_cache" in second["checks"]
+    
+    monkeypatch.setattr(health, "HEALTH_CACHE_SECONDS", 0)
+    client.get("/health")
+    assert len(statements) == 2
@@ -0,0 +1,173 @@
+import logging
+from collections import OrderedDict
+from datetime import date
+import pytest
+from sqlalchemy import select, text
+from db import instrumentation
+from db.instrumentation import count_queries
+from db.models import DbProject, DbTimesheetEntry
+
+# Upper bounds per request, with enough rows that a per-row lazy load shows
+QUERY_BUDGETS = [
+    ("get", "/timesheet-entries/my-entries", "employee", 2),
+    ("get", "/timesheet-entries/my-entries?limit=5", "employee", 2),
+    ("get", "/timesheet-entries/team-entries", "manager", 2),
+    ("get", "/timesheet-entries/weekly-hours", "employee", 1),
+    ("get", "/timesheet-entries/team-weekly-hours", "manager", 1),
+    ("get", "/timesheet-entries/export?format=csv", "manager", 1),
+    ("get", "/timesheets/my-timesheets", "employee", 1),
+    ("get", "/timesheets/team-timesheets", "manager", 1),
+    ("get", "/reports/hours?group_by=employee&group_by=week", "manager", 1),
+    ("get", "/users/", "employee", 1),
+    ("get", "/users/me", "employee", 0),
+    ("get", "/projects/", "employee", 0),
+]
+
+
+@pytest.fixture
+def entries(client, test_project, auth_headers_employee, auth_headers_manager):
+    """Entries over two weeks, and a warm principal cache and project catalog"""
+    for day in range(2, 14):
+        client.post(
+            "/timesheet-entries/",
+            json={"project_id": test_project.id, "date": f"2026-03-{day:02d}", "hours": 4.0},
+            headers=auth_headers_employee
+        )
+    client.post("/timesheets/submit", json={"year": 2026, "week_number": 10}, headers=auth_headers_employee)
+    client.get("/users/me", headers=auth_headers_manager)
+
+
+@pytest.mark.parametrize("method,path,role,limit", QUERY_BUDGETS)
+def test_endpoint_query_budget(method, path, role, limit, client, entries, auth_headers_employee, auth_headers_manager, query_budget):
+    """Test that list endpoints stay within a fixed number of statements"""
+    headers = auth_headers_employee if role == "employee" else auth_headers_manager
+    
+    with query_budget(limit):
+        response = client.request(method, path, headers=headers)
+    
+    assert response.status_code == 200
+
+
+def test_bulk_create_query_budget(client, test_project, auth_headers_employee, query_budget):
+    """Test that bulk creation does not reload created entries one by one"""
+    client.get("/projects/", headers=auth_headers_employee)
+    entries = [{"project_id": test_project.id, "date": f"2026-04-{day:02d}", "hours": 1.0} for day in range(1, 29)]
+    
+    # Five ISO weeks: one timesheet upsert each, one INSERT, one aggregate upsert
+    with query_budget(7):
+        response = client.post("/timesheet-entries/bulk", json={"entries": entries}, headers=auth_headers_employee)
+    
+    assert response.status_code == 201
+    assert response.json()["created"] == 28
+
+
+def test_server_timing_reports_statements_of_the_request(client, test_project, auth_headers_employee, statements):
+    client.get("/projects/", headers=auth_headers_employee)
+    project_id = test_project.id
+    statements.clear()
+    
+    response = client.post(
+        "/timesheet-entries/",
+        json={"project_id": project_id, "date": "2026-03-02", "hours": 8.0},
+        headers=auth_headers_employee
+    )
+    
+    name, duration, description = response.headers["Server-Timing"].split(";")
+    assert name == "db"
+    assert float(duration.removeprefix("dur=")) >= 0
+    assert description == f'desc="{len(statements)} queries"'
+
+
+def test_repeated_statement_is_logged_as_n_plus_one(db_session, monkeypatch, caplog, test_employee, test_project):
+    """Test that a query per row is reported"""
+    db_session.add_all([
+        DbTimesheetEntry(employee_id=test_employee.id, project_id=test_project.id, date=date(2026, 3, day), hours=1.0)
+        for day in range(1, 5)
+    ])
+    db_session.commit()
+    monkeypatch.setattr(instrumentation, "N_PLUS_ONE_THRESHOLD", 3)
+    
+    with caplog.at_level(logging.WARNING, logger="db.instrumentation"), count_queries() as stats:
+        for entry_id in db_session.scalars(select(DbTimesheetEntry.id)).all():
+            db_session.scalars(select(DbTimesheetEntry).where(DbTimesheetEntry.id == entry_id)).one()
+    
+    assert stats.count == 5
+    assert any("Possible N+1" in record.getMessage() for record in caplog.records)
+
+
+@pytest.fixture
+def slow_query_log(monkeypatch):
+    """Every statement counts as slow, with an empty buffer and plan cache"""
+    monkeypatch.setattr(instrumentation, "SLOW_QUERY_MS", 1e-9)
+    monkeypatch.setattr(instrumentation, "SLOW_QUERY_SAMPLE_RATE", 1.0)
+    monkeypatch.setattr(instrumentation, "_plans", OrderedDict())
+    instrumentation.slow_queries.clear()
+    yield
+    instrumentation.slow_queries.clear()
+
+
+def test_slow_query_is_logged_with_function_route_and_plan(
+    client, entries, auth_headers_manager, slow_query_log, caplog
+):
+    """Test that a slow statement records its origin, parameter types and plan"""
+    with caplog.at_level(logging.WARNING, logger="db.instrumentation"):
+        client.get("/timesheet-entries/team-entries?limit=5", headers=auth_headers_manager)
+    
+    response = client.get("/admin/slow-queries", headers=auth_headers_manager)
+    
+    assert response.status_code == 200
+    queries = response.json()["queries"]
+    rows = [q for q in queries if q["function"] == "db.db_timesheet_entry.get_team_entries"]
+    assert rows
+    assert {q["route"] for q in rows} == {"/timesheet-entries/team-entries"}
+    assert {q["method"] for q in rows} == {"GET"}
+    assert all(q["plan"] for q in rows)
+    assert "int" in str(rows[0]["parameters"])
+    assert any(getattr(record, "slow_query", {}).get("function") == "db.db_timesheet_entry.get_team_entries"
+               for record in caplog.records)
+
+
+def test_slow_query_plan_is_captured_once_per_fingerprint(client, entries, auth_headers_employee, slow_query_log, monkeypatch):
+    """Test that EXPLAIN runs only for the first slow execution of a statement"""
+    explained = []
+    explain = instrumentation._explain
+    monkeypatch.setattr(
+        instrumentation, "_explain", lambda conn, statement, *args: explained.append(statement) or explain(conn, statement, *args)
+    )
+    
+    client.get("/timesheet-entries/my-entries", headers=auth_headers_employee)
+    client.get("/timesheet-entries/my-entries", headers=auth_headers_employee)
+    
+    assert len(explained) == len(set(explained)) > 0
+    assert len(instrumentation.slow_queries) == 2 * len(explained)
+
+
+def test_failed_explain_keeps_the_transaction(db_session):
+    """Test that a failing EXPLAIN is rolled back to its savepoint, not with the caller's writes"""
+    db_session.add(DbProject(name="Pending", description="Not committed yet"))
+    db_session.flush()
+    connection = db_session.connection()
+    
+    plan = instrumentation._explain(connection, "SELECT * FROM no_such_table", (), False)
+    
+    assert plan[0].startswith("EXPLAIN failed")
+    db_session.commit()
+    assert db_session.scalars(select(DbProject.name)).all() == ["Pending"]
+
+
+def test_plan_cache_keeps_the_most_recent_fingerprints(db_session, slow_query_log, monkeypatch):
+    """Test that the plan cache evicts the least recently slow fingerprint"""
+    monkeypatch.setattr(instrumentation, "SLOW_QUERY_PLAN_CACHE_SIZE", 2)
+    first, second, third = (f"SELECT {n} FROM projects" for n in (1, 2, 3))
+    
+    for statement in (first, second, first, third):
+        db_session.execute(text(statement))
+    
+    assert set(instrumentation._plans) == {instrumentation.fingerprint(first), instrumentation.fingerprint(third)}
+
+
+def test_slow_queries_are_manager_only(client, auth_headers_employee):
+    """Test that employees cannot read the slow-query log"""
+    response = client.get("/admin/slow-queries", headers=auth_headers_employee)
+    
+    assert response.status_code == 403
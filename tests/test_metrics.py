@@ -0,0 +1,68 @@
+import json
+import os
+import metrics
+
+
+def _sample(text: str, line_prefix: str) -> float:
+    """Value of the first exposition line starting with `line_prefix`, 0 when absent"""
+    for line in text.splitlines():
+        if line.startswith(line_prefix):
+            return float(line.rsplit(" ", 1)[1])
+    return 0.0
+
+
+def test_requests_are_counted_per_route_template(client, test_project, auth_headers_employee):
+    """Test that requests are labelled with the route template, not the raw path"""
+    label = 'http_requests_total{method="GET",route="/projects/{project_id}",status="200"}'
+    before = _sample(client.get("/metrics").text, label)
+    
+    client.get(f"/projects/{test_project.id}", headers=auth_headers_employee)
+    client.get(f"/projects/{test_project.id}", headers=auth_headers_employee)
+    client.get("/no-such-path")
+    response = client.get("/metrics")
+    
+    assert response.status_code == 200
+    assert response.headers["content-type"] == metrics.CONTENT_TYPE
+    assert _sample(response.text, label) == before + 2
+    assert f"/projects/{test_project.id}\"" not in response.text
+    assert 'route="unmatched",status="404"' in response.text
+    assert '# TYPE http_request_duration_seconds histogram' in response.text
+    assert 'http_request_duration_seconds_bucket{method="GET",route="/projects/{project_id}",le="+Inf"}' in response.text
+
+
+def test_auth_internals_are_exposed(client, test_employee):
+    """Test that bcrypt time and rejected tokens are recorded"""
+    before = client.get("/metrics").text
+    
+    client.post("/login", data={"username": test_employee.username, "password": "password123"})
+    client.get("/users/me", headers={"Authorization": "Bearer not-a-jwt"})
+    after = client.get("/metrics").text
+    
+    assert _sample(after, "password_verify_seconds_count") == _sample(before, "password_verify_seconds_count") + 1
+    label = 'jwt_decode_failures_total{reason="invalid"}'
+    assert _sample(after, label) == _sample(before, label) + 1
+    assert "# TYPE db_pool_checked_out gauge" in after
+    assert "db_pool_checkout_seconds_count" in after
+
+
+def test_snapshots_of_all_workers_are_summed(tmp_path, monkeypatch):
+    """Test that counters of every worker add up and gauges of exited workers are dropped"""
+    monkeypatch.setattr(metrics, "METRICS_DIR", str(tmp_path))
+    monkeypatch.setattr(metrics, "REGISTRY", [])
+    counter = metrics.Counter("test_events_total", "Test events", ("kind",))
+    gauge = metrics.Gauge("test_connections", "Test connections", lambda: 2)
+    counter.inc("a")
+    
+    def worker(pid: int, events: float, connections: float):
+        (tmp_path / f"metrics-{pid}.json").write_text(json.dumps({"pid": pid, "metrics": {
+            "test_events_total": {**counter.describe(), "samples": [[["a"], events]]},
+            "test_connections": {**gauge.describe(), "samples": [[[], connections]]},
+        }}))
+    
+    worker(os.getppid(), 3, 5)
+    worker(2 ** 30, 10, 100)  # no such process
+    text = metrics.render()
+    
+    assert 'test_events_total{kind="a"} 14.0' in text
+    assert "test_connections 7.0" in text
+    assert (tmp_path / f"metrics-{os.getpid()}.json").exists()
@@ -0,0 +1,88 @@
+from sqlalchemy import create_engine, inspect, text
+from db import migrations
+
+
+def _index_names(engine, table):
+    return {index["name"] for index in inspect(engine).get_indexes(table)}
+
+
+def test_upgrade_creates_schema_and_records_versions():
+    """Test that a fresh database is migrated to the latest version"""
+    engine = create_engine("sqlite://")
+    
+    applied = migrations.upgrade(engine)
+    
+    assert applied == [m.version for m in migrations.MIGRATIONS]
+    assert migrations.applied_versions(engine) == applied
+    assert "ix_timesheet_entries_employee_id_date" in _index_names(engine, "timesheet_entries")
+
+
+def test_upgrade_is_idempotent():
+    """Test that a second upgrade applies nothing"""
+    engine = create_engine("sqlite://")
+    migrations.upgrade(engine)
+    
+    assert migrations.upgrade(engine) == []
+
+
+def test_upgrade_adds_indexes_to_existing_database():
+    """Test that a database created before migrations gains the new indexes"""
+    engine = create_engine("sqlite://")
+    with engine.begin() as connection:
+        connection.execute(text(
+            "CREATE TABLE users (id INTEGER PRIMARY KEY, username VARCHAR NOT NULL, "
+            "email VARCHAR NOT NULL, password VARCHAR NOT NULL, role VARCHAR(8) NOT NULL, "
+            "manager_id INTEGER REFERENCES users(id))"
+        ))
+    
+    migrations.upgrade(engine)
+    
+    assert "ix_users_manager_id" in _index_names(engine, "users")
+    assert "ix_users_username" in _index_names(engine, "users")
+
+
+def test_upgrade_adds_updated_at_to_existing_tables():
+    """Test that entries and projects created before updated_at are backfilled"""
+    engine = create_engine("sqlite://")
+    with engine.begin() as connection:
+        connection.execute(text("CREATE TABLE projects (id INTEGER PRIMARY KEY, name VARCHAR NOT NULL, description VARCHAR)"))
+        connection.execute(text(
+            "CREATE TABLE timesheet_entries (id INTEGER PRIMARY KEY, employee_id INTEGER NOT NULL, "
+            "project_id INTEGER NOT NULL, timesheet_id INTEGER, date DATE NOT NULL, hours FLOAT NOT NULL, "
+            "description VARCHAR)"
+        ))
+        connection.execute(text("INSERT INTO projects (id, name) VALUES (1, 'Legacy')"))
+    
+    migrations.upgrade(engine)
+    
+    with engine.connect() as connection:
+        assert connection.execute(text("SELECT updated_at FROM projects")).scalar() > "2000"
+    assert "ix_timesheet_entries_employee_id_updated_at" in _index_names(engine, "timesheet_entries")
+
+
+def _updated_at_default(engine, table):
+    return next(c["default"] for c in inspect(engine).get_columns(table) if c["name"] == "updated_at")
+
+
+def test_migrated_updated_at_matches_a_fresh_schema():
+    """Test that updated_at defaults to the insert time however the database was built"""
+    fresh = create_engine("sqlite://")
+    migrations.upgrade(fresh)
+    legacy = create_engine("sqlite://")
+    with legacy.begin() as connection:
+        connection.execute(text(
+            "CREATE TABLE projects (id INTEGER PRIMARY KEY, name VARCHAR NOT NULL, description VARCHAR, "
+            "updated_at DATETIME NOT NULL DEFAULT '1970-01-01 00:00:00')"
+        ))
+        connection.execute(text("INSERT INTO projects (id, name, updated_at) VALUES (1, 'Legacy', '2025-01-01 00:00:00')"))
+    
+    migrations.upgrade(legacy)
+    
+    for table in ("projects", "timesheet_entries"):
+        assert _updated_at_default(legacy, table) == _updated_at_default(fresh, table)
+    with legacy.begin() as connection:
+        connection.execute(text("INSERT INTO projects (id, name) VALUES (2, 'Raw insert')"))
+        rows = connection.execute(text("SELECT id, updated_at FROM projects ORDER BY id")).all()
+    assert rows[0] == (1, "2025-01-01 00:00:00")
+    assert rows[1][1] > "2000"
+    assert "ix_projects_name" in _index_names(legacy, "projects")
@@ -0,0 +1,72 @@
+from sqlalchemy import insert, update
+from db.catalog import bump_generation, read_generation
+from db.db_project import project_catalog
+from db.models import DbProject
+from tests.conftest import engine
+
+
+def test_project_list_answers_304_until_projects_change(client, test_project, auth_headers_employee):
+    """Test the project list ETag, including If-None-Match lists and weak comparison"""
+    etag = client.get("/projects/", headers=auth_headers_employee).headers["ETag"]
+    
+    for header in [etag, f'"other", {etag}', etag.removeprefix("W/"), "*"]:
+        cached = client.get("/projects/", headers={**auth_headers_employee, "If-None-Match": header})
+        assert cached.status_code == 304
+    
+    client.post("/projects/", json={"name": "Second Project"}, headers=auth_headers_employee)
+    changed = client.get("/projects/", headers={**auth_headers_employee, "If-None-Match": etag})
+    assert changed.status_code == 200
+    assert changed.headers["ETag"] != etag
+    assert [project["name"] for project in changed.json()] == [test_project.name, "Second Project"]
+
+
+def test_entry_writes_check_projects_without_queries(client, test_project, auth_headers_employee, statements):
+    """Test that the project catalog answers existence checks once loaded"""
+    project_id = test_project.id
+    client.get("/projects/", headers=auth_headers_employee)
+    statements.clear()
+    
+    created = client.post(
+        "/timesheet-entries/",
+        json={"project_id": project_id, "date": "2026-03-02", "hours": 8.0},
+        headers=auth_headers_employee
+    )
+    
+    assert created.status_code == 201
+    assert not any("FROM projects" in statement for statement in statements)
+
+
+def test_create_project_bumps_generation_and_reloads_catalog(client, db_session, test_project, auth_headers_employee):
+    """Test write-through invalidation of the local catalog and the shared generation"""
+    client.get("/projects/", headers=auth_headers_employee)
+    generation = read_generation(db_session, "projects")
+    
+    client.post("/projects/", json={"name": "Second Project"}, headers=auth_headers_employee)
+    
+    assert read_generation(db_session, "projects") == generation + 1
+    assert project_catalog.generation is None
+    assert client.get(f"/projects/{test_project.id + 1}", headers=auth_headers_employee).json()["name"] == "Second Project"
+
+
+def test_catalog_sees_projects_created_by_another_worker(client, monkeypatch, test_project, auth_headers_employee):
+    """Test coherence through the generation when the local copy was not invalidated"""
+    client.get("/projects/", headers=auth_headers_employee)
+    with engine.begin() as connection:
+        project_id = connection.execute(insert(DbProject).values(name="Elsewhere").returning(DbProject.id)).scalar()
+        bump_generation(connection, "projects")
+    
+    # Unknown ids re-check the generation right away
+    created = client.post(
+        "/timesheet-entries/",
+        json={"project_id": project_id, "date": "2026-03-02", "hours": 8.0},
+        headers=auth_headers_employee
+    )
+    assert created.status_code == 201
+    
+    # Lists are re-checked once the catalog is older than the max age
+    with engine.begin() as connection:
+        connection.execute(update(DbProject).where(DbProject.id == project_id).values(name="Renamed"))
+        bump_generation(connection, "projects")
+    assert client.get("/projects/", headers=auth_headers_employee).json()[1]["name"] == "Elsewhere"
+    monkeypatch.setattr(project_catalog, "max_age_seconds", 0)
+    assert client.get("/projects/", headers=auth_headers_employee).json()[1]["name"] == "Renamed"
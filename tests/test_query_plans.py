@@ -0,0 +1,180 @@
+"""
+Query plan check for the repository layer
+
+Every public repository function (taking a session first) in db/db_*.py is called against the test database;
+each statement it issues is run through EXPLAIN QUERY PLAN and the test
+fails if SQLite has to scan a whole table. List functions are checked on a
+later page, the way a client walks them with a cursor.
+"""
+import inspect
+import re
+from datetime import date
+import pytest
+from sqlalchemy import event
+from db import db_project, db_report, db_timesheet, db_timesheet_entry, db_user, db_weekly_hours
+from db.database import Base
+from db.models import DbTimesheet, DbTimesheetEntry
+from db.pagination import encode_cursor
+from schemas import (
+    ProjectCreate, TeamEntryFilter, TimesheetEntryBulkCreate, TimesheetEntryCreate, TimesheetEntryFilter,
+    TimesheetEntryUpdate, UserCreate, TimesheetSubmit, TimesheetBatchReview
+)
+from enums import ReportGroup, ReviewAction, TimesheetStatus
+
+REPOSITORY_MODULES = [db_project, db_user, db_timesheet_entry, db_timesheet, db_weekly_hours, db_report]
+SCAN_PATTERN = re.compile(r"^SCAN (?:TABLE )?(\w+)")
+
+# Maintenance commands that read whole tables by design
+FULL_SCANS_ALLOWED = {
+    "rebuild_weekly_hours": {"timesheet_entries", "weekly_project_hours"},
+    "check_weekly_hours": {"timesheet_entries", "weekly_project_hours"},
+}
+
+
+def _calls(manager, employee, project, entry, timesheet):
+    id_cursor = encode_cursor([0])
+    entry_cursor = encode_cursor([date(2000, 1, 1), 0])
+    return {
+        "create_project": lambda db: db_project.create_project(db, ProjectCreate(name="Another Project")),
+        "get_project": lambda db: db_project.get_project(db, project.id),
+        "get_all_projects": lambda db: db_project.get_all_projects(db, limit=10, cursor=id_cursor),
+        "get_projects_version": db_project.get_projects_version,
+        "create_user": lambda db: db_user.create_user(db, UserCreate(
+            username="new_user", email="new@test.com", password="pw", manager_id=manager.id
+        )),
+        "get_user": lambda db: db_user.get_user(db, employee.id),
+        "get_all_users": lambda db: db_user.get_all_users(db, limit=10, cursor=id_cursor),
+        "get_team_members": lambda db: db_user.get_team_members(db, manager.id, limit=10, cursor=id_cursor),
+        "create_entry": lambda db: db_timesheet_entry.create_entry(db, TimesheetEntryCreate(
+            project_id=project.id, date=date.today(), hours=4.0
+        ), employee.id),
+        "create_entries_bulk": lambda db: db_timesheet_entry.create_entries_bulk(db, TimesheetEntryBulkCreate(
+            entries=[TimesheetEntryCreate(project_id=project.id, date=date.today(), hours=2.0)] * 3
+        ), employee.id),
+        "get_entry": lambda db: db_timesheet_entry.get_entry(db, entry.id),
+        "get_my_entries": lambda db: db_timesheet_entry.get_my_entries(
+            db, employee.id, limit=10, cursor=entry_cursor,
+            filters=TimesheetEntryFilter(from_date=date(2000, 1, 1), to_date=date.today(), project_id=project.id)
+        ),
+        "get_team_entries": lambda db: db_timesheet_entry.get_team_entries(
+            db, manager.id, limit=10, cursor=entry_cursor,
+            filters=TeamEntryFilter(from_date=date(2000, 1, 1), to_date=date.today(), employee_id=employee.id)
+        ),
+        "get_my_entries_version": lambda db: db_timesheet_entry.get_my_entries_version(
+            db, employee.id, TimesheetEntryFilter(from_date=date(2000, 1, 1), project_id=project.id)
+        ),
+        "get_team_entries_version": lambda db: [
+            db_timesheet_entry.get_team_entries_version(db, manager.id),
+            db_timesheet_entry.get_team_entries_version(db, manager.id, TeamEntryFilter(employee_id=employee.id)),
+        ],
+        "iter_my_entries": lambda db: list(db_timesheet_entry.iter_my_entries(
+            db, employee.id, TimesheetEntryFilter(from_date=date(2000, 1, 1))
+        )),
+        "iter_team_entries": lambda db: list(db_timesheet_entry.iter_team_entries(
+            db, manager.id, TeamEntryFilter(from_date=date(2000, 1, 1))
+        )),
+        "iter_entry_rows": lambda db: [
+            list(db_timesheet_entry.iter_entry_rows(db, TeamEntryFilter(from_date=date(2000, 1, 1)), manager_id=manager.id)),
+            list(db_timesheet_entry.iter_entry_rows(db, TeamEntryFilter(project_id=project.id), employee_id=employee.id)),
+        ],
+        "update_entry": lambda db: db_timesheet_entry.update_entry(db, entry.id, TimesheetEntryUpdate(
+            project_id=project.id, hours=6.0
+        ), employee.id),
+        "delete_entry": lambda db: db_timesheet_entry.delete_entry(db, entry.id, employee.id),
+        "ensure_timesheet": lambda db: db_timesheet.ensure_timesheet(db, employee.id, 2020, 1),
+        "writable_timesheet": lambda db: db_timesheet.writable_timesheet(db, employee.id, date(2020, 1, 8)),
+        "check_week_writable": lambda db: db_timesheet.check_week_writable(db, employee.id, date(2020, 1, 8)),
+        "get_timesheet": lambda db: db_timesheet.get_timesheet(db, timesheet.id),
+        "submit_timesheet": lambda db: db_timesheet.submit_timesheet(db, employee.id, TimesheetSubmit(
+            year=entry.date.isocalendar()[0], week_number=entry.date.isocalendar()[1]
+        )),
+        "get_my_timesheets": lambda db: db_timesheet.get_my_timesheets(db, employee.id, limit=10, cursor=id_cursor),
+        "get_team_timesheets": lambda db: db_timesheet.get_team_timesheets(
+            db, manager.id, TimesheetStatus.SUBMITTED, limit=10, cursor=id_cursor
+        ),
+        "review_timesheet": lambda db: db_timesheet.review_timesheet(db, timesheet.id, manager.id, ReviewAction.APPROVE),
+        "review_timesheets_batch": lambda db: db_timesheet.review_timesheets_batch(db, manager.id, TimesheetBatchReview(
+            timesheet_ids=[timesheet.id], action=ReviewAction.REJECT, comment="Missing Friday"
+        )),
+        "record_hours": lambda db: db_weekly_hours.record_hours(db, [db_weekly_hours.removed(entry)]),
+        "get_weekly_hours": lambda db: db_weekly_hours.get_weekly_hours(db, employee.id, year=2026),
+        "get_team_weekly_hours": lambda db: db_weekly_hours.get_team_weekly_hours(
+            db, manager.id, year=2026, employee_id=employee.id
+        ),
+        "rebuild_weekly_hours": db_weekly_hours.rebuild_weekly_hours,
+        "check_weekly_hours": db_weekly_hours.check_weekly_hours,
+        "get_hours_report": lambda db: [
+            db_report.get_hours_report(db, [ReportGroup.PROJECT, ReportGroup.MONTH], TeamEntryFilter(
+                from_date=date(2000, 1, 1), employee_id=employee.id
+            ), manager_id=manager.id),
+            db_report.get_hours_report(db, [ReportGroup.EMPLOYEE, ReportGroup.WEEK], TeamEntryFilter(
+                from_date=date(2000, 1, 3), project_id=project.id
+            ), manager_id=manager.id),
+            db_report.get_hours_report(db, [ReportGroup.DAY], TeamEntryFilter(), employee_id=employee.id),
+        ],
+    }
+
+
+def _repository_functions():
+    return sorted(
+        name
+        for module in REPOSITORY_MODULES
+        for name, func in inspect.getmembers(module, inspect.isfunction)
+        if func.__module__ == module.__name__ and not name.startswith("_")
+        and next(iter(inspect.signature(func).parameters), None) == "db"
+    )
+
+
+@pytest.fixture
+def test_timesheet(db_session, test_employee):
+    timesheet = DbTimesheet(employee_id=test_employee.id, year=2020, week_number=1, status=TimesheetStatus.SUBMITTED)
+    db_session.add(timesheet)
+    db_session.commit()
+    db_session.refresh(timesheet)
+    return timesheet
+
+
+@pytest.fixture
+def test_entry(db_session, test_employee, test_project):
+    entry = DbTimesheetEntry(employee_id=test_employee.id, project_id=test_project.id, date=date.today(), hours=8.0)
+    db_session.add(entry)
+    db_session.commit()
+    db_session.refresh(entry)
+    return entry
+
+
+def test_every_repository_function_is_checked():
+    """New repository functions must be added to the plan check"""
+    assert _repository_functions() == sorted(_calls(None, None, None, None, None))
+
+
+@pytest.mark.parametrize("name", _repository_functions())
+def test_repository_function_avoids_full_table_scans(
+    name, db_session, test_manager, test_employee, test_project, test_entry, test_timesheet
+):
+    """Test that each repository function is served by indexes"""
+    statements = []
+    
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if not executemany and not statement.lstrip().upper().startswith(("INSERT", "EXPLAIN")):
+            statements.append((statement, parameters))
+    
+    # The project catalog loads the whole (small) projects table by design
+    db_project.project_catalog.values(db_session)
+    
+    bind = db_session.get_bind()
+    event.listen(bind, "before_cursor_execute", record)
+    try:
+        _calls(test_manager, test_employee, test_project, test_entry, test_timesheet)[name](db_session)
+    finally:
+        event.remove(bind, "before_cursor_execute", record)
+    
+    tables = set(Base.metadata.tables) - FULL_SCANS_ALLOWED.get(name, set())
+    with bind.connect() as connection:
+        for statement, parameters in statements:
+            plan = connection.exec_driver_sql("EXPLAIN QUERY PLAN " + statement, parameters).all()
+            for row in plan:
+                match = SCAN_PATTERN.match(row[-1])
+                assert not (match and match.group(1) in tables), (
+                    f"{name} scans {match.group(1)}:\n{statement}\n{[r[-1] for r in plan]}"
+                )
@@ -0,0 +1,86 @@
+import pytest
+from datetime import date
+from db.models import DbProject, DbTimesheetEntry, DbUser
+from enums import UserRole
+
+
+@pytest.fixture
+def report_entries(client, db_session, test_employee, test_project, auth_headers_employee):
+    """Entries over two ISO weeks (10 and 14) spanning March and April 2026, on two projects"""
+    other = DbProject(name="Billing Project")
+    outsider = DbUser(username="outsider", email="outsider@test.com", password="x", role=UserRole.EMPLOYEE)
+    db_session.add_all([other, outsider])
+    db_session.commit()
+    
+    response = client.post(
+        "/timesheet-entries/bulk",
+        json={"entries": [
+            {"project_id": test_project.id, "date": "2026-03-02", "hours": 8.0},
+            {"project_id": test_project.id, "date": "2026-03-03", "hours": 4.0},
+            {"project_id": other.id, "date": "2026-03-03", "hours": 4.0},
+            {"project_id": other.id, "date": "2026-03-31", "hours": 2.0},
+            {"project_id": other.id, "date": "2026-04-01", "hours": 3.0}
+        ]},
+        headers=auth_headers_employee
+    )
+    assert response.status_code == 201
+    return test_project, other
+
+
+def _rows(response, *fields):
+    assert response.status_code == 200
+    return [tuple(row[field] for field in fields) for row in response.json()["rows"]]
+
+
+def test_report_by_project(client, report_entries, auth_headers_manager):
+    """Test totals per project for the manager's team"""
+    project, other = report_entries
+    
+    response = client.get("/reports/hours", headers=auth_headers_manager)
+    
+    assert _rows(response, "project_id", "total_hours", "entry_count") == [(project.id, 12.0, 2), (other.id, 9.0, 3)]
+    assert response.json()["total_hours"] == 21.0
+    assert response.json()["source"] == "weekly_project_hours"
+
+
+def test_report_by_period(client, report_entries, test_employee, auth_headers_manager):
+    """Test day, week and month periods combined with other dimensions"""
+    by_month = client.get("/reports/hours?group_by=month", headers=auth_headers_manager)
+    assert _rows(by_month, "period", "total_hours") == [("2026-03", 18.0), ("2026-04", 3.0)]
+    assert by_month.json()["source"] == "timesheet_entries"
+    
+    by_week = client.get("/reports/hours?group_by=employee&group_by=week", headers=auth_headers_manager)
+    assert _rows(by_week, "employee_id", "period", "total_hours") == [
+        (test_employee.id, "2026-W10", 16.0), (test_employee.id, "2026-W14", 5.0)
+    ]
+    
+    by_day = client.get("/reports/hours?group_by=day&from_date=2026-03-03&to_date=2026-03-31", headers=auth_headers_manager)
+    assert _rows(by_day, "period", "total_hours", "entry_count") == [("2026-03-03", 8.0, 2), ("2026-03-31", 2.0, 1)]
+
+
+def test_report_reads_entries_for_partial_weeks(client, report_entries, auth_headers_manager):
+    """Test that a date range not aligned to weeks is answered from the entries"""
+    aligned = client.get("/reports/hours?group_by=week&from_date=2026-03-30&to_date=2026-04-05", headers=auth_headers_manager)
+    partial = client.get("/reports/hours?group_by=week&from_date=2026-04-01", headers=auth_headers_manager)
+    
+    assert aligned.json()["source"] == "weekly_project_hours"
+    assert _rows(aligned, "period", "total_hours") == [("2026-W14", 5.0)]
+    assert partial.json()["source"] == "timesheet_entries"
+    assert _rows(partial, "period", "total_hours") == [("2026-W14", 3.0)]
+
+
+def test_report_scope(client, db_session, report_entries, test_employee, auth_headers_employee, auth_headers_manager):
+    """Test that managers see their team only and employees their own hours"""
+    project, _ = report_entries
+    outsider = db_session.query(DbUser).filter(DbUser.username == "outsider").one()
+    db_session.add(DbTimesheetEntry(employee_id=outsider.id, project_id=project.id, date=date(2026, 3, 2), hours=8.0))
+    db_session.commit()
+    
+    team = client.get("/reports/hours?group_by=employee&group_by=day", headers=auth_headers_manager)
+    assert {row["employee_id"] for row in team.json()["rows"]} == {test_employee.id}
+    
+    own = client.get(f"/reports/hours?group_by=employee&employee_id={outsider.id}", headers=auth_headers_employee)
+    assert _rows(own, "employee_id") == []
+    
+    two_periods = client.get("/reports/hours?group_by=day&group_by=month", headers=auth_headers_employee)
+    assert two_periods.status_code == 400
@@ -0,0 +1,52 @@
+from sqlalchemy import func, select
+from db import db_weekly_hours
+from db.models import DbTimesheet, DbTimesheetEntry, DbUser
+from enums import TimesheetStatus
+
+
+def test_seed_endpoint_generates_requested_dataset(client, db_session):
+    """Test counts, credentials and derived data of a generated dataset"""
+    response = client.post("/seed/database", json={
+        "managers": 2, "employees_per_manager": 3, "projects": 4, "weeks": 6, "entries_per_day": 2,
+        "approved_ratio": 0.5, "rejected_ratio": 0.2, "submitted_ratio": 0.3
+    })
+    
+    assert response.status_code == 200
+    result = response.json()
+    assert result["employees"] == 6
+    assert result["timesheets"] == 6 * 6
+    assert result["timesheet_entries"] == 6 * 6 * 5 * 2
+    assert db_session.scalar(select(func.count()).select_from(DbTimesheetEntry)) == result["timesheet_entries"]
+    assert db_session.scalar(select(func.count()).where(DbUser.manager_id == 1)) == 3
+    
+    # The current week stays draft, past weeks are all reviewed or submitted here
+    statuses = dict(db_session.execute(
+        select(DbTimesheet.status, func.count()).group_by(DbTimesheet.status)
+    ).all())
+    assert statuses[TimesheetStatus.DRAFT] == 6
+    assert sum(statuses.values()) == 36
+    
+    assert db_weekly_hours.check_weekly_hours(db_session) == []
+    assert len(client.get("/projects/", headers=_login(client, result["usernames"][1], result["password"])).json()) == 4
+
+
+def test_seed_endpoint_defaults_to_a_small_dataset(client):
+    """Test the body-less call that replaced the fixed seed"""
+    result = client.post("/seed/database").json()
+    
+    assert (result["managers"], result["employees"], result["projects"]) == (2, 4, 3)
+    assert result["timesheet_entries"] == 4 * 5
+    assert result["usernames"] == ["manager1", "employee1_1"]
+    _login(client, "manager1", result["password"])
+
+
+def test_seed_rejects_ratios_above_one(client):
+    response = client.post("/seed/database", json={"approved_ratio": 0.8, "rejected_ratio": 0.3})
+    
+    assert response.status_code == 422
+
+
+def _login(client, username, password):
+    response = client.post("/login", data={"username": username, "password": password})
+    assert response.status_code == 200
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
@@ -0,0 +1,52 @@
+import os
+import subprocess
+import sys
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.pool import StaticPool
+from main import create_app
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Cold import of main in a fresh interpreter (about 0.7s on a laptop)
+IMPORT_BUDGET_SECONDS = 2.0
+
+
+@pytest.fixture
+def engine_for_startup():
+    """Empty in-memory database"""
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    yield engine
+    engine.dispose()
+
+
+def test_import_is_fast_and_touches_no_database(tmp_path):
+    """Test that importing main stays within budget and opens no database"""
+    database = tmp_path / "cold.db"
+    code = "import time; start = time.perf_counter(); import main; print(time.perf_counter() - start)"
+    
+    result = subprocess.run(
+        [sys.executable, "-c", code], cwd=ROOT, capture_output=True, text=True, check=True,
+        env={**os.environ, "DATABASE_URL": f"sqlite:///{database}"}
+    )
+    
+    assert float(result.stdout) < IMPORT_BUDGET_SECONDS
+    assert not database.exists()
+
+
+def test_seed_endpoint_is_only_mounted_when_enabled(engine_for_startup):
+    """Test that POST /seed/database needs the seed_endpoint flag"""
+    paths = lambda app: app.openapi()["paths"]
+    
+    assert "/seed/database" not in paths(create_app(bind=engine_for_startup))
+    assert "/seed/database" in paths(create_app(bind=engine_for_startup, seed_endpoint=True))
+
+
+def test_startup_refuses_an_unmigrated_database(engine_for_startup):
+    """Test that the lifespan hook fails fast while migrations are pending"""
+    app = create_app(bind=engine_for_startup)
+    
+    with pytest.raises(RuntimeError, match="python -m db.migrations"):
+        with TestClient(app):
+            pass
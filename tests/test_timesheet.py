@@ -0,0 +1,148 @@
+import pytest
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+from sqlalchemy.orm import sessionmaker
+from db import migrations
+from db.database import create_db_engine
+from db.db_timesheet import ensure_timesheet
+from db.models import DbTimesheet, DbTimesheetEntry, DbUser
+from enums import TimesheetStatus, UserRole
+
+
+def _week():
+    year, week_number, _ = date.today().isocalendar()
+    return {"year": year, "week_number": week_number}
+
+
+@pytest.fixture
+def submitted_timesheet(client, test_project, auth_headers_employee):
+    client.post(
+        "/timesheet-entries/",
+        json={"project_id": test_project.id, "date": str(date.today()), "hours": 8.0},
+        headers=auth_headers_employee
+    )
+    response = client.post("/timesheets/submit", json=_week(), headers=auth_headers_employee)
+    assert response.status_code == 200
+    return response.json()
+
+
+def test_submit_links_week_entries(client, db_session, submitted_timesheet, auth_headers_employee):
+    """Test submitting a week attaches its entries"""
+    assert submitted_timesheet["status"] == TimesheetStatus.SUBMITTED.value
+    
+    entries = db_session.query(DbTimesheetEntry).all()
+    assert [entry.timesheet_id for entry in entries] == [submitted_timesheet["id"]]
+    
+    again = client.post("/timesheets/submit", json=_week(), headers=auth_headers_employee)
+    assert again.status_code == 400
+
+
+def test_submit_empty_week_fails(client, test_employee, auth_headers_employee):
+    """Test a week without entries cannot be submitted"""
+    response = client.post("/timesheets/submit", json=_week(), headers=auth_headers_employee)
+    assert response.status_code == 400
+
+
+def test_manager_approves_and_rejects(client, submitted_timesheet, auth_headers_manager, auth_headers_employee):
+    """Test approve, and that rejecting requires a comment"""
+    timesheet_id = submitted_timesheet["id"]
+    
+    response = client.post(f"/timesheets/{timesheet_id}/reject", json={"comment": ""}, headers=auth_headers_manager)
+    assert response.status_code == 422
+    
+    response = client.post(f"/timesheets/{timesheet_id}/approve", headers=auth_headers_employee)
+    assert response.status_code == 403
+    
+    response = client.post(f"/timesheets/{timesheet_id}/approve", headers=auth_headers_manager)
+    assert response.status_code == 200
+    assert response.json()["status"] == TimesheetStatus.APPROVED.value
+    
+    response = client.post(f"/timesheets/{timesheet_id}/approve", headers=auth_headers_manager)
+    assert response.status_code == 400
+
+
+def test_batch_review_skips_ineligible(client, db_session, test_manager, submitted_timesheet, auth_headers_manager):
+    """Test batch review updates submitted team timesheets and skips the rest"""
+    draft = DbTimesheet(employee_id=submitted_timesheet["employee_id"], year=2020, week_number=1)
+    db_session.add(draft)
+    db_session.commit()
+    
+    response = client.post(
+        "/timesheets/batch-review",
+        json={"timesheet_ids": [submitted_timesheet["id"], draft.id, 999999], "action": "reject", "comment": "Fix Friday"},
+        headers=auth_headers_manager
+    )
+    
+    assert response.status_code == 200
+    assert response.json() == {
+        "updated": 1,
+        "updated_ids": [submitted_timesheet["id"]],
+        "skipped_ids": [draft.id, 999999]
+    }
+    
+    team = client.get("/timesheets/team-timesheets?status=rejected", headers=auth_headers_manager).json()
+    assert [(t["id"], t["rejection_comment"]) for t in team] == [(submitted_timesheet["id"], "Fix Friday")]
+    
+    missing_comment = client.post(
+        "/timesheets/batch-review",
+        json={"timesheet_ids": [draft.id], "action": "reject"},
+        headers=auth_headers_manager
+    )
+    assert missing_comment.status_code == 400
+
+
+def test_entries_are_linked_to_their_week(client, db_session, test_project, auth_headers_employee):
+    """Test entries of one ISO week share a timesheet and moving an entry relinks it"""
+    ids = [
+        client.post(
+            "/timesheet-entries/",
+            json={"project_id": test_project.id, "date": day, "hours": 4.0},
+            headers=auth_headers_employee
+        ).json()["id"]
+        for day in ("2026-03-02", "2026-03-08", "2026-03-09")
+    ]
+    
+    timesheet_ids = [db_session.get(DbTimesheetEntry, entry_id).timesheet_id for entry_id in ids]
+    assert timesheet_ids[0] == timesheet_ids[1] != timesheet_ids[2]
+    assert db_session.query(DbTimesheet).count() == 2
+    
+    moved = client.put(f"/timesheet-entries/{ids[2]}", json={"date": "2026-03-03"}, headers=auth_headers_employee)
+    assert moved.status_code == 200, moved.json()
+    assert moved.json()["timesheet_id"] == timesheet_ids[0]
+
+
+def test_ensure_timesheet_is_race_free(tmp_path):
+    """Test concurrent writers for one week all get the same timesheet"""
+    engine = create_db_engine(f"sqlite:///{tmp_path / 'race.db'}")
+    migrations.upgrade(engine)
+    SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    with SessionLocal() as db:
+        user = DbUser(username="racer", email="racer@test.com", password="x", role=UserRole.EMPLOYEE)
+        db.add(user)
+        db.commit()
+        user_id = user.id
+    
+    def writer(_):
+        with SessionLocal() as db:
+            timesheet_id = ensure_timesheet(db, user_id, 2026, 10).id
+            db.commit()
+            return timesheet_id
+    
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        timesheet_ids = set(pool.map(writer, range(32)))
+    
+    with SessionLocal() as db:
+        assert timesheet_ids == {db.query(DbTimesheet.id).scalar()}
+    engine.dispose()
+
+
+def test_ensure_timesheet_reports_the_status_of_an_existing_week(db_session, test_employee):
+    """Test that callers can tell a locked week from a new draft"""
+    created = ensure_timesheet(db_session, test_employee.id, 2026, 11)
+    db_session.get(DbTimesheet, created.id).status = TimesheetStatus.APPROVED
+    db_session.commit()
+    
+    again = ensure_timesheet(db_session, test_employee.id, 2026, 11)
+    
+    assert created.status == TimesheetStatus.DRAFT
+    assert again == (created.id, TimesheetStatus.APPROVED)
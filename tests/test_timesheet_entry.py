@@ -1,5 +1,15 @@
+import csv
+import io
+import json
 import pytest
 from datetime import date
+from db import db_weekly_hours
+from db.models import DbProject, DbTimesheet, DbTimesheetEntry
+from enums import TimesheetStatus
+from schemas import ProjectDisplay
+import serialization
+from db.pagination import NEXT_CURSOR_HEADER
+from serialization import iter_csv, iter_json_array
 
 
 def test_create_timesheet_entry(client, test_employee, test_project, auth_headers_employee):
@@ -160,3 +170,419 @@ def test_cannot_create_entry_with_invalid_hours(client, test_project, auth_heade
     )
     
     assert response.status_code == 400
+
+
+def test_my_entries_keyset_pagination(client, test_project, auth_headers_employee):
+    """Test walking my entries page by page with the next cursor"""
+    for day in range(1, 6):
+        client.post(
+            "/timesheet-entries/",
+            json={
+                "project_id": test_project.id,
+                "date": f"2026-03-0{day}",
+                "hours": 8.0
+            },
+            headers=auth_headers_employee
+        )
+    
+    dates = []
+    params = {"limit": 2}
+    while True:
+        response = client.get("/timesheet-entries/my-entries", params=params, headers=auth_headers_employee)
+        assert response.status_code == 200
+        assert len(response.json()) <= 2
+        dates.extend(entry["date"] for entry in response.json())
+        if "X-Next-Cursor" not in response.headers:
+            break
+        params["cursor"] = response.headers["X-Next-Cursor"]
+    
+    assert dates == [f"2026-03-0{day}" for day in range(1, 6)]
+
+
+def test_invalid_pagination_cursor_is_rejected(client, auth_headers_employee):
+    """Test that a malformed cursor returns 400"""
+    response = client.get(
+        "/timesheet-entries/my-entries",
+        params={"limit": 2, "cursor": "not-a-cursor"},
+        headers=auth_headers_employee
+    )
+    
+    assert response.status_code == 400
+
+
+def test_entry_filters_by_date_range_and_project(client, db_session, test_project, auth_headers_employee, auth_headers_manager):
+    """Test that date range and project filters are applied on both endpoints"""
+    other_project = DbProject(name="Other Project")
+    db_session.add(other_project)
+    db_session.commit()
+    
+    for entry_date, project_id in [("2026-03-01", test_project.id), ("2026-03-09", test_project.id),
+                                   ("2026-03-10", other_project.id), ("2026-03-20", test_project.id)]:
+        client.post(
+            "/timesheet-entries/",
+            json={"project_id": project_id, "date": entry_date, "hours": 4.0},
+            headers=auth_headers_employee
+        )
+    
+    params = {"from_date": "2026-03-09", "to_date": "2026-03-15"}
+    my_week = client.get("/timesheet-entries/my-entries", params=params, headers=auth_headers_employee).json()
+    team_week = client.get("/timesheet-entries/team-entries", params=params, headers=auth_headers_manager).json()
+    
+    assert [e["date"] for e in my_week] == ["2026-03-09", "2026-03-10"]
+    assert team_week == my_week
+    
+    params["project_id"] = other_project.id
+    response = client.get("/timesheet-entries/team-entries", params=params, headers=auth_headers_manager)
+    assert [e["date"] for e in response.json()] == ["2026-03-10"]
+
+
+def test_team_entries_single_round_trip_and_streamed(client, test_employee, test_project, auth_headers_employee, auth_headers_manager, statements):
+    """Test that team entries are read with one query and streamed as a JSON array"""
+    for day in range(1, 4):
+        client.post(
+            "/timesheet-entries/",
+            json={"project_id": test_project.id, "date": f"2026-03-0{day}", "hours": 8.0},
+            headers=auth_headers_employee
+        )
+    client.get("/users/me", headers=auth_headers_manager)  # warm the principal cache
+    statements.clear()
+    
+    response = client.get("/timesheet-entries/team-entries", headers=auth_headers_manager)
+    
+    assert response.status_code == 200
+    assert [e["date"] for e in response.json()] == ["2026-03-01", "2026-03-02", "2026-03-03"]
+    selects = [s for s in statements if s.lstrip().startswith("SELECT")]
+    assert len(selects) == 2  # the ETag's aggregate, then the rows
+    assert "count(timesheet_entries.id)" in selects[0]
+
+
+def test_json_array_stream_joins_batches():
+    """Test that batched encoding produces one valid JSON array"""
+    rows = [ProjectDisplay(id=i, name=f"p{i}", description=None) for i in range(5)]
+    
+    body = b"".join(iter_json_array(rows, ProjectDisplay, batch_size=2))
+    
+    assert [row["id"] for row in json.loads(body)] == [0, 1, 2, 3, 4]
+    assert b"".join(iter_json_array([], ProjectDisplay)) == b"[]"
+
+
+def test_bulk_create_entries(client, test_employee, test_project, auth_headers_employee, statements):
+    """Test creating a week of entries with one project lookup, one timesheet upsert and one insert"""
+    client.get("/users/me", headers=auth_headers_employee)  # warm the principal cache
+    statements.clear()
+    
+    response = client.post(
+        "/timesheet-entries/bulk",
+        json={"entries": [
+            {"project_id": test_project.id, "date": f"2026-03-0{day}", "hours": 8.0}
+            for day in range(2, 7)
+        ]},
+        headers=auth_headers_employee
+    )
+    
+    assert response.status_code == 201
+    data = response.json()
+    assert data["created"] == 5 and data["failed"] == 0
+    assert [r["entry"]["date"] for r in data["results"]] == [f"2026-03-0{day}" for day in range(2, 7)]
+    assert all(r["entry"]["employee_id"] == test_employee.id for r in data["results"])
+    assert len({r["entry"]["timesheet_id"] for r in data["results"]}) == 1
+    assert len([s for s in statements if s.lstrip().startswith("INSERT INTO timesheet_entries")]) == 1
+    assert len([s for s in statements if s.lstrip().startswith("INSERT INTO timesheets")]) == 1
+
+
+def test_bulk_create_does_not_reload_entries(client, test_project, auth_headers_employee, query_budget):
+    """Test that created entries come back from INSERT ... RETURNING, not one SELECT each"""
+    client.get("/projects/", headers=auth_headers_employee)  # warm the principal cache and project catalog
+    project_id = test_project.id
+    
+    # Timesheet upsert, entry INSERT, weekly hours upsert - whatever the entry count
+    with query_budget(3) as statements:
+        response = client.post(
+            "/timesheet-entries/bulk",
+            json={"entries": [
+                {"project_id": project_id, "date": f"2026-03-0{day}", "hours": 1.0}
+                for day in range(2, 7)
+            ] * 4},
+            headers=auth_headers_employee
+        )
+    
+    assert response.status_code == 201
+    assert response.json()["created"] == 20
+    assert not [s for s in statements if s.lstrip().startswith("SELECT") and "FROM timesheet_entries" in s]
+
+
+def test_bulk_create_all_or_nothing_rejects_whole_batch(client, test_project, auth_headers_employee):
+    """Test that one invalid item prevents the whole batch in all_or_nothing mode"""
+    response = client.post(
+        "/timesheet-entries/bulk",
+        json={"entries": [
+            {"project_id": test_project.id, "date": "2026-03-02", "hours": 8.0},
+            {"project_id": 999999, "date": "2026-03-03", "hours": 8.0}
+        ]},
+        headers=auth_headers_employee
+    )
+    
+    assert response.status_code == 400
+    assert response.json()["detail"] == [{"index": 1, "error": "Project with id 999999 not found"}]
+    assert client.get("/timesheet-entries/my-entries", headers=auth_headers_employee).json() == []
+
+
+def test_bulk_create_best_effort_reports_failures(client, test_project, auth_headers_employee):
+    """Test that best_effort mode creates valid items and reports invalid ones"""
+    response = client.post(
+        "/timesheet-entries/bulk",
+        json={
+            "mode": "best_effort",
+            "entries": [
+                {"project_id": test_project.id, "date": "2026-03-02", "hours": 8.0},
+                {"project_id": test_project.id, "date": "2026-03-03", "hours": 30.0}
+            ]
+        },
+        headers=auth_headers_employee
+    )
+    
+    assert response.status_code == 201
+    results = response.json()["results"]
+    assert [r["status"] for r in results] == ["created", "failed"]
+    assert results[1]["error"] == "Hours cannot exceed 24 in a single day"
+
+
+def test_weekly_hours_follow_entry_writes(client, db_session, test_employee, test_project, auth_headers_employee, auth_headers_manager):
+    """Test that create, bulk, update and delete keep the weekly aggregate consistent"""
+    other = DbProject(name="Other Project")
+    db_session.add(other)
+    db_session.commit()
+    
+    first = client.post(
+        "/timesheet-entries/",
+        json={"project_id": test_project.id, "date": "2026-03-02", "hours": 8.0},
+        headers=auth_headers_employee
+    ).json()
+    client.post(
+        "/timesheet-entries/bulk",
+        json={"entries": [
+            {"project_id": test_project.id, "date": "2026-03-03", "hours": 6.5},
+            {"project_id": other.id, "date": "2026-03-10", "hours": 2.0}
+        ]},
+        headers=auth_headers_employee
+    )
+    client.put(f"/timesheet-entries/{first['id']}", json={"project_id": other.id, "hours": 5.0}, headers=auth_headers_employee)
+    third = client.post(
+        "/timesheet-entries/",
+        json={"project_id": test_project.id, "date": "2026-03-11", "hours": 1.0},
+        headers=auth_headers_employee
+    ).json()
+    client.delete(f"/timesheet-entries/{third['id']}", headers=auth_headers_employee)
+    
+    response = client.get("/timesheet-entries/weekly-hours?year=2026", headers=auth_headers_employee)
+    
+    assert response.status_code == 200
+    assert [(r["week_number"], r["project_id"], r["total_hours"], r["entry_count"]) for r in response.json()] == [
+        (10, test_project.id, 6.5, 1),
+        (10, other.id, 5.0, 1),
+        (11, other.id, 2.0, 1)
+    ]
+    assert db_weekly_hours.check_weekly_hours(db_session) == []
+    
+    team = client.get(f"/timesheet-entries/team-weekly-hours?employee_id={test_employee.id}", headers=auth_headers_manager)
+    assert team.json() == response.json()
+
+
+def test_weekly_hours_rebuild_and_check(db_session, test_employee, test_project):
+    """Test that the checker finds drift and a rebuild repairs it"""
+    db_session.add_all([
+        DbTimesheetEntry(employee_id=test_employee.id, project_id=test_project.id, date=date(2026, 1, 1), hours=3.0),
+        DbTimesheetEntry(employee_id=test_employee.id, project_id=test_project.id, date=date(2025, 12, 29), hours=4.0),
+        DbTimesheetEntry(employee_id=test_employee.id, project_id=test_project.id, date=date(2026, 1, 5), hours=1.0)
+    ])
+    db_session.commit()
+    
+    assert len(db_weekly_hours.check_weekly_hours(db_session)) == 2
+    assert db_weekly_hours.rebuild_weekly_hours(db_session) == 2
+    assert db_weekly_hours.check_weekly_hours(db_session) == []
+    assert [(r.year, r.week_number, r.total_hours, r.entry_count) for r in db_weekly_hours.get_weekly_hours(db_session, test_employee.id)] == [
+        (2026, 1, 7.0, 2),
+        (2026, 2, 1.0, 1)
+    ]
+
+
+def test_export_entries_csv_and_ndjson(client, test_employee, test_project, auth_headers_employee, auth_headers_manager):
+    """Test that exports stream the filtered entries as CSV or NDJSON"""
+    for day, description in (("2026-03-02", "Design, review"), ("2026-03-03", None), ("2026-04-01", "Next month")):
+        client.post(
+            "/timesheet-entries/",
+            json={"project_id": test_project.id, "date": day, "hours": 7.5, "description": description},
+            headers=auth_headers_employee
+        )
+    
+    response = client.get(
+        "/timesheet-entries/export?format=csv&from_date=2026-03-01&to_date=2026-03-31",
+        headers=auth_headers_manager
+    )
+    
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/csv")
+    assert 'filename="timesheet-entries.csv"' in response.headers["content-disposition"]
+    rows = list(csv.reader(io.StringIO(response.text)))
+    assert rows[0] == ["id", "employee_id", "project_id", "timesheet_id", "date", "hours", "description"]
+    assert [(row[4], row[5], row[6]) for row in rows[1:]] == [("2026-03-02", "7.5", "Design, review"), ("2026-03-03", "7.5", "")]
+    
+    response = client.get("/timesheet-entries/export?format=ndjson", headers=auth_headers_employee)
+    
+    assert response.headers["content-type"] == "application/x-ndjson"
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert [line["date"] for line in lines] == ["2026-03-02", "2026-03-03", "2026-04-01"]
+    assert all(line["employee_id"] == test_employee.id for line in lines)
+
+
+def test_csv_header_is_sent_before_rows_are_read():
+    """Test that the first chunk does not wait for the query"""
+    def rows():
+        raise AssertionError("rows read before the header was sent")
+        yield
+    
+    chunks = iter_csv(rows(), ["id", "hours"])
+    
+    assert next(chunks) == b"id,hours\r\n"
+
+
+@pytest.mark.parametrize("path", [
+    "/timesheet-entries/my-entries",
+    "/timesheet-entries/my-entries?limit=2",
+    "/users/?limit=1",
+    "/projects/",
+])
+def test_fast_json_path_matches_schema_path(path, client, monkeypatch, test_project, auth_headers_employee):
+    """Test that plain rows + orjson give the same bytes and headers as Pydantic"""
+    for day in range(2, 5):
+        client.post(
+            "/timesheet-entries/",
+            json={"project_id": test_project.id, "date": f"2026-03-0{day}", "hours": 7.5, "description": "Ünïcode"},
+            headers=auth_headers_employee
+        )
+    
+    default = client.get(path, headers=auth_headers_employee)
+    monkeypatch.setattr(serialization, "FAST_JSON_RESPONSES", True)
+    fast = client.get(path, headers=auth_headers_employee)
+    monkeypatch.setattr(serialization, "orjson", None)
+    stdlib = client.get(path, headers=auth_headers_employee)
+    
+    assert fast.status_code == default.status_code == 200
+    assert fast.content == default.content == stdlib.content
+    assert fast.headers.get(NEXT_CURSOR_HEADER) == default.headers.get(NEXT_CURSOR_HEADER)
+
+
+def test_entry_lists_answer_304_until_entries_change(client, test_project, auth_headers_employee, auth_headers_manager, statements):
+    """Test that unchanged lists return 304 without reading rows, and writes change the ETag"""
+    created = client.post(
+        "/timesheet-entries/",
+        json={"project_id": test_project.id, "date": "2026-03-02", "hours": 8.0},
+        headers=auth_headers_employee
+    ).json()
+    
+    for path, headers in [("/timesheet-entries/my-entries", auth_headers_employee), ("/timesheet-entries/team-entries", auth_headers_manager)]:
+        first = client.get(path, headers=headers)
+        etag = first.headers["ETag"]
+        assert etag.startswith('W/"')
+        
+        statements.clear()
+        cached = client.get(path, headers={**headers, "If-None-Match": etag})
+        assert cached.status_code == 304
+        assert cached.headers["ETag"] == etag
+        assert cached.content == b""
+        assert not any("timesheet_entries.description" in statement for statement in statements)
+        
+        assert client.get(f"{path}?limit=1", headers={**headers, "If-None-Match": etag}).status_code == 200
+    
+    etag = client.get("/timesheet-entries/my-entries", headers=auth_headers_employee).headers["ETag"]
+    client.put(f"/timesheet-entries/{created['id']}", json={"hours": 6.0}, headers=auth_headers_employee)
+    updated = client.get("/timesheet-entries/my-entries", headers={**auth_headers_employee, "If-None-Match": etag})
+    assert updated.status_code == 200
+    assert updated.json()[0]["hours"] == 6.0
+    
+    etag = updated.headers["ETag"]
+    client.delete(f"/timesheet-entries/{created['id']}", headers=auth_headers_employee)
+    deleted = client.get("/timesheet-entries/my-entries", headers={**auth_headers_employee, "If-None-Match": etag})
+    assert deleted.status_code == 200
+    assert deleted.json() == []
+
+
+# Week 10 of 2026 is 2026-03-02 to 2026-03-08, week 11 starts on 2026-03-09
+@pytest.fixture
+def week_in_status(client, db_session, test_employee, test_project, auth_headers_employee):
+    """Put week 10 of 2026 (with one entry) in a timesheet status, returns the entry id"""
+    def set_status(timesheet_status: TimesheetStatus) -> int:
+        entry_id = client.post(
+            "/timesheet-entries/",
+            json={"project_id": test_project.id, "date": "2026-03-02", "hours": 4.0},
+            headers=auth_headers_employee
+        ).json()["id"]
+        timesheet = db_session.query(DbTimesheet).filter_by(employee_id=test_employee.id, year=2026, week_number=10).one()
+        timesheet.status = timesheet_status
+        db_session.commit()
+        return entry_id
+    return set_status
+
+
+LOCKED = [(TimesheetStatus.DRAFT, False), (TimesheetStatus.REJECTED, False),
+          (TimesheetStatus.SUBMITTED, True), (TimesheetStatus.APPROVED, True)]
+
+
+@pytest.mark.parametrize("timesheet_status,locked", LOCKED)
+def test_entry_writes_follow_the_week_status(timesheet_status, locked, client, week_in_status, test_project, auth_headers_employee):
+    """Test that entries of submitted and approved weeks can't be created, changed or deleted"""
+    entry_id = week_in_status(timesheet_status)
+    
+    created = client.post(
+        "/timesheet-entries/",
+        json={"project_id": test_project.id, "date": "2026-03-03", "hours": 2.0},
+        headers=auth_headers_employee
+    )
+    updated = client.put(f"/timesheet-entries/{entry_id}", json={"hours": 6.0}, headers=auth_headers_employee)
+    moved_out = client.put(f"/timesheet-entries/{entry_id}", json={"date": "2026-03-10"}, headers=auth_headers_employee)
+    deleted = client.delete(f"/timesheet-entries/{entry_id}", headers=auth_headers_employee)
+    
+    if locked:
+        assert [created.status_code, updated.status_code, moved_out.status_code, deleted.status_code] == [400] * 4
+        assert timesheet_status.value in created.json()["detail"]
+    else:
+        assert [created.status_code, updated.status_code, moved_out.status_code, deleted.status_code] == [201, 200, 200, 204]
+
+
+@pytest.mark.parametrize("timesheet_status,locked", LOCKED)
+def test_entry_cannot_move_into_a_locked_week(timesheet_status, locked, client, week_in_status, test_project, auth_headers_employee):
+    """Test that changing an entry's date checks the week it moves to"""
+    week_in_status(timesheet_status)
+    entry_id = client.post(
+        "/timesheet-entries/",
+        json={"project_id": test_project.id, "date": "2026-03-10", "hours": 2.0},
+        headers=auth_headers_employee
+    ).json()["id"]
+    
+    response = client.put(f"/timesheet-entries/{entry_id}", json={"date": "2026-03-04"}, headers=auth_headers_employee)
+    
+    assert response.status_code == (400 if locked else 200)
+
+
+@pytest.mark.parametrize("timesheet_status,locked", LOCKED)
+def test_bulk_create_rejects_items_in_locked_weeks(timesheet_status, locked, client, week_in_status, test_project, auth_headers_employee):
+    """Test that bulk items in a submitted or approved week fail"""
+    week_in_status(timesheet_status)
+    entries = [
+        {"project_id": test_project.id, "date": "2026-03-03", "hours": 2.0},
+        {"project_id": test_project.id, "date": "2026-03-10", "hours": 2.0},
+    ]
+    
+    all_or_nothing = client.post("/timesheet-entries/bulk", json={"entries": entries}, headers=auth_headers_employee)
+    best_effort = client.post(
+        "/timesheet-entries/bulk", json={"entries": entries, "mode": "best_effort"}, headers=auth_headers_employee
+    ).json()
+    
+    if locked:
+        assert all_or_nothing.status_code == 400
+        assert all_or_nothing.json()["detail"][0]["index"] == 0
+        assert (best_effort["created"], best_effort["failed"]) == (1, 1)
+        assert best_effort["results"][0]["status"] == "failed"
+    else:
+        assert all_or_nothing.status_code == 201
+        assert (best_effort["created"], best_effort["failed"]) == (2, 0)